@@ -1,8 +1,11 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request
 from services.jiuyan_service import JiuyanService
 from services.eastmoney_service import EastmoneyService
 from services.kaipanla_service import KaipanlaService
 from services.sync_service import SyncService
+from utils.cache import CacheManager
+from utils.db_config import cnx_pool, read_pool
+from utils.metrics import REQUEST_LATENCY, CONTENT_TYPE, render as render_metrics
 import tasks
 import logging
 import time
@@ -13,12 +16,16 @@ logger = logging.getLogger(__name__)
 @admin_bp.before_request
 def log_request_info():
     request.start_time = time.time()
-    logger.info(f"Incoming Request: {request.method} {request.path} | Args: {request.args} | Body: {request.get_json(silent=True)}")
+    # Bodies can carry API cookies, so they are only logged at DEBUG
+    logger.debug(f"Incoming Request: {request.method} {request.path} | Args: {request.args} | Body: {request.get_json(silent=True)}")
 
 @admin_bp.after_request
 def log_response_info(response):
     duration = time.time() - request.start_time
-    logger.info(f"Response: {response.status} | Duration: {duration:.3f}s")
+    REQUEST_LATENCY.observe(duration, request.endpoint, request.method, response.status_code)
+    # Admin calls are rare, so they bypass the sampled access log
+    logger.info(f"{request.method} {request.full_path} {response.status_code}", extra={'fields': {
+        'endpoint': request.endpoint, 'status': response.status_code, 'duration_ms': round(duration * 1000, 1)}})
     return response
 
 @admin_bp.route('/api/upload/yesterday_limit_up', methods=['POST'])
@@ -216,6 +223,33 @@ def kaipanla_stat_test():
     else:
         return jsonify({"success": False, "error": result}), 500
 
+@admin_bp.route('/api/admin/cache/stats', methods=['GET'])
+def cache_stats():
+    """
+    Per-namespace cache size and hit/miss/eviction counters, plus the number of
+    duplicate computations avoided by single flight per minute.
+    """
+    return jsonify({"success": True, "data": CacheManager.stats(),
+                    "coalesced_by_minute": CacheManager.coalesced_by_minute()})
+
+@admin_bp.route('/api/admin/db/pool', methods=['GET'])
+def db_pool_stats():
+    """
+    Connection pool size, in-use and peak counts, waits, exhaustion events and
+    checkout latency for this process; "read" holds the read pool's when
+    reads go to a separate server.
+    """
+    read_stats = read_pool.stats() if read_pool is not cnx_pool else None
+    return jsonify({"success": True, "data": cnx_pool.stats(), "read": read_stats})
+
+@admin_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Latency histograms, cache counters and pool stats of this process in the
+    Prometheus text format.
+    """
+    return Response(render_metrics(), content_type=CONTENT_TYPE)
+
 # Manual trigger for testing
 @admin_bp.route('/api/test/fetch_call_auction', methods=['POST'])
 def trigger_fetch():
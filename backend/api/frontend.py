@@ -1,21 +1,87 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from services.market_service import MarketService
 from services.kaipanla_service import KaipanlaService
+from utils.events import EventBus
+from utils.cache import CacheManager
+from utils.log_config import access_logger
+from utils.metrics import REQUEST_LATENCY
+import datetime
+import json
 import logging
+import queue
 import time
 
 frontend_bp = Blueprint('frontend', __name__)
 logger = logging.getLogger(__name__)
 
+# Endpoints whose responses are not versioned
+UNVERSIONED_ENDPOINTS = {'frontend.stream_updates'}
+
+# Seconds a serialized response of a live date is kept; closed dates are kept until evicted
+RESPONSE_CACHE_TTL = 60
+
+def _request_etag():
+    """
+    ETag for the current request, derived from the data versions of the requested date.
+    Closed (past) days are tagged as such and may be cached by the browser.
+    """
+    if request.method != 'GET' or request.endpoint in UNVERSIONED_ENDPOINTS:
+        return None
+    today = datetime.date.today().strftime('%Y-%m-%d')
+    if request.endpoint == 'frontend.get_trading_days':
+        # Trading days are refreshed at most daily
+        return f"trading-days-{today}"
+
+    date_str = request.args.get('date') or today
+    tag = EventBus.version_tag(date_str)
+    if tag is None:
+        return None
+    if date_str < today:
+        return f"{date_str}-closed-{tag}"
+    return f"{date_str}-{tag}"
+
 @frontend_bp.before_request
 def log_request_info():
     request.start_time = time.time()
-    logger.info(f"Incoming Request: {request.method} {request.path} | Args: {request.args} | Body: {request.get_json(silent=True)}")
+    logger.debug(f"Incoming Request: {request.method} {request.path} | Args: {request.args}")
+
+    # Answer repeated polls before any query runs
+    request.etag = _request_etag()
+    if request.etag and request.if_none_match.contains(request.etag):
+        response = Response(status=304)
+        response.set_etag(request.etag)
+        return response
+
+    # Same data version already serialized for another client
+    if request.etag:
+        body = CacheManager.get(_response_cache_key())
+        if body is not None:
+            request.from_response_cache = True
+            return Response(body, mimetype='application/json')
+
+def _response_cache_key():
+    return f"response:{request.full_path}:{request.etag}"
 
 @frontend_bp.after_request
 def log_response_info(response):
+    etag = getattr(request, 'etag', None)
+    if etag and response.status_code == 200:
+        response.set_etag(etag)
+        closed = '-closed-' in etag
+        if closed:
+            response.headers['Cache-Control'] = 'public, max-age=86400'
+        else:
+            response.headers['Cache-Control'] = 'no-cache'
+        if (response.mimetype == 'application/json' and not response.is_streamed
+                and not getattr(request, 'from_response_cache', False)):
+            CacheManager.set(_response_cache_key(), response.get_data(),
+                             ttl=None if closed else RESPONSE_CACHE_TTL)
+
     duration = time.time() - request.start_time
-    logger.info(f"Response: {response.status} | Duration: {duration:.3f}s")
+    REQUEST_LATENCY.observe(duration, request.endpoint, request.method, response.status_code)
+    access_logger.info(f"{request.method} {request.full_path} {response.status_code}", extra={'fields': {
+        'endpoint': request.endpoint, 'status': response.status_code, 'duration_ms': round(duration * 1000, 1),
+        'cached': getattr(request, 'from_response_cache', False)}})
     return response
 
 @frontend_bp.route('/api/index/latest', methods=['GET'])
@@ -147,3 +213,50 @@ def get_trading_days():
     """
     days = MarketService.get_trading_days()
     return jsonify(days)
+
+@frontend_bp.route('/api/dashboard/bundle', methods=['GET'])
+def get_dashboard_bundle():
+    """
+    一次性获取首页所有组件数据（情绪、竞价前N、9:15/9:20排名、9:25涨跌停、异动、昨日涨停表现、指数）。
+    参数:
+        date (可选, 默认为最新交易日)
+        limit (默认50)
+    """
+    date_str = request.args.get('date')
+    limit = request.args.get('limit', 50, type=int)
+
+    logger.debug(f"Querying Dashboard Bundle: date={date_str}, limit={limit}")
+    data = dict(MarketService.get_dashboard_bundle(date_str=date_str, limit=limit))
+    data['index'] = KaipanlaService.get_latest_index_data(data['date'])
+    return jsonify(data)
+
+# Seconds between keep-alive comments on an idle stream
+STREAM_HEARTBEAT_INTERVAL = 15
+
+@frontend_bp.route('/api/stream', methods=['GET'])
+def stream_updates():
+    """
+    Server-Sent Events 推送：当采集任务写入新数据时推送 update 事件（dataset, date, version）。
+    客户端收到事件后再拉取 /api/dashboard/bundle。
+    参数: date (可选, 默认为今天; 只推送该日期的更新)
+    """
+    date_str = request.args.get('date') or datetime.date.today().strftime('%Y-%m-%d')
+    subscriber = EventBus.subscribe()
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = subscriber.get(timeout=STREAM_HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if event['date'] != date_str:
+                    continue
+                yield f"event: update\ndata: {json.dumps(event)}\n\n"
+        finally:
+            EventBus.unsubscribe(subscriber)
+
+    headers = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers=headers)
@@ -2,19 +2,29 @@ from flask import Flask
 from flask_cors import CORS
 import logging
 from api import frontend_bp, admin_bp
+from utils.trading_calendar import TradingCalendar
+from utils.serialization import FastJSONProvider
+from utils.log_config import setup_logging
 # from scheduler import init_scheduler  <-- Removed
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+# Configure logging: records are written by a background thread to the console and app.log
+setup_logging('app.log')
 logger = logging.getLogger(__name__)
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     CORS(app) # Enable CORS for all routes
     
     # Register Blueprints
     app.register_blueprint(frontend_bp)
     app.register_blueprint(admin_bp)
+
+    # Load the trading calendar once; it refreshes itself in the background
+    try:
+        TradingCalendar.load()
+    except Exception as e:
+        logger.error(f"Error loading trading calendar: {e}")
     
     # Init Scheduler
     # Scheduler is now a separate service. Run scheduler.py independently.
@@ -21,7 +21,6 @@ TABLES['stock_list'] = (
 
 TABLES['call_auction_data'] = (
     "CREATE TABLE `call_auction_data` ("
-    "  `id` int NOT NULL AUTO_INCREMENT,"
     "  `date` date NOT NULL,"
     "  `time` time NOT NULL,"
     "  `code` varchar(10) NOT NULL,"
@@ -34,10 +33,65 @@ TABLES['call_auction_data'] = (
     "  `non_asking_amount` decimal(20, 2) DEFAULT 0.00,"
     "  `non_asking_volume` bigint DEFAULT 0,"
     "  `yidongleixing` varchar(255) DEFAULT '',"
-    "  PRIMARY KEY (`id`),"
-    "  INDEX `idx_date_time` (`date`, `time`),"
-    "  INDEX `idx_date_code` (`date`, `code`),"
-    "  INDEX `idx_date_time_code` (`date`, `time`, `code`)"
+    "  PRIMARY KEY (`date`, `time`, `code`),"
+    "  INDEX `idx_date_code` (`date`, `code`)"
+    ") ENGINE=InnoDB")
+
+TABLES['call_auction_tick_manifest'] = (
+    "CREATE TABLE `call_auction_tick_manifest` ("
+    "  `date` date NOT NULL,"
+    "  `time` time NOT NULL,"
+    "  `total_count` int DEFAULT 0,"
+    "  `changed_count` int DEFAULT 0,"
+    "  `updated_at` timestamp DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,"
+    "  PRIMARY KEY (`date`, `time`)"
+    ") ENGINE=InnoDB")
+
+TABLES['call_auction_minute_rollup'] = (
+    "CREATE TABLE `call_auction_minute_rollup` ("
+    "  `date` date NOT NULL,"
+    "  `minute` time NOT NULL,"
+    "  `code` varchar(10) NOT NULL,"
+    "  `name` varchar(50) NOT NULL,"
+    "  `sector` varchar(50) DEFAULT '',"
+    "  `first_time` time NOT NULL,"
+    "  `first_bidding_percent` decimal(10, 2) DEFAULT 0.00,"
+    "  `first_bidding_amount` decimal(20, 2) DEFAULT 0.00,"
+    "  `first_asking_amount` decimal(20, 2) DEFAULT 0.00,"
+    "  `last_time` time NOT NULL,"
+    "  `last_bidding_percent` decimal(10, 2) DEFAULT 0.00,"
+    "  `last_bidding_amount` decimal(20, 2) DEFAULT 0.00,"
+    "  `last_asking_amount` decimal(20, 2) DEFAULT 0.00,"
+    "  PRIMARY KEY (`date`, `minute`, `code`),"
+    "  INDEX `idx_date_code_minute` (`date`, `code`, `minute`)"
+    ") ENGINE=InnoDB")
+
+TABLES['trading_calendar'] = (
+    "CREATE TABLE `trading_calendar` ("
+    "  `date` date NOT NULL,"
+    "  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,"
+    "  PRIMARY KEY (`date`)"
+    ") ENGINE=InnoDB")
+
+TABLES['data_versions'] = (
+    "CREATE TABLE `data_versions` ("
+    "  `dataset` varchar(50) NOT NULL,"
+    "  `date` date NOT NULL,"
+    "  `version` bigint NOT NULL DEFAULT 1,"
+    "  `updated_at` timestamp(3) DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),"
+    "  PRIMARY KEY (`dataset`, `date`)"
+    ") ENGINE=InnoDB")
+
+TABLES['day_results'] = (
+    "CREATE TABLE `day_results` ("
+    "  `cache_key` varchar(191) NOT NULL,"
+    "  `date` date NOT NULL,"
+    "  `namespace` varchar(50) NOT NULL,"
+    "  `version_tag` varchar(255) NOT NULL,"
+    "  `payload` mediumblob NOT NULL,"
+    "  `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP,"
+    "  PRIMARY KEY (`cache_key`),"
+    "  INDEX `idx_date` (`date`)"
     ") ENGINE=InnoDB")
 
 TABLES['yesterday_limit_up'] = (
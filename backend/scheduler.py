@@ -5,18 +5,14 @@ import datetime
 import logging
 import os
 import time
-from utils.date_utils import get_current_or_previous_trading_day
+from utils.date_utils import get_current_or_previous_trading_day, is_trading_day
+from utils.trading_calendar import TradingCalendar
+from utils.log_config import setup_logging
+from utils.metrics import start_metrics_server
 
 logger = logging.getLogger(__name__)
-    # Configure logging if running standalone
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("scheduler.log"),
-        logging.StreamHandler()
-    ]
-)
+# Configure logging: records are written by a background thread to the console and scheduler.log
+setup_logging('scheduler.log')
 
 def job_fetch_call_auction():
     '''
@@ -26,6 +22,8 @@ def job_fetch_call_auction():
     # Check if within 9:15 - 9:30 (buffer slightly)
     start_time = datetime.time(9, 14)
     end_time = datetime.time(9, 31)
+    if not is_trading_day():
+        return
     trading_day = get_current_or_previous_trading_day()
 
     if (start_time <= now <= end_time):
@@ -41,7 +39,6 @@ def job_fetch_index_data():
     定时获取开盘啦指数数据 - runs every 30 seconds from 9:15 to 15:00
     '''
     now = datetime.datetime.now().time()
-    today_str = datetime.date.today().strftime('%Y-%m-%d')
     
     # Check if within 9:15 - 15:00
     start_time = datetime.time(9, 15)
@@ -51,6 +48,8 @@ def job_fetch_index_data():
         return
 
     # Check if today is a trading day
+    if not is_trading_day():
+        return
     date_str = get_current_or_previous_trading_day()
     logger.info(f"Executing job_fetch_index_data for date: {date_str}")
     tasks.run_fetch_index_data(date_str)
@@ -69,6 +68,8 @@ def job_fetch_stat_data():
         return
 
     # Check if today is a trading day
+    if not is_trading_day():
+        return
     date_str = get_current_or_previous_trading_day()
     logger.info(f"Executing job_fetch_stat_data for date: {date_str}")
     tasks.run_fetch_stat_data(date_str)
@@ -93,7 +94,23 @@ def job_fetch_limit_up():
     
     tasks.run_update_yesterday_limit_up(date_str=trading_day)
 
+def job_materialize_day_results():
+    '''
+    每天收盘后把当日看板各组件的结果存入 day_results，查看历史日期时直接读取
+    '''
+    if not is_trading_day():
+        return
+    trading_day = get_current_or_previous_trading_day()
+    logger.info(f"Executing job_materialize_day_results for date: {trading_day}")
+    tasks.run_materialize_day_results(date_str=trading_day)
+
 def start_scheduler(blocking=False):
+    # Load the trading calendar once; it refreshes itself in the background
+    try:
+        TradingCalendar.load()
+    except Exception as e:
+        logger.error(f"Error loading trading calendar: {e}")
+
     if blocking:
         scheduler = BlockingScheduler()
     else:
@@ -114,6 +131,10 @@ def start_scheduler(blocking=False):
     # Schedule Jiuyan fetch daily at 18:00
     # 每天定时获取韭研按照题材概念分类的涨停数据
     scheduler.add_job(job_fetch_limit_up, 'cron', day_of_week='mon-fri', hour=18, minute=0)
+
+    # Store the finished day's dashboard results once the limit up list is in
+    # 每天收盘后固化当日看板结果
+    scheduler.add_job(job_materialize_day_results, 'cron', day_of_week='mon-fri', hour=18, minute=30)
     
     try:
         scheduler.start()
@@ -130,4 +151,6 @@ def init_scheduler():
 if __name__ == "__main__":
 
     logger.info("Starting Scheduler Service...")
+    # 采集耗时等指标通过 METRICS_PORT 端口的 /metrics 暴露
+    start_metrics_server()
     start_scheduler(blocking=True)
@@ -0,0 +1,75 @@
+import sys
+import os
+import time
+import random
+import logging
+import datetime
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.database import DatabaseManager
+from utils.db_config import USE_LOAD_DATA
+from services.eastmoney_service import CALL_AUCTION_COLUMNS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BENCH_TABLE = 'call_auction_data_bench'
+ROW_COUNT = 5000
+
+def generate_tick(row_count, tick_time):
+    """
+    Generate one synthetic call auction tick shaped like save_call_auction_data rows.
+    """
+    date_str = datetime.date.today().strftime('%Y-%m-%d')
+    rows = []
+    for i in range(row_count):
+        code = f"{600000 + i:06d}"
+        bidding_amount = round(random.uniform(1e5, 5e8), 2)
+        non_asking_amount = round(random.uniform(0, 1e8), 2)
+        rows.append((
+            date_str, tick_time, code, f"测试{i}", '测试板块', round(random.uniform(2, 200), 2),
+            round(random.uniform(-10, 10), 2), bidding_amount, bidding_amount + non_asking_amount,
+            non_asking_amount, random.randint(0, 10**7), ''
+        ))
+    return rows
+
+def timed(label, func, row_count):
+    DatabaseManager.execute_update(f"TRUNCATE TABLE {BENCH_TABLE}")
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    logger.info(f"{label:<32} {elapsed:8.3f}s  {row_count / elapsed:12,.0f} rows/s")
+
+def load_data(rows):
+    """
+    LOAD DATA without bulk_insert's fallback, so a load that cannot run
+    fails here instead of timing the multi-row insert a second time.
+    """
+    with DatabaseManager.transaction() as tx:
+        DatabaseManager._load_data_infile(tx.cursor, BENCH_TABLE, CALL_AUCTION_COLUMNS, rows, replace=True)
+
+def run_benchmark(row_count=ROW_COUNT):
+    DatabaseManager.execute_update(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+    DatabaseManager.execute_update(f"CREATE TABLE {BENCH_TABLE} LIKE call_auction_data")
+    try:
+        rows = generate_tick(row_count, '09:25:00')
+        placeholders = ', '.join(['%s'] * len(CALL_AUCTION_COLUMNS))
+        replace_query = f"REPLACE INTO {BENCH_TABLE} ({', '.join(CALL_AUCTION_COLUMNS)}) VALUES ({placeholders})"
+
+        logger.info(f"Writing a {row_count}-row tick into {BENCH_TABLE}")
+        timed("executemany REPLACE (before)",
+              lambda: DatabaseManager.execute_update(replace_query, rows, many=True), row_count)
+        timed("bulk_insert multi-row VALUES",
+              lambda: DatabaseManager.bulk_insert(BENCH_TABLE, CALL_AUCTION_COLUMNS, rows, replace=True,
+                                                  use_load_data=False), row_count)
+        if not USE_LOAD_DATA:
+            logger.info("Skipping LOAD DATA: USE_LOAD_DATA (allow_local_infile) is off in utils/db_config.py")
+        else:
+            timed("bulk_insert LOAD DATA", lambda: load_data(rows), row_count)
+    finally:
+        DatabaseManager.execute_update(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else ROW_COUNT)
@@ -0,0 +1,74 @@
+import sys
+import os
+import time
+import json
+import random
+import logging
+import datetime
+from decimal import Decimal
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils import serialization
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+ROW_COUNT = 5000
+ROUNDS = 20
+
+def generate_ranking(row_count):
+    """
+    Rows shaped like get_ranking_by_time_range results straight from MySQL.
+    """
+    rows = []
+    for i in range(row_count):
+        rows.append({
+            'code': f"{600000 + i:06d}",
+            'name': f"测试{i}",
+            'sector': '测试板块',
+            'amount': Decimal(f"{random.uniform(1e5, 5e8):.2f}"),
+            'change_percent': Decimal(f"{random.uniform(-10, 10):.2f}"),
+            'time': datetime.timedelta(hours=9, minutes=20, seconds=random.randint(0, 59)),
+            'date': datetime.date.today(),
+        })
+    return rows
+
+def hand_converted(rows):
+    """
+    What MarketService used to do before jsonify: convert time/date per row.
+    """
+    result = []
+    for row in rows:
+        item = dict(row)
+        item['time'] = str(item['time'])
+        item['date'] = item['date'].strftime('%Y-%m-%d')
+        result.append(item)
+    return json.dumps(result, default=str, sort_keys=True).encode('utf-8')
+
+def timed(label, func, rounds=ROUNDS):
+    func()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        body = func()
+    elapsed = (time.perf_counter() - start) / rounds
+    logger.info(f"{label:<36} {elapsed * 1000:8.2f} ms  {len(body):>9,} bytes")
+
+def run_benchmark(row_count=ROW_COUNT):
+    rows = generate_ranking(row_count)
+    backend = 'orjson' if serialization.orjson is not None else 'json fallback'
+    logger.info(f"Serializing a {row_count}-row ranking payload ({backend})")
+    timed("hand conversion + json (before)", lambda: hand_converted(rows))
+    timed("serialization.dumps", lambda: serialization.dumps(rows))
+
+    cache = {}
+    def cached():
+        body = cache.get('ranking')
+        if body is None:
+            body = cache['ranking'] = serialization.dumps(rows)
+        return body
+    timed("serialize once, reuse bytes", cached)
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,67 @@
+import sys
+import os
+import csv
+import logging
+import argparse
+
+# Add backend directory to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.database import DatabaseManager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['date', 'time', 'code', 'name', 'sector', 'price', 'bidding_percent', 'bidding_amount',
+           'asking_amount', 'non_asking_amount', 'non_asking_volume', 'yidongleixing']
+
+def export_call_auction(date_str, output_path):
+    """
+    Write every call auction tick of date_str to a CSV file.
+    Rows are streamed from MySQL, so memory use does not grow with the day's size.
+    """
+    query = f"SELECT {', '.join(COLUMNS)} FROM call_auction_data WHERE date = %s ORDER BY time, code"
+    count = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in DatabaseManager.iter_query(query, (date_str,), dictionary=False):
+            writer.writerow(row)
+            count += 1
+    logger.info(f"Exported {count} rows for {date_str} to {output_path}")
+    return count
+
+def verify_call_auction(date_str):
+    """
+    Check a backfilled day: every tick has a code and a non-negative amount,
+    and every minute of the rollup has matching ticks. Streams the rows.
+    """
+    query = "SELECT time, code, bidding_amount FROM call_auction_data WHERE date = %s ORDER BY time"
+    ticks = 0
+    bad_rows = 0
+    minutes = set()
+    for time_val, code, amount in DatabaseManager.iter_query(query, (date_str,), dictionary=False):
+        ticks += 1
+        if not code or amount is None or amount < 0:
+            bad_rows += 1
+        minutes.add(int(time_val.total_seconds()) // 60 * 60)
+
+    rollup = DatabaseManager.execute_query(
+        "SELECT minute FROM call_auction_minute_rollup WHERE date = %s", (date_str,), dictionary=False)
+    missing = [row[0] for row in rollup if int(row[0].total_seconds()) not in minutes]
+
+    logger.info(f"{date_str}: {ticks} ticks in {len(minutes)} minutes, {bad_rows} bad rows, "
+                f"{len(missing)} rollup minutes without ticks")
+    return bad_rows == 0 and not missing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Export or verify a day of call auction data')
+    parser.add_argument('--date', type=str, required=True, help='Trading date (YYYY-MM-DD)')
+    parser.add_argument('--output', type=str, help='CSV file to write (default: call_auction_<date>.csv)')
+    parser.add_argument('--verify', action='store_true', help='Check the day instead of exporting it')
+
+    args = parser.parse_args()
+
+    if args.verify:
+        sys.exit(0 if verify_call_auction(args.date) else 1)
+    export_call_auction(args.date, args.output or f"call_auction_{args.date}.csv")
@@ -14,10 +14,12 @@ if backend_dir not in sys.path:
 
 try:
     from utils.database import DatabaseManager
+    from services.eastmoney_service import EastmoneyService
 except ImportError:
     # Fallback for running from different directories
     sys.path.append(os.path.join(os.getcwd(), 'backend'))
     from utils.database import DatabaseManager
+    from services.eastmoney_service import EastmoneyService
 
 # Configure logging
 logging.basicConfig(
@@ -166,7 +168,8 @@ def main():
         try:
             # We need a context manager for fetch_one
             check_sql = "SELECT COUNT(*) as count FROM call_auction_data WHERE date = %s"
-            result = DatabaseManager.execute_query(check_sql, (date_str,), dictionary=True, fetch_one=True)
+            result = DatabaseManager.execute_query(check_sql, (date_str,), dictionary=True, fetch_one=True,
+                                                   read_your_writes=True)
             if result and result['count'] > 0:
                 logger.info(f"Data already exists for {date_str}, skipping.")
                 current_date += datetime.timedelta(days=1)
@@ -199,6 +202,7 @@ def main():
         if not has_data:
             logger.info(f"No data found for {date_str} (possibly holiday).")
         else:
+            EastmoneyService.rebuild_minute_rollup(date_str)
             logger.info(f"Completed {date_str}: Total {total_inserted} records.")
             
         # Rate limiting between days
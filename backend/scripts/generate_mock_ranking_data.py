@@ -11,10 +11,12 @@ if backend_dir not in sys.path:
 
 try:
     from utils.database import DatabaseManager
+    from services.eastmoney_service import EastmoneyService
 except ImportError:
     # Fallback for running from different directories
     sys.path.append(os.path.join(os.getcwd(), 'backend'))
     from utils.database import DatabaseManager
+    from services.eastmoney_service import EastmoneyService
 
 def generate_mock_data():
     date_str = '2026-02-13'
@@ -85,6 +87,7 @@ def generate_mock_data():
     try:
         # Batch insert
         DatabaseManager.execute_update(insert_sql, new_records, many=True)
+        EastmoneyService.rebuild_minute_rollup(date_str)
         print("Successfully inserted mock data!")
     except Exception as e:
         print(f"Error inserting data: {e}")
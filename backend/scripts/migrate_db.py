@@ -10,6 +10,55 @@ from utils.db_config import get_connection
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def migrate_call_auction_primary_key(cursor):
+    """
+    Replace the auto-increment id of call_auction_data with a clustered
+    (date, time, code) primary key. Duplicate ticks are removed first,
+    keeping the most recently inserted row.
+    """
+    cursor.execute("SHOW KEYS FROM call_auction_data WHERE Key_name = 'PRIMARY'")
+    pk_columns = [row[4] for row in sorted(cursor.fetchall(), key=lambda row: row[3])]
+    if pk_columns == ['date', 'time', 'code']:
+        logger.info("call_auction_data already uses (date, time, code) primary key.")
+        return
+
+    logger.info("Removing duplicate (date, time, code) rows from call_auction_data...")
+    cursor.execute("""
+        DELETE t1 FROM call_auction_data t1
+        JOIN call_auction_data t2
+          ON t1.date = t2.date AND t1.time = t2.time AND t1.code = t2.code AND t1.id < t2.id
+    """)
+    logger.info(f"Removed {cursor.rowcount} duplicate rows.")
+
+    cursor.execute("SHOW INDEX FROM call_auction_data")
+    index_names = {row[2] for row in cursor.fetchall()}
+
+    # (date, time) and (date, time, code) are prefixes of the new primary key
+    alterations = ["DROP COLUMN id", "ADD PRIMARY KEY (date, time, code)"]
+    for redundant in ('idx_date_time', 'idx_date_time_code'):
+        if redundant in index_names:
+            alterations.append(f"DROP INDEX {redundant}")
+
+    logger.info("Rebuilding call_auction_data with (date, time, code) primary key...")
+    cursor.execute(f"ALTER TABLE call_auction_data {', '.join(alterations)}")
+    logger.info("call_auction_data primary key migrated.")
+
+def backfill_minute_rollup(cursor):
+    """
+    Build call_auction_minute_rollup for every date that has raw ticks but no rollup rows.
+    """
+    from services.eastmoney_service import EastmoneyService
+
+    cursor.execute("""
+        SELECT DISTINCT date FROM call_auction_data
+        WHERE date NOT IN (SELECT DISTINCT date FROM call_auction_minute_rollup)
+        ORDER BY date
+    """)
+    dates = [row[0].strftime('%Y-%m-%d') for row in cursor.fetchall()]
+    logger.info(f"Backfilling minute rollup for {len(dates)} date(s)...")
+    for date_str in dates:
+        EastmoneyService.rebuild_minute_rollup(date_str)
+
 def migrate_database():
     """
     Migrate database tables to the correct schemas and add optimized indexes.
@@ -40,6 +89,9 @@ def migrate_database():
                 logger.info(f"Adding column {col} to call_auction_data...")
                 cursor.execute(f"ALTER TABLE call_auction_data ADD COLUMN {col} {definition}")
         
+        # Switch to the natural (date, time, code) primary key so REPLACE upserts
+        migrate_call_auction_primary_key(cursor)
+
         # 2. Migrate yesterday_limit_up
         logger.info("Checking yesterday_limit_up schema...")
         cursor.execute("SHOW COLUMNS FROM yesterday_limit_up")
@@ -65,12 +117,6 @@ def migrate_database():
             logger.info("Added idx_date_code to call_auction_data")
         except mysql.connector.Error as err:
             if err.errno != 1061: raise err # Skip if exists
-            
-        try:
-            cursor.execute("CREATE INDEX idx_date_time_code ON call_auction_data (date, time, code)")
-            logger.info("Added idx_date_time_code to call_auction_data")
-        except mysql.connector.Error as err:
-            if err.errno != 1061: raise err
 
         # Indexes for yesterday_limit_up
         try:
@@ -81,7 +127,8 @@ def migrate_database():
 
         # Ensure other tables exist
         from init_db import TABLES
-        for table_name in ['index_data', 'market_sentiment_stats', 'market_capacity']:
+        for table_name in ['index_data', 'market_sentiment_stats', 'market_capacity', 'call_auction_tick_manifest',
+                           'call_auction_minute_rollup', 'data_versions', 'trading_calendar', 'day_results']:
             try:
                 cursor.execute(TABLES[table_name])
                 logger.info(f"Created table {table_name}")
@@ -92,6 +139,17 @@ def migrate_database():
                     raise err
 
         cnx.commit()
+
+        # The event watcher compares data_versions in full; the updated_at index is unused
+        try:
+            cursor.execute("DROP INDEX idx_updated_at ON data_versions")
+            logger.info("Dropped idx_updated_at from data_versions")
+        except mysql.connector.Error as err:
+            if err.errno != 1091: raise err
+
+        # Backfill the minute rollup for dates ingested before it existed
+        backfill_minute_rollup(cursor)
+
         cursor.close()
         logger.info("Database migration and optimization complete.")
         
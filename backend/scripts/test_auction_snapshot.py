@@ -0,0 +1,216 @@
+"""
+AuctionSnapshot answers the call auction widgets from memory; the rollup
+queries in services/market_service.py answer them from MySQL for other dates.
+These tests feed the same day of ticks to both and compare the results.
+
+The rollup is written the way the ingest path writes it (every code on the
+first tick of a minute, only changed codes after that, upserted with the
+ROLLUP_ON_DUPLICATE rules) into an in-memory SQLite table, and the query
+constants run there unchanged apart from their placeholders.
+"""
+import sys
+import os
+import random
+import sqlite3
+import datetime
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.auction_snapshot import AuctionSnapshot
+from services.market_service import (TOP_N_QUERY, RANKING_QUERY, LIMIT_UP_925_QUERY, LIMIT_DOWN_925_QUERY,
+                                     ABNORMAL_MOVEMENT_925_QUERY)
+
+CODE_PREFIXES = ['600', '000', '300', '688', '830', '430', '920']
+CODE_COUNT = 70
+# Codes listed from this second on only (a late listing in the middle of the 9:18 minute)
+LATE_CODES = 10
+LATE_LISTING = 9 * 3600 + 18 * 60 + 30
+AUCTION_START = 9 * 3600 + 15 * 60
+AUCTION_END = 9 * 3600 + 25 * 60
+TICK_SECONDS = 10
+
+ROLLUP_COLUMNS = ('date', 'minute', 'code', 'name', 'sector',
+                  'first_time', 'first_bidding_percent', 'first_bidding_amount', 'first_asking_amount',
+                  'last_time', 'last_bidding_percent', 'last_bidding_amount', 'last_asking_amount')
+
+
+def _time_str(seconds):
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def _money(value):
+    return f"{float(value):.2f}"
+
+
+def _sqlite(query):
+    return query.replace('%s', '?').replace('%%', '%')
+
+
+def _codes():
+    codes = []
+    for i in range(CODE_COUNT):
+        prefix = CODE_PREFIXES[i % len(CODE_PREFIXES)]
+        codes.append(prefix + str(i).zfill(6 - len(prefix)))
+    return codes
+
+
+def _ticks(date_str, rng):
+    """
+    Full ticks of one auction day as (seconds, rows), rows shaped like the
+    call_auction_data tuples built in save_call_auction_data.
+    """
+    codes = _codes()
+    values = {}
+    for second in range(AUCTION_START, AUCTION_END + 1, TICK_SECONDS):
+        listed = codes if second >= LATE_LISTING else codes[:-LATE_CODES]
+        for i, code in enumerate(listed):
+            if code not in values:
+                percent = rng.uniform(-3, 3)
+            elif rng.random() < 0.3:
+                percent = values[code][0] + rng.uniform(-1.5, 2.5)
+            else:
+                continue
+            percent = round(max(-30.0, min(30.0, percent)), 2)
+            values[code] = (percent, round(rng.uniform(1e6, 2e8), 2), round(rng.uniform(0, 1e7), 2))
+        time_str = _time_str(second)
+        rows = []
+        for i, code in enumerate(listed):
+            name = f"ST{code}" if i % 9 == 4 else f"S{code}"
+            percent, bidding, asking = values[code]
+            rows.append((date_str, time_str, code, name, 'sector', 10.0, percent, bidding, asking, 0, 0, ''))
+        yield second, rows
+
+
+def _upsert_rollup(db, rows, minute):
+    """
+    call_auction_minute_rollup upsert with the ROLLUP_ON_DUPLICATE rules.
+    """
+    for row in rows:
+        date_str, time_str, code, name, sector, _, percent, bidding, asking = row[:9]
+        current = db.execute("SELECT first_time, last_time FROM call_auction_minute_rollup "
+                             "WHERE date = ? AND minute = ? AND code = ?", (date_str, minute, code)).fetchone()
+        if current is None:
+            db.execute(f"INSERT INTO call_auction_minute_rollup ({', '.join(ROLLUP_COLUMNS)}) "
+                       f"VALUES ({', '.join(['?'] * len(ROLLUP_COLUMNS))})",
+                       (date_str, minute, code, name, sector, time_str, percent, bidding, asking,
+                        time_str, percent, bidding, asking))
+            continue
+        first_time, last_time = current
+        db.execute("UPDATE call_auction_minute_rollup SET name = ?, sector = ? "
+                   "WHERE date = ? AND minute = ? AND code = ?", (name, sector, date_str, minute, code))
+        if time_str < first_time:
+            db.execute("UPDATE call_auction_minute_rollup SET first_time = ?, first_bidding_percent = ?, "
+                       "first_bidding_amount = ?, first_asking_amount = ? "
+                       "WHERE date = ? AND minute = ? AND code = ?",
+                       (time_str, percent, bidding, asking, date_str, minute, code))
+        if time_str >= last_time:
+            db.execute("UPDATE call_auction_minute_rollup SET last_time = ?, last_bidding_percent = ?, "
+                       "last_bidding_amount = ?, last_asking_amount = ? "
+                       "WHERE date = ? AND minute = ? AND code = ?",
+                       (time_str, percent, bidding, asking, date_str, minute, code))
+
+
+class TestSnapshotMatchesRollup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.date = datetime.date.today().strftime('%Y-%m-%d')
+        cls.db = sqlite3.connect(':memory:')
+        cls.db.execute(f"CREATE TABLE call_auction_minute_rollup ({', '.join(ROLLUP_COLUMNS)}, "
+                       f"PRIMARY KEY (date, minute, code))")
+
+        # Ingest: the snapshot gets the diffed rows, the rollup every code on a minute's first tick
+        AuctionSnapshot._reset(cls.date)
+        previous = {}
+        last_minute = None
+        for second, rows in _ticks(cls.date, random.Random(925)):
+            changed = [row for row in rows if previous.get(row[2]) != row[3:]]
+            previous.update((row[2], row[3:]) for row in rows)
+            minute = _time_str(second // 60 * 60)
+            _upsert_rollup(cls.db, rows if minute != last_minute else changed, minute)
+            last_minute = minute
+            AuctionSnapshot.apply_tick(cls.date, _time_str(second), changed)
+        cls.db.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.db.close()
+        AuctionSnapshot._reset(None)
+
+    def _query(self, query, params):
+        cursor = self.db.execute(_sqlite(query), params)
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    def test_top_n(self):
+        expected = self._query(TOP_N_QUERY, (self.date, 20))
+        top, history = AuctionSnapshot.top_n(20)
+        self.assertEqual(len(expected), 20)
+        self.assertEqual([item['code'] for item in top], [row['code'] for row in expected])
+        for item, row in zip(top, expected):
+            self.assertEqual(_money(item['amount']), _money(row['amount']))
+            self.assertEqual(_money(item['change_percent']), _money(row['change_percent']))
+            self.assertEqual(_money(history[item['code']]['920']), _money(row['amount_920']))
+            if row['amount_915'] is None:
+                self.assertNotIn('915', history.get(item['code'], {}))
+            else:
+                self.assertEqual(_money(history[item['code']]['915']), _money(row['amount_915']))
+
+    def test_ranking(self):
+        for start, end in (('09:15:00', '09:16:00'), ('09:20:00', '09:21:00')):
+            expected = self._query(RANKING_QUERY, (self.date, self.date, start, end, 30))
+            result = AuctionSnapshot.ranking(start, end, 30)
+            self.assertEqual([item['code'] for item in result], [row['code'] for row in expected])
+            self.assertEqual([_money(item['amount']) for item in result],
+                             [_money(row['amount']) for row in expected])
+
+    def test_limit_up_and_down(self):
+        for query, direction in ((LIMIT_UP_925_QUERY, 1), (LIMIT_DOWN_925_QUERY, -1)):
+            expected = self._query(query, (self.date,))
+            result = AuctionSnapshot.limit_925(direction)
+            self.assertEqual([(item['code'], _money(item['change_percent']), _money(item['amount']))
+                              for item in result],
+                             [(row['code'], _money(row['change_percent']), _money(row['amount']))
+                              for row in expected])
+        self.assertTrue(self._query(LIMIT_UP_925_QUERY, (self.date,)), "fixture has no limit up stocks")
+
+    def test_abnormal_movement(self):
+        expected = self._query(ABNORMAL_MOVEMENT_925_QUERY, (self.date, 10))
+        result = AuctionSnapshot.abnormal_movement_925(10)
+        self.assertTrue(expected, "fixture has no abnormal movements")
+        self.assertEqual([(item['code'], _money(item['amplitude'])) for item in result],
+                         [(row['code'], _money(row['amplitude'])) for row in expected])
+
+
+class TestSnapshotRewrite(unittest.TestCase):
+    def setUp(self):
+        self.date = datetime.date.today().strftime('%Y-%m-%d')
+        AuctionSnapshot._reset(self.date)
+
+    def tearDown(self):
+        AuctionSnapshot._reset(None)
+
+    def _row(self, time_str, code, percent):
+        return (self.date, time_str, code, f"S{code}", 'sector', 10.0, percent, 1e7, 1e6, 0, 0, '')
+
+    def test_rewritten_tick_replaces_rows(self):
+        """
+        A full snapshot written again under an earlier tick's time replaces the
+        rows held for that time, and later ticks still win over it.
+        """
+        AuctionSnapshot.apply_tick(self.date, '09:25:00', [self._row('09:25:00', '600001', 1.0),
+                                                          self._row('09:25:00', '600002', 2.0)])
+        AuctionSnapshot.apply_tick(self.date, '09:25:00', [self._row('09:25:00', '600001', 3.0)], replace=True)
+        result = AuctionSnapshot.ranking('09:25:00', '09:26:00', 10)
+        self.assertEqual([(item['code'], _money(item['change_percent'])) for item in result], [('600001', '3.00')])
+
+    def test_ticks_are_ignored_until_synced(self):
+        AuctionSnapshot._reset(None)
+        AuctionSnapshot.apply_tick(self.date, '09:15:00', [self._row('09:15:00', '600001', 1.0)])
+        self.assertIsNone(AuctionSnapshot._date)
+        self.assertEqual(AuctionSnapshot._pending, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+import sys
+import os
+import time
+import fnmatch
+import datetime
+import threading
+import unittest
+from decimal import Decimal
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.cache import CacheManager
+from utils.cache_backends import RedisCacheBackend, encode, decode
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the subset of redis.Redis used by RedisCacheBackend.
+    """
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def _alive(self, name):
+        expires_at = self.expires.get(name)
+        if expires_at is not None and time.time() > expires_at:
+            self.data.pop(name, None)
+            self.expires.pop(name, None)
+        return name in self.data
+
+    def get(self, name):
+        with self.lock:
+            return self.data[name] if self._alive(name) else None
+
+    def set(self, name, value, ex=None, nx=False):
+        with self.lock:
+            if nx and self._alive(name):
+                return None
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            self.data[name] = value
+            self.expires[name] = time.time() + ex if ex else None
+            return True
+
+    def delete(self, *names):
+        with self.lock:
+            for name in names:
+                self.data.pop(name, None)
+                self.expires.pop(name, None)
+
+    def scan_iter(self, match='*', count=None):
+        with self.lock:
+            names = [name for name in self.data if self._alive(name)]
+        pattern = match.replace('\\', '')
+        return [name for name in names if fnmatch.fnmatchcase(name, pattern)]
+
+
+class TestSerialization(unittest.TestCase):
+    def test_round_trip_keeps_types(self):
+        value = [{
+            'code': '600000',
+            'price': Decimal('10.05'),
+            'amount': Decimal('123456789.00'),
+            'date': datetime.date(2024, 1, 2),
+            'updated_at': datetime.datetime(2024, 1, 2, 9, 25, 3),
+            'time': datetime.timedelta(hours=9, minutes=25),
+            'first_limit_up_time': datetime.time(9, 30, 1),
+            'is_20cm': False,
+            'history': None,
+        }]
+        result = decode(encode(value))
+        self.assertEqual(result, value)
+        self.assertIsInstance(result[0]['price'], Decimal)
+        self.assertEqual(str(result[0]['price']), '10.05')
+
+    def test_empty_values(self):
+        self.assertEqual(decode(encode([])), [])
+        self.assertEqual(decode(encode({})), {})
+        self.assertIsNone(decode(encode(None)))
+
+
+class TestRedisCacheManager(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+        CacheManager.configure(RedisCacheBackend(self.client, prefix='test:'))
+
+    def tearDown(self):
+        CacheManager.configure(None)
+
+    def test_entries_are_shared_between_workers(self):
+        CacheManager.set('top_n:2024-01-02:None:50', [{'amount': Decimal('1.50')}], ttl=60)
+        # A second worker process sees the same client
+        other = RedisCacheBackend(self.client, prefix='test:')
+        found, value = other.get('top_n:2024-01-02:None:50')
+        self.assertTrue(found)
+        self.assertEqual(value, [{'amount': Decimal('1.50')}])
+
+    def test_cached_empty_is_not_a_miss(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return []
+
+        for _ in range(3):
+            self.assertEqual(CacheManager.get_or_compute('limit_down_925:2024-01-02', compute, ttl=5), [])
+        self.assertEqual(len(calls), 1)
+
+    def test_delete_prefix(self):
+        CacheManager.set('ranking:2024-01-02:09:15:00:09:16:00:50', [1])
+        CacheManager.set('ranking:2024-01-03:09:15:00:09:16:00:50', [2])
+        self.assertEqual(CacheManager.delete_prefix('ranking:2024-01-02'), 1)
+        self.assertIsNone(CacheManager.get('ranking:2024-01-02:09:15:00:09:16:00:50'))
+        self.assertEqual(CacheManager.get('ranking:2024-01-03:09:15:00:09:16:00:50'), [2])
+
+    def test_lock_held_elsewhere_waits_for_value(self):
+        key = 'market_sentiment_925:2024-01-02'
+        other = RedisCacheBackend(self.client, prefix='test:')
+        token = other.acquire_lock(key, 30)
+
+        def other_worker():
+            time.sleep(0.2)
+            other.set(key, {'today': None}, 60)
+            other.release_lock(key, token)
+
+        thread = threading.Thread(target=other_worker)
+        thread.start()
+        calls = []
+        value = CacheManager.get_or_compute(key, lambda: calls.append(1) or {'today': 'local'}, ttl=60)
+        thread.join()
+        self.assertEqual(value, {'today': None})
+        self.assertEqual(calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
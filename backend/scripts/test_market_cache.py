@@ -0,0 +1,274 @@
+import sys
+import os
+import time
+import datetime
+import threading
+import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.cache import CacheManager, MISSING
+from utils.database import DatabaseManager
+from utils.events import EventBus, CALL_AUCTION, LIMIT_UP
+from utils.trading_calendar import TradingCalendar
+from services.day_result_store import DayResultStore
+from services.market_service import MarketService
+
+
+class LocalCacheTestCase(unittest.TestCase):
+    """
+    Runs against a fresh in-process cache.
+    """
+    def setUp(self):
+        CacheManager.configure(None)
+        CacheManager.clear()
+        CacheManager._stats.clear()
+        CacheManager._coalesced_by_minute.clear()
+
+    def tearDown(self):
+        CacheManager.clear()
+
+
+class TestSingleFlight(LocalCacheTestCase):
+    CALLERS = 8
+
+    def _run_concurrently(self, key, compute):
+        """
+        Start CALLERS threads on get_or_compute(key) and return their results (or exceptions).
+        """
+        results = [None] * self.CALLERS
+
+        def call(i):
+            try:
+                results[i] = CacheManager.get_or_compute(key, compute, ttl=5)
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(self.CALLERS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        return results
+
+    def test_concurrent_misses_compute_once(self):
+        calls = []
+        release = threading.Event()
+
+        def compute():
+            calls.append(1)
+            # Hold the flight open until every caller has missed
+            release.wait(5)
+            return [{'code': '600000'}]
+
+        threading.Timer(0.3, release.set).start()
+        results = self._run_concurrently('top_n:2024-01-02:None:50', compute)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[{'code': '600000'}]] * self.CALLERS)
+        stats = CacheManager.stats()['top_n']
+        self.assertEqual(stats['computes'], 1)
+        self.assertEqual(stats['coalesced'], self.CALLERS - 1)
+        self.assertEqual(sum(CacheManager.coalesced_by_minute().values()), self.CALLERS - 1)
+
+    def test_waiters_get_the_leaders_error(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            raise RuntimeError('database down')
+
+        results = self._run_concurrently('market_sentiment_925:2024-01-02', compute)
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+    def test_different_keys_compute_separately(self):
+        calls = []
+        for key in ('ranking:2024-01-02:a', 'ranking:2024-01-02:b'):
+            CacheManager.get_or_compute(key, lambda: calls.append(1) or [1], ttl=5)
+        self.assertEqual(len(calls), 2)
+
+    def test_invalidation_during_compute_is_not_cached(self):
+        key = 'top_n:2024-01-02:None:50'
+
+        def compute():
+            # New data lands while the old rows are being read
+            CacheManager.delete_prefix('top_n:2024-01-02')
+            return ['stale']
+
+        self.assertEqual(CacheManager.get_or_compute(key, compute, ttl=5), ['stale'])
+        self.assertIsNone(CacheManager.get(key))
+
+
+class TestNegativeCaching(LocalCacheTestCase):
+    def test_empty_result_is_cached(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return []
+
+        for _ in range(3):
+            self.assertEqual(CacheManager.get_or_compute('limit_down_925:2024-01-02', compute, ttl=5), [])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(CacheManager.stats()['limit_down_925']['empty_hits'], 2)
+
+    def test_cached_empty_is_not_missing(self):
+        CacheManager.set('abnormal_movement_925:2024-01-02:10', [], ttl=5)
+        self.assertEqual(CacheManager.get('abnormal_movement_925:2024-01-02:10', MISSING), [])
+        self.assertIs(CacheManager.get('abnormal_movement_925:2024-01-03:10', MISSING), MISSING)
+
+    def test_empty_result_uses_empty_ttl(self):
+        CacheManager.get_or_compute('limit_up_925:2024-01-02', lambda: [], ttl=300, empty_ttl=0.2)
+        CacheManager.get_or_compute('limit_up_925:2024-01-03', lambda: [1], ttl=300, empty_ttl=0.2)
+        time.sleep(0.3)
+        self.assertIsNone(CacheManager.get('limit_up_925:2024-01-02'))
+        self.assertEqual(CacheManager.get('limit_up_925:2024-01-03'), [1])
+
+    def test_exception_is_not_cached(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError('database down')
+            return [1]
+
+        with self.assertRaises(RuntimeError):
+            CacheManager.get_or_compute('top_n:2024-01-02:None:50', compute, ttl=5)
+        self.assertEqual(CacheManager.get_or_compute('top_n:2024-01-02:None:50', compute, ttl=5), [1])
+        self.assertEqual(len(calls), 2)
+
+
+class FakeDayResults:
+    """
+    In-memory day_results table behind DatabaseManager.transaction() and execute_query().
+    """
+    def __init__(self):
+        self.rows = {}
+
+    @contextmanager
+    def transaction(self):
+        yield self
+
+    def execute(self, query, params=None, name=None):
+        if query.startswith('DELETE FROM day_results'):
+            self.rows = {key: row for key, row in self.rows.items() if row['date'] != params[0]}
+        return 0
+
+    def bulk_insert(self, table, columns, rows, **kwargs):
+        for row in rows:
+            entry = dict(zip(columns, row))
+            self.rows[entry['cache_key']] = entry
+        return len(rows)
+
+    def execute_query(self, query, params=None, fetch_one=False, **kwargs):
+        return self.rows.get(params[0])
+
+
+class EventTestCase(LocalCacheTestCase):
+    """
+    Local cache plus an event bus and trading calendar held in memory.
+    """
+    DAYS = ['2024-01-02', '2024-01-03', '2024-01-05']
+
+    def setUp(self):
+        super().setUp()
+        patchers = [
+            patch.object(EventBus, '_ensure_watcher', lambda: None),
+            patch.object(EventBus, '_versions', {}),
+            patch.object(EventBus, '_changed_at', {}),
+            patch.object(EventBus, '_loaded', True),
+            patch.object(TradingCalendar, '_days', list(self.DAYS)),
+            patch.object(TradingCalendar, '_loaded', True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _cache(self, *keys):
+        for key in keys:
+            CacheManager.set(key, [key])
+
+    def _cached_keys(self, *keys):
+        return [key for key in keys if CacheManager.get(key) is not None]
+
+
+class TestEventInvalidation(EventTestCase):
+    def test_limit_up_event_clears_next_trading_day(self):
+        keys = ('yesterday_limit_up:2024-01-02', 'top_n:2024-01-02:None:50',
+                'top_n:2024-01-03:None:50', 'day_context:2024-01-03', 'dashboard_bundle:2024-01-03:50',
+                'limit_up_925:2024-01-03', 'top_n:2024-01-05:None:50')
+        self._cache(*keys)
+        EventBus._dispatch(LIMIT_UP, '2024-01-02', 1)
+        self.assertEqual(self._cached_keys(*keys), ['top_n:2024-01-02:None:50', 'top_n:2024-01-05:None:50'])
+
+    def test_call_auction_event_clears_its_date_only(self):
+        keys = ('top_n:2024-01-02:None:50', 'ranking:2024-01-02:09:15:00:09:16:00:50',
+                'dashboard_bundle:2024-01-02:50', 'yesterday_limit_up:2024-01-02',
+                'top_n:2024-01-03:None:50', 'day_context:2024-01-03')
+        self._cache(*keys)
+        EventBus._dispatch(CALL_AUCTION, '2024-01-02', 1)
+        self.assertEqual(self._cached_keys(*keys),
+                         ['yesterday_limit_up:2024-01-02', 'top_n:2024-01-03:None:50', 'day_context:2024-01-03'])
+
+    def test_each_version_is_dispatched_once(self):
+        self._cache('top_n:2024-01-02:None:50')
+        EventBus._dispatch(CALL_AUCTION, '2024-01-02', 2)
+        self._cache('top_n:2024-01-02:None:50')
+        # The watcher seeing the same (or an older) version again changes nothing
+        EventBus._dispatch(CALL_AUCTION, '2024-01-02', 2)
+        EventBus._dispatch(CALL_AUCTION, '2024-01-02', 1)
+        self.assertEqual(self._cached_keys('top_n:2024-01-02:None:50'), ['top_n:2024-01-02:None:50'])
+
+
+class TestClosedDays(EventTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = FakeDayResults()
+        for name in ('transaction', 'execute_query'):
+            patcher = patch.object(DatabaseManager, name, getattr(self.db, name))
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _expiry(self, key):
+        return CacheManager._namespaces[CacheManager._namespace(key)][key][1]
+
+    def test_closed_day_never_expires(self):
+        today = datetime.date.today().strftime('%Y-%m-%d')
+        MarketService._cached('top_n:2024-01-02:None:50', '2024-01-02', lambda: [1], ttl=5)
+        MarketService._cached(f"top_n:{today}:None:50", today, lambda: [1], ttl=5)
+        self.assertIsNone(self._expiry('top_n:2024-01-02:None:50'))
+        self.assertIsNotNone(self._expiry(f"top_n:{today}:None:50"))
+
+    def test_stored_result_is_served_without_computing(self):
+        DayResultStore.save('2024-01-02', {'top_n:2024-01-02:None:50': [{'code': '600000'}]},
+                            EventBus.version_tag('2024-01-02'))
+        calls = []
+        value = MarketService._cached('top_n:2024-01-02:None:50', '2024-01-02',
+                                      lambda: calls.append(1) or ['live'], ttl=5)
+        self.assertEqual(value, [{'code': '600000'}])
+        self.assertEqual(calls, [])
+
+    def test_stored_result_of_an_older_version_is_ignored(self):
+        DayResultStore.save('2024-01-02', {'top_n:2024-01-02:None:50': ['stored']},
+                            EventBus.version_tag('2024-01-02'))
+        # A late correction to the day's ticks
+        EventBus._dispatch(CALL_AUCTION, '2024-01-02', 1)
+        self.assertEqual(DayResultStore.load('top_n:2024-01-02:None:50', '2024-01-02'), (False, None))
+        value = MarketService._cached('top_n:2024-01-02:None:50', '2024-01-02', lambda: ['live'], ttl=5)
+        self.assertEqual(value, ['live'])
+
+    def test_save_replaces_the_days_results(self):
+        tag = EventBus.version_tag('2024-01-02')
+        DayResultStore.save('2024-01-02', {'top_n:2024-01-02:None:50': [1], 'ranking:2024-01-02:a': [2]}, tag)
+        DayResultStore.save('2024-01-02', {'top_n:2024-01-02:None:50': [3]}, tag)
+        self.assertEqual(DayResultStore.load('top_n:2024-01-02:None:50', '2024-01-02'), (True, [3]))
+        self.assertEqual(DayResultStore.load('ranking:2024-01-02:a', '2024-01-02'), (False, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,258 @@
+"""
+Plan regression tests for the call auction queries.
+
+Loads synthetic ticks into a scratch database on a local MySQL 8 server, then
+checks that every query reads its tables through an index (no full scans in
+EXPLAIN) and that the rows it examines stay close to the rows of the one date
+it asks for. Skipped when no server is reachable.
+
+Connection settings come from PLAN_TEST_DB_HOST / PLAN_TEST_DB_USER /
+PLAN_TEST_DB_PASSWORD (defaults match utils/db_config.py).
+"""
+import sys
+import os
+import random
+import datetime
+import unittest
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import mysql.connector
+
+# The application's connection pool is only opened on first use, so importing the
+# services is safe; the tests run the query constants on their own connection
+from init_db import TABLES
+from services.market_service import (TOP_N_QUERY, RANKING_QUERY, LIMIT_UP_925_QUERY, LIMIT_DOWN_925_QUERY,
+                                     ABNORMAL_MOVEMENT_925_QUERY)
+from services.eastmoney_service import EastmoneyService, REBUILD_ROLLUP_QUERY, CALL_AUCTION_COLUMNS
+
+TEST_DB = 'jingjiabushou_plan_test'
+DATES = ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05', '2024-01-08', '2024-01-09']
+TARGET_DATE = DATES[2]
+# Written tick by tick in diff mode by test_rebuild_matches_ingest
+DIFF_DATE = '2024-01-10'
+CODE_COUNT = 500
+TICKS_PER_MINUTE = 3
+MINUTES = [datetime.timedelta(hours=9, minutes=m) for m in range(15, 26)]
+CODE_PREFIXES = ['600', '000', '300', '688', '830']
+
+
+def _codes():
+    codes = []
+    for i in range(CODE_COUNT):
+        prefix = CODE_PREFIXES[i % len(CODE_PREFIXES)]
+        codes.append(prefix + str(i).zfill(6 - len(prefix)))
+    return codes
+
+
+class _CursorTransaction:
+    """
+    The part of utils.database.Transaction the ingest rollup writes use, on the test connection.
+    """
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def bulk_insert(self, table, columns, rows, on_duplicate=None, **kwargs):
+        query = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))})"
+                 f" ON DUPLICATE KEY UPDATE {on_duplicate}")
+        self.cursor.executemany(query, rows)
+        return len(rows)
+
+
+def _ticks(date_str, codes, rng):
+    for code in codes:
+        name = f"ST{code}" if code.endswith('7') else f"S{code}"
+        percent = rng.uniform(-5, 5)
+        for minute in MINUTES:
+            for tick in range(TICKS_PER_MINUTE):
+                percent = max(-30.0, min(30.0, percent + rng.uniform(-1.5, 2.0)))
+                time_val = minute + datetime.timedelta(seconds=tick * 20 + rng.randint(0, 9))
+                yield (date_str, str(time_val), code, name, 'sector', 10.0, round(percent, 2),
+                       round(rng.uniform(1e6, 2e8), 2), round(rng.uniform(0, 1e7), 2), 0, 0, '')
+
+
+class TestQueryPlans(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        try:
+            cls.cnx = mysql.connector.connect(
+                host=os.environ.get('PLAN_TEST_DB_HOST', '127.0.0.1'),
+                user=os.environ.get('PLAN_TEST_DB_USER', 'root'),
+                password=os.environ.get('PLAN_TEST_DB_PASSWORD', 'root'))
+        except mysql.connector.Error as err:
+            raise unittest.SkipTest(f"No MySQL server available: {err}")
+
+        cursor = cls.cnx.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+        cursor.execute(f"CREATE DATABASE {TEST_DB} DEFAULT CHARACTER SET 'utf8mb4'")
+        cls.cnx.database = TEST_DB
+        for table_name in ('call_auction_data', 'call_auction_minute_rollup'):
+            cursor.execute(TABLES[table_name])
+
+        rng = random.Random(925)
+        codes = _codes()
+        insert = ("INSERT INTO call_auction_data (date, time, code, name, sector, price, bidding_percent, "
+                  "bidding_amount, asking_amount, non_asking_amount, non_asking_volume, yidongleixing) "
+                  "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)")
+        for date_str in DATES:
+            cursor.executemany(insert, list(_ticks(date_str, codes, rng)))
+            cursor.execute(REBUILD_ROLLUP_QUERY, (date_str, date_str))
+        cls.cnx.commit()
+        cursor.execute("ANALYZE TABLE call_auction_data, call_auction_minute_rollup")
+        cursor.fetchall()
+        cursor.close()
+
+        cls.ticks_per_date = CODE_COUNT * len(MINUTES) * TICKS_PER_MINUTE
+        cls.rollup_per_date = CODE_COUNT * len(MINUTES)
+
+    @classmethod
+    def tearDownClass(cls):
+        cursor = cls.cnx.cursor()
+        cursor.execute(f"DROP DATABASE IF EXISTS {TEST_DB}")
+        cursor.close()
+        cls.cnx.close()
+
+    def _rows_examined(self, query, params):
+        """
+        Runs query and returns (rows, handler reads) for this session.
+        """
+        cursor = self.cnx.cursor(dictionary=True)
+        status = "SHOW SESSION STATUS LIKE 'Handler_read%'"
+        cursor.execute(status)
+        before = sum(int(row['Value']) for row in cursor.fetchall())
+        cursor.execute(query, params)
+        rows = cursor.fetchall() if cursor.with_rows else []
+        cursor.execute(status)
+        after = sum(int(row['Value']) for row in cursor.fetchall())
+        cursor.close()
+        self.cnx.rollback()
+        return rows, after - before
+
+    def _assert_no_full_scan(self, query, params):
+        cursor = self.cnx.cursor(dictionary=True)
+        cursor.execute("EXPLAIN " + query, params)
+        plan = cursor.fetchall()
+        cursor.close()
+        for step in plan:
+            table = step.get('table') or ''
+            # Derived tables are the query's own intermediate results
+            if table.startswith('<'):
+                continue
+            self.assertNotEqual(step['type'], 'ALL', f"Full scan of {table}: {plan}")
+            self.assertIsNotNone(step['key'], f"No index used on {table}: {plan}")
+
+    def _check(self, query, params, max_rows_examined):
+        self._assert_no_full_scan(query, params)
+        rows, examined = self._rows_examined(query, params)
+        self.assertLessEqual(examined, max_rows_examined,
+                             f"Examined {examined} rows, budget {max_rows_examined}")
+        return rows
+
+    def test_top_n(self):
+        rows = self._check(TOP_N_QUERY, (TARGET_DATE, 50), 2 * CODE_COUNT + 4 * 50)
+        self.assertEqual(len(rows), 50)
+        self.assertTrue(all(row['amount_915'] is not None and row['amount_920'] is not None for row in rows))
+        amounts = [row['amount'] for row in rows]
+        self.assertEqual(amounts, sorted(amounts, reverse=True))
+
+    def test_ranking(self):
+        rows = self._check(RANKING_QUERY, (TARGET_DATE, TARGET_DATE, '09:15:00', '09:16:00', 50),
+                           3 * CODE_COUNT)
+        self.assertEqual(len(rows), 50)
+
+    def test_limit_up_and_down(self):
+        self._check(LIMIT_UP_925_QUERY, (TARGET_DATE,), 2 * CODE_COUNT)
+        self._check(LIMIT_DOWN_925_QUERY, (TARGET_DATE,), 2 * CODE_COUNT)
+
+    def test_abnormal_movement(self):
+        rows = self._check(ABNORMAL_MOVEMENT_925_QUERY, (TARGET_DATE, 10), 3 * self.rollup_per_date)
+        self.assertLessEqual(len(rows), 10)
+
+        # Same result as comparing against each stock's first tick directly
+        cursor = self.cnx.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT r.code, r.last_bidding_percent - f.bidding_percent as amplitude, r.last_bidding_amount as amount
+        FROM call_auction_minute_rollup r
+        JOIN call_auction_data f ON f.date = r.date AND f.code = r.code
+         AND f.time = (SELECT MIN(time) FROM call_auction_data WHERE date = r.date AND code = r.code)
+        WHERE r.date = %s AND r.minute = '09:25:00'
+        """, (TARGET_DATE,))
+        expected = sorted((row for row in cursor.fetchall()
+                           if row['amplitude'] >= 5 and row['amount'] >= 50000000),
+                          key=lambda row: row['amplitude'], reverse=True)[:10]
+        cursor.close()
+        self.assertEqual([row['amplitude'] for row in rows], [row['amplitude'] for row in expected])
+
+    def test_rebuild_rollup(self):
+        params = (TARGET_DATE, TARGET_DATE)
+        _, examined = self._rows_examined(REBUILD_ROLLUP_QUERY, params)
+        self._assert_no_full_scan(REBUILD_ROLLUP_QUERY, params)
+        # Two grouping scans of the date's ticks, then a handful of index lookups per (minute, code)
+        self.assertLessEqual(examined, 3 * self.ticks_per_date + 8 * self.rollup_per_date)
+
+        # Every code ticks every minute here, so each minute ends on the code's own last tick
+        cursor = self.cnx.cursor(dictionary=True)
+        cursor.execute("""
+        SELECT COUNT(*) as n FROM call_auction_minute_rollup r
+        JOIN call_auction_data l ON l.date = r.date AND l.code = r.code AND l.time = r.last_time
+        WHERE r.date = %s
+          AND l.time = (SELECT MAX(time) FROM call_auction_data x
+                        WHERE x.date = r.date AND x.code = r.code
+                          AND x.time >= r.minute AND x.time < ADDTIME(r.minute, '00:01:00'))
+          AND r.last_bidding_percent = l.bidding_percent
+        """, (TARGET_DATE,))
+        self.assertEqual(cursor.fetchone()['n'], self.rollup_per_date)
+        cursor.close()
+
+    def _rollup(self, date_str):
+        cursor = self.cnx.cursor()
+        cursor.execute("SELECT * FROM call_auction_minute_rollup WHERE date = %s ORDER BY minute, code", (date_str,))
+        rows = cursor.fetchall()
+        cursor.close()
+        return rows
+
+    def test_rebuild_matches_ingest(self):
+        """
+        A day written the way the ingest path writes it (diff-mode ticks plus
+        the per-tick rollup upserts) rebuilds to the same rollup table.
+        """
+        rng = random.Random(930)
+        codes = _codes()[:100]
+        values = {}
+        insert = (f"INSERT INTO call_auction_data ({', '.join(CALL_AUCTION_COLUMNS)}) "
+                  f"VALUES ({', '.join(['%s'] * len(CALL_AUCTION_COLUMNS))})")
+        cursor = self.cnx.cursor()
+        tx = _CursorTransaction(cursor)
+        start = 9 * 3600 + 15 * 60
+        for second in range(start, start + 10 * 60 + 1, 10):
+            record_time = f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"
+            # A tenth of the codes move each tick, the last ones only list from 09:18:30
+            listed = codes if second >= start + 210 else codes[:80]
+            for code in listed:
+                if code not in values or rng.random() < 0.1:
+                    values[code] = (round(rng.uniform(-5, 5), 2), round(rng.uniform(1e6, 2e8), 2),
+                                    round(rng.uniform(0, 1e7), 2))
+            db_data = [(DIFF_DATE, record_time, code, f"S{code}", 'sector', 10.0) + values[code] + (0, 0, '')
+                       for code in listed]
+
+            changed, state, full = EastmoneyService._diff_against_previous_tick(DIFF_DATE, record_time, db_data)
+            minute = record_time[:5] + ':00'
+            rollup_source = db_data if EastmoneyService._is_new_minute(DIFF_DATE, minute) else changed
+            if changed:
+                cursor.executemany(insert, changed)
+            EastmoneyService._save_minute_rollup(tx, rollup_source, minute)
+            EastmoneyService._commit_tick_state(DIFF_DATE, record_time, minute, state, full)
+        self.cnx.commit()
+        ingested = self._rollup(DIFF_DATE)
+        self.assertEqual(len(ingested), 80 * 11 + 20 * 8)
+
+        cursor.execute("DELETE FROM call_auction_minute_rollup WHERE date = %s", (DIFF_DATE,))
+        cursor.execute(REBUILD_ROLLUP_QUERY, (DIFF_DATE, DIFF_DATE))
+        self.cnx.commit()
+        cursor.close()
+        self.assertEqual(self._rollup(DIFF_DATE), ingested)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+# Add backend to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.database import DatabaseManager
+from utils.events import EventBus, CALL_AUCTION
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.rowcount = 0
+
+    def execute(self, query, params=None):
+        self.log.append(('execute', query.split()[0]))
+        self.rowcount = 1
+
+    def executemany(self, query, params_list):
+        self.log.append(('executemany', len(params_list)))
+        self.rowcount = len(params_list)
+
+    def fetchone(self):
+        # LAST_INSERT_ID() after a data_versions bump
+        return (7,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """
+    Records statements, commits and rollbacks in a shared log.
+    """
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self, dictionary=False):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append('commit')
+
+    def rollback(self):
+        self.log.append('rollback')
+
+    def close(self):
+        self.log.append('close')
+
+
+class TransactionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.log = []
+        patcher = patch('utils.database.get_connection', lambda read_only=False: FakeConnection(self.log))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestAfterCommit(TransactionTestCase):
+    def test_callbacks_run_after_commit_in_order(self):
+        with DatabaseManager.transaction() as tx:
+            tx.execute("DELETE FROM call_auction_data WHERE date = %s", ('2024-01-02',))
+            tx.after_commit(lambda: self.log.append('first'))
+            tx.after_commit(lambda: self.log.append('second'))
+            self.assertNotIn('first', self.log)
+        self.assertEqual(self.log, [('execute', 'DELETE'), 'commit', 'close', 'first', 'second'])
+
+    def test_callbacks_do_not_run_on_rollback(self):
+        with self.assertRaises(RuntimeError):
+            with DatabaseManager.transaction() as tx:
+                tx.execute_batch("INSERT INTO limit_up_data VALUES (%s)", [(1,), (2,)])
+                tx.after_commit(lambda: self.log.append('callback'))
+                raise RuntimeError('write failed')
+        self.assertEqual(self.log, [('executemany', 2), 'rollback', 'close'])
+
+    def test_failing_callback_does_not_stop_the_others(self):
+        def fail():
+            raise RuntimeError('listener down')
+
+        with DatabaseManager.transaction() as tx:
+            tx.after_commit(fail)
+            tx.after_commit(lambda: self.log.append('second'))
+        self.assertEqual(self.log, ['commit', 'close', 'second'])
+
+
+class TestPublishInTransaction(TransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = []
+        patchers = [
+            patch.object(EventBus, '_ensure_watcher', lambda: None),
+            patch.object(EventBus, '_versions', {}),
+            patch.object(EventBus, '_changed_at', {}),
+            patch.object(EventBus, '_subscribers', set()),
+            patch.object(EventBus, '_listeners', [self._listener]),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _listener(self, dataset, date_str, version):
+        self.log.append(('dispatch', dataset, date_str, version))
+
+    def test_dispatch_waits_for_commit(self):
+        with DatabaseManager.transaction() as tx:
+            self.assertEqual(EventBus.publish(CALL_AUCTION, '2024-01-02', tx), 7)
+            self.assertNotIn('commit', self.log)
+            self.assertEqual([entry for entry in self.log if entry[0] == 'dispatch'], [])
+        self.assertEqual(self.log[-3:], ['commit', 'close', ('dispatch', CALL_AUCTION, '2024-01-02', 7)])
+
+    def test_rolled_back_publish_is_not_dispatched(self):
+        with self.assertRaises(RuntimeError):
+            with DatabaseManager.transaction() as tx:
+                EventBus.publish(CALL_AUCTION, '2024-01-02', tx)
+                raise RuntimeError('write failed')
+        self.assertEqual(self.log[-2:], ['rollback', 'close'])
+        self.assertNotIn(('dispatch', CALL_AUCTION, '2024-01-02', 7), self.log)
+        self.assertEqual(EventBus._versions, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -29,15 +29,7 @@ def update_indexes():
                 logger.info("idx_date_code already exists on call_auction_data.")
             else:
                 logger.error(f"Error adding idx_date_code to call_auction_data: {err}")
-        
-        try:
-            cursor.execute("CREATE INDEX idx_date_time_code ON call_auction_data (date, time, code)")
-            logger.info("Added idx_date_time_code to call_auction_data.")
-        except mysql.connector.Error as err:
-            if err.errno == 1061:
-                logger.info("idx_date_time_code already exists on call_auction_data.")
-            else:
-                logger.error(f"Error adding idx_date_time_code to call_auction_data: {err}")
+        # (date, time, code) is the primary key, see scripts/migrate_db.py
 
         # 2. Update yesterday_limit_up
         logger.info("Updating indexes for yesterday_limit_up...")
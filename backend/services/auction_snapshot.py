@@ -0,0 +1,392 @@
+import datetime
+import logging
+import threading
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from utils.database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+AUCTION_START = 9 * 3600 + 15 * 60  # 09:15:00
+MINUTE_915 = AUCTION_START
+MINUTE_920 = 9 * 3600 + 20 * 60
+MINUTE_925 = 9 * 3600 + 25 * 60
+
+
+def _to_seconds(value):
+    """
+    Convert a TIME value (timedelta from the driver, time, or 'HH:MM:SS') to seconds.
+    """
+    if isinstance(value, datetime.timedelta):
+        return int(value.total_seconds())
+    if isinstance(value, datetime.time):
+        return value.hour * 3600 + value.minute * 60 + value.second
+    hours, minutes, seconds = str(value).split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(float(seconds))
+
+
+def _format_time(seconds):
+    # Same shape as str(timedelta) returned by the MySQL path, e.g. "9:25:00"
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+
+def _money(value):
+    # Match the decimal(.., 2) columns returned by MySQL
+    return Decimal(f"{value:.2f}")
+
+
+class AuctionSnapshot:
+    """
+    In-process columnar store of the current day's call auction ticks.
+
+    Rows are kept exactly as ingested (diffs in DIFF_MODE) in NumPy columns;
+    a stock's value at tick T is its last row at or before T. The app process
+    catches up from call_auction_tick_manifest (sync), so only new ticks are
+    read from MySQL; ticks ingested in the same process are applied directly.
+    Historical dates are not served from memory.
+    """
+    # Minimum seconds between two manifest checks
+    SYNC_INTERVAL = 1.0
+
+    _lock = threading.RLock()
+    _date = None
+    _code_index = {}
+    _codes = []
+    _names = []
+    _sectors = []
+    _pending = []
+    _columns = None
+    _tick_times = []
+    # tick seconds -> call_auction_tick_manifest.updated_at of the rows held for it
+    _manifest = {}
+    _last_sync = 0.0
+
+    @staticmethod
+    def _reset(date_str):
+        AuctionSnapshot._date = date_str
+        AuctionSnapshot._code_index = {}
+        AuctionSnapshot._codes = []
+        AuctionSnapshot._names = []
+        AuctionSnapshot._sectors = []
+        AuctionSnapshot._pending = []
+        AuctionSnapshot._columns = None
+        AuctionSnapshot._tick_times = []
+        AuctionSnapshot._manifest = {}
+        AuctionSnapshot._last_sync = 0.0
+
+    @staticmethod
+    def _append(seconds, rows):
+        """
+        Append rows of (code, name, sector, bidding_percent, bidding_amount, asking_amount) for one tick.
+        """
+        index = AuctionSnapshot._code_index
+        for code, name, sector, bidding_percent, bidding_amount, asking_amount in rows:
+            idx = index.get(code)
+            if idx is None:
+                idx = len(AuctionSnapshot._codes)
+                index[code] = idx
+                AuctionSnapshot._codes.append(code)
+                AuctionSnapshot._names.append(name)
+                AuctionSnapshot._sectors.append(sector)
+            else:
+                AuctionSnapshot._names[idx] = name
+                AuctionSnapshot._sectors[idx] = sector
+            AuctionSnapshot._pending.append((idx, seconds, float(bidding_percent or 0),
+                                             float(bidding_amount or 0), float(asking_amount or 0)))
+
+        if seconds not in AuctionSnapshot._tick_times:
+            AuctionSnapshot._tick_times.append(seconds)
+            AuctionSnapshot._tick_times.sort()
+
+    @staticmethod
+    def _drop_tick(seconds):
+        """
+        Remove every row held for one tick, before it is reloaded or rewritten.
+        """
+        AuctionSnapshot._pending = [row for row in AuctionSnapshot._pending if row[1] != seconds]
+        cols = AuctionSnapshot._columns
+        if cols is not None:
+            keep = cols['time'] != seconds
+            AuctionSnapshot._columns = {key: column[keep] for key, column in cols.items()}
+
+    @staticmethod
+    def apply_tick(date_str, time_str, db_data, updated_at=None, replace=False):
+        """
+        Apply a tick just written by the ingest path.
+        db_data are the call_auction_data row tuples built in save_call_auction_data;
+        updated_at is the tick's manifest timestamp, so sync() does not load it again.
+        replace drops the rows already held for time_str (a full snapshot rewrote it).
+
+        This only saves a reload when ingest runs in a process that also serves
+        the snapshot (e.g. /api/test in the app). The scheduler never reads it, so
+        ticks are ignored until sync() has started the snapshot for date_str;
+        the app picks up the scheduler's ticks through sync().
+        """
+        date_str = str(date_str)
+        rows = [(row[2], row[3], row[4], row[6], row[7], row[8]) for row in db_data]
+        with AuctionSnapshot._lock:
+            if AuctionSnapshot._date != date_str:
+                return
+            seconds = _to_seconds(time_str)
+            if replace:
+                AuctionSnapshot._drop_tick(seconds)
+            AuctionSnapshot._append(seconds, rows)
+            if updated_at is not None:
+                AuctionSnapshot._manifest[seconds] = updated_at
+
+    @staticmethod
+    def sync(date_str):
+        """
+        Load ticks committed by another process since the last sync.
+        A tick is (re)loaded when its manifest row is new or was updated; a
+        reloaded tick's rows replace the ones held for it. Reads go to the
+        primary so a lagging replica cannot yield a partial tick.
+        """
+        with AuctionSnapshot._lock:
+            if AuctionSnapshot._date != date_str:
+                AuctionSnapshot._reset(date_str)
+            now = time.monotonic()
+            if now - AuctionSnapshot._last_sync < AuctionSnapshot.SYNC_INTERVAL:
+                return
+            AuctionSnapshot._last_sync = now
+
+            manifest = DatabaseManager.execute_query(
+                "SELECT time, updated_at FROM call_auction_tick_manifest WHERE date = %s ORDER BY time",
+                (date_str,), read_your_writes=True)
+            for entry in manifest:
+                seconds = _to_seconds(entry['time'])
+                held = AuctionSnapshot._manifest.get(seconds)
+                if held == entry['updated_at']:
+                    continue
+                rows = DatabaseManager.execute_query("""
+                    SELECT code, name, sector, bidding_percent, bidding_amount, asking_amount
+                    FROM call_auction_data
+                    WHERE date = %s AND time = %s
+                """, (date_str, entry['time']), dictionary=False, read_your_writes=True)
+                if held is not None:
+                    AuctionSnapshot._drop_tick(seconds)
+                AuctionSnapshot._append(seconds, rows)
+                AuctionSnapshot._manifest[seconds] = entry['updated_at']
+
+    @staticmethod
+    def serves(date_str):
+        """
+        Whether date_str can be answered from memory (the current day, synced).
+        """
+        if date_str != datetime.date.today().strftime('%Y-%m-%d'):
+            return False
+        try:
+            AuctionSnapshot.sync(date_str)
+            return True
+        except Exception as e:
+            logger.error(f"Error syncing auction snapshot for {date_str}, falling back to MySQL: {e}")
+            return False
+
+    @staticmethod
+    def _get_columns():
+        """
+        Columnarize pending rows. Must be called with the lock held.
+        """
+        if AuctionSnapshot._pending:
+            pending = np.array(AuctionSnapshot._pending, dtype=np.float64).reshape(-1, 5)
+            new = {
+                'code': pending[:, 0].astype(np.int32),
+                'time': pending[:, 1].astype(np.int32),
+                'percent': pending[:, 2],
+                'bidding_amount': pending[:, 3],
+                'asking_amount': pending[:, 4],
+            }
+            old = AuctionSnapshot._columns
+            if old is not None and old['time'].size:
+                if new['time'].min() < old['time'].max():
+                    # A reloaded tick lands behind later ones; restore time order (stable, so
+                    # rows rewritten within one tick keep their write order)
+                    merged = {k: np.concatenate((old[k], new[k])) for k in new}
+                    order = np.argsort(merged['time'], kind='stable')
+                    new = {k: column[order] for k, column in merged.items()}
+                else:
+                    new = {k: np.concatenate((old[k], new[k])) for k in new}
+            AuctionSnapshot._columns = new
+            AuctionSnapshot._pending = []
+
+        if AuctionSnapshot._columns is None:
+            return None
+        codes = np.array(AuctionSnapshot._codes, dtype=str)
+        names = np.array(AuctionSnapshot._names, dtype=str)
+        return AuctionSnapshot._columns, codes, names
+
+    @staticmethod
+    def _resolve_tick(start, end, latest=True):
+        """
+        Last (or first) tick time in [start, end) seconds, or None.
+        """
+        ticks = [t for t in AuctionSnapshot._tick_times if start <= t < end]
+        if not ticks:
+            return None
+        return ticks[-1] if latest else ticks[0]
+
+    @staticmethod
+    def _state_at(cols, tick):
+        """
+        Row indices holding each stock's latest value at or before tick.
+        Rows are kept in time order (ingest order within a tick), so the last matching row per code wins.
+        """
+        rows = np.nonzero(cols['time'] <= tick)[0]
+        if rows.size == 0:
+            return rows
+        reversed_rows = rows[::-1]
+        _, first = np.unique(cols['code'][reversed_rows], return_index=True)
+        return reversed_rows[first]
+
+    @staticmethod
+    def _board_masks(codes, names):
+        is_st = np.char.find(names, 'ST') >= 0
+        is_20cm = np.char.startswith(codes, '30') | np.char.startswith(codes, '688')
+        return is_st, is_20cm
+
+    @staticmethod
+    def _row(cols, r, tick, **extra):
+        idx = cols['code'][r]
+        item = {
+            'code': AuctionSnapshot._codes[idx],
+            'name': AuctionSnapshot._names[idx],
+            'sector': AuctionSnapshot._sectors[idx],
+        }
+        item.update(extra)
+        item['time'] = _format_time(tick)
+        item['date'] = AuctionSnapshot._date
+        return item
+
+    @staticmethod
+    def top_n(limit):
+        """
+        Top N by 9:25 amount excluding limit-down stocks.
+        Returns (rows, history_map) shaped like MarketService.get_top_n_call_auction's query results.
+        """
+        with AuctionSnapshot._lock:
+            tick = AuctionSnapshot._resolve_tick(MINUTE_925, MINUTE_925 + 60)
+            snapshot = AuctionSnapshot._get_columns()
+            if tick is None or snapshot is None:
+                return [], {}
+            cols, codes, names = snapshot
+
+            rows = AuctionSnapshot._state_at(cols, tick)
+            row_codes = codes[cols['code'][rows]]
+            row_names = names[cols['code'][rows]]
+            pct = cols['percent'][rows]
+            amount = cols['bidding_amount'][rows] + cols['asking_amount'][rows]
+
+            is_st, is_20cm = AuctionSnapshot._board_masks(row_codes, row_names)
+            is_bj = (np.char.startswith(row_codes, '8') | np.char.startswith(row_codes, '4')
+                     | np.char.startswith(row_codes, '9'))
+            limit_down = ((is_st & (pct <= -4.5)) | (is_20cm & (pct <= -19.0)) | (is_bj & (pct <= -29.0))
+                          | (~is_st & ~is_20cm & ~is_bj & (pct <= -9.0)))
+
+            keep = np.nonzero(~limit_down)[0]
+            order = keep[np.argsort(-amount[keep], kind='stable')][:limit]
+
+            top = [AuctionSnapshot._row(cols, rows[i], tick,
+                                        change_percent=_money(pct[i]), amount=_money(amount[i]))
+                   for i in order]
+
+            history_map = {}
+            for key, minute in (('915', MINUTE_915), ('920', MINUTE_920)):
+                hist_tick = AuctionSnapshot._resolve_tick(minute, minute + 60)
+                if hist_tick is None:
+                    continue
+                hist_rows = AuctionSnapshot._state_at(cols, hist_tick)
+                wanted = {item['code'] for item in top}
+                for r in hist_rows:
+                    code = AuctionSnapshot._codes[cols['code'][r]]
+                    if code in wanted:
+                        history_map.setdefault(code, {})[key] = _money(cols['bidding_amount'][r] + cols['asking_amount'][r])
+            return top, history_map
+
+    @staticmethod
+    def ranking(start_time, end_time, limit):
+        """
+        Ranking by amount as of the first tick in [start_time, end_time).
+        """
+        with AuctionSnapshot._lock:
+            tick = AuctionSnapshot._resolve_tick(_to_seconds(start_time), _to_seconds(end_time), latest=False)
+            snapshot = AuctionSnapshot._get_columns()
+            if tick is None or snapshot is None:
+                return []
+            cols, codes, names = snapshot
+
+            rows = AuctionSnapshot._state_at(cols, tick)
+            amount = cols['bidding_amount'][rows] + cols['asking_amount'][rows]
+            order = np.argsort(-amount, kind='stable')[:limit]
+            result = []
+            for i in order:
+                item = AuctionSnapshot._row(cols, rows[i], tick,
+                                            amount=_money(amount[i]),
+                                            change_percent=_money(cols['percent'][rows[i]]))
+                del item['date']
+                result.append(item)
+            return result
+
+    @staticmethod
+    def limit_925(direction):
+        """
+        Stocks at limit up (direction=1) or limit down (direction=-1) as of the last 9:25 tick.
+        """
+        with AuctionSnapshot._lock:
+            tick = AuctionSnapshot._resolve_tick(MINUTE_925, MINUTE_925 + 60)
+            snapshot = AuctionSnapshot._get_columns()
+            if tick is None or snapshot is None:
+                return []
+            cols, codes, names = snapshot
+
+            rows = AuctionSnapshot._state_at(cols, tick)
+            row_codes = codes[cols['code'][rows]]
+            row_names = names[cols['code'][rows]]
+            pct = cols['percent'][rows] * direction
+            asking = cols['asking_amount'][rows]
+
+            is_st, is_20cm = AuctionSnapshot._board_masks(row_codes, row_names)
+            is_bj = (np.char.startswith(row_codes, '8') | np.char.startswith(row_codes, '43')
+                     | np.char.startswith(row_codes, '92'))
+            at_limit = ((is_st & (pct >= 4.9))
+                        | (~is_st & ((is_20cm & (pct >= 19.8)) | (is_bj & (pct >= 29.8))
+                                     | (~is_20cm & ~is_bj & (pct >= 9.8)))))
+
+            matched = np.nonzero(at_limit)[0]
+            order = matched[np.argsort(-asking[matched], kind='stable')]
+            return [AuctionSnapshot._row(cols, rows[i], tick,
+                                         change_percent=_money(cols['percent'][rows[i]]),
+                                         amount=_money(asking[i]), price=0)
+                    for i in order]
+
+    @staticmethod
+    def abnormal_movement_925(limit):
+        """
+        Stocks whose percent rose >= 5 points between their first auction tick and 9:25
+        with a 9:25 bidding amount of at least 50 million.
+        """
+        with AuctionSnapshot._lock:
+            tick = AuctionSnapshot._resolve_tick(MINUTE_925, MINUTE_925 + 60)
+            snapshot = AuctionSnapshot._get_columns()
+            if tick is None or snapshot is None:
+                return []
+            cols, codes, names = snapshot
+
+            rows = AuctionSnapshot._state_at(cols, tick)
+            # First row per code is its first auction tick
+            first_codes, first_rows = np.unique(cols['code'], return_index=True)
+            first_pct = np.full(len(AuctionSnapshot._codes), np.nan)
+            first_pct[first_codes] = cols['percent'][first_rows]
+
+            pct = cols['percent'][rows]
+            amplitude = pct - first_pct[cols['code'][rows]]
+            bidding = cols['bidding_amount'][rows]
+            matched = np.nonzero((amplitude >= 5) & (bidding >= 50000000))[0]
+            order = matched[np.argsort(-amplitude[matched], kind='stable')][:limit]
+            return [AuctionSnapshot._row(cols, rows[i], tick,
+                                         change_percent=_money(pct[i]),
+                                         amplitude=float(round(amplitude[i], 2)),
+                                         amount=_money(bidding[i]), price=0)
+                    for i in order]
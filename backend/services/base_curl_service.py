@@ -188,7 +188,7 @@ class BaseCurlService:
         """
         try:
             query = "SELECT url, method, headers, body FROM api_configs WHERE name = %s"
-            result = DatabaseManager.execute_query(query, (config_name,), dictionary=True)
+            result = DatabaseManager.execute_query(query, (config_name,), dictionary=True, read_your_writes=True)
             
             if result:
                 row = result[0]
@@ -0,0 +1,82 @@
+import datetime
+import logging
+import threading
+import zlib
+from contextlib import contextmanager
+
+from utils.database import DatabaseManager
+from utils.cache_backends import encode, decode
+from utils.events import EventBus
+
+logger = logging.getLogger(__name__)
+
+
+class DayResultStore:
+    """
+    Dashboard widget results of finished trading days, kept in the day_results
+    table under their cache keys so browsing history does not rerun the joins.
+
+    Each row records the data version tag of its date when it was built; a row
+    whose tag no longer matches (late corrections, re-imported limit up lists)
+    is ignored and the widget is computed live again.
+    """
+    _local = threading.local()
+
+    @staticmethod
+    def load(cache_key, date_str):
+        """
+        Returns (True, value) for a stored result that is still current, (False, None) otherwise.
+        """
+        tag = EventBus.version_tag(date_str)
+        if tag is None:
+            return False, None
+        row = DatabaseManager.execute_query(
+            "SELECT version_tag, payload FROM day_results WHERE cache_key = %s", (cache_key,), fetch_one=True)
+        if not row or row['version_tag'] != tag:
+            return False, None
+        return True, decode(zlib.decompress(row['payload']))
+
+    @staticmethod
+    def save(date_str, results, version_tag):
+        """
+        Replace the stored results of date_str with results (cache_key -> value).
+        """
+        rows = [(key, date_str, key.split(':', 1)[0], version_tag, zlib.compress(encode(value)))
+                for key, value in results.items()]
+        with DatabaseManager.transaction() as tx:
+            tx.execute("DELETE FROM day_results WHERE date = %s", (date_str,))
+            return tx.bulk_insert('day_results', ('cache_key', 'date', 'namespace', 'version_tag', 'payload'),
+                                  rows, replace=True, use_load_data=False)
+
+    @staticmethod
+    @contextmanager
+    def collect(date_str):
+        """
+        Within this block, MarketService computes date_str's widgets directly
+        (no cache, no stored results) and records them in the yielded
+        collection's 'results' (cache_key -> value). Its 'failed' flag is set
+        if any widget query failed.
+        """
+        collection = {'results': {}, 'failed': False}
+        DayResultStore._local.collecting = (date_str, collection)
+        try:
+            yield collection
+        finally:
+            DayResultStore._local.collecting = None
+
+    @staticmethod
+    def collecting(date_str):
+        """
+        The collection date_str's results are being recorded into, or None.
+        """
+        collecting = getattr(DayResultStore._local, 'collecting', None)
+        if collecting and collecting[0] == date_str:
+            return collecting[1]
+        return None
+
+    @staticmethod
+    def is_closed(date_str):
+        """
+        True for days before today, whose results can be served from the store.
+        """
+        return date_str < datetime.date.today().strftime('%Y-%m-%d')
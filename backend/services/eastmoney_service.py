@@ -3,7 +3,13 @@ import requests
 import logging
 import shlex
 import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
 from utils.database import DatabaseManager
+from services.auction_snapshot import AuctionSnapshot
+from utils.events import EventBus, CALL_AUCTION
 from utils.locks import akshare_lock
 
 from .base_curl_service import BaseCurlService
@@ -11,7 +17,97 @@ from .base_curl_service import BaseCurlService
 # Use a specific logger for this service
 logger = logging.getLogger('eastmoney_service')
 
+# Column order of the rows built in save_call_auction_data
+CALL_AUCTION_COLUMNS = ('date', 'time', 'code', 'name', 'sector', 'price', 'bidding_percent', 'bidding_amount',
+                        'asking_amount', 'non_asking_amount', 'non_asking_volume', 'yidongleixing')
+
+# Per-minute rollup of the first and last tick of each code
+ROLLUP_COLUMNS = ('date', 'minute', 'code', 'name', 'sector',
+                  'first_time', 'first_bidding_percent', 'first_bidding_amount', 'first_asking_amount',
+                  'last_time', 'last_bidding_percent', 'last_bidding_amount', 'last_asking_amount')
+
+# Keeps the earliest and latest tick when a minute is written more than once.
+# MySQL applies assignments left to right, so the time columns are updated last.
+ROLLUP_ON_DUPLICATE = """
+    name = VALUES(name), sector = VALUES(sector),
+    first_bidding_percent = IF(VALUES(first_time) < first_time, VALUES(first_bidding_percent), first_bidding_percent),
+    first_bidding_amount = IF(VALUES(first_time) < first_time, VALUES(first_bidding_amount), first_bidding_amount),
+    first_asking_amount = IF(VALUES(first_time) < first_time, VALUES(first_asking_amount), first_asking_amount),
+    first_time = LEAST(first_time, VALUES(first_time)),
+    last_bidding_percent = IF(VALUES(last_time) >= last_time, VALUES(last_bidding_percent), last_bidding_percent),
+    last_bidding_amount = IF(VALUES(last_time) >= last_time, VALUES(last_bidding_amount), last_bidding_amount),
+    last_asking_amount = IF(VALUES(last_time) >= last_time, VALUES(last_asking_amount), last_asking_amount),
+    last_time = GREATEST(last_time, VALUES(last_time))
+"""
+
+# Rebuilds a date's rollup from raw ticks the way the ingest path writes it. Ticks
+# in diff mode only hold the codes that changed, so every code seen so far gets a
+# row for every minute, valued at the last tick at or before it:
+#   first_* : the code's value at the minute's first tick (first_time = that tick),
+#             or its first row in the minute if it had none before
+#   last_*  : the code's last row before the minute ends; a value carried from an
+#             earlier minute is stamped with the minute's first tick
+# Each (minute, code) cell costs three index lookups on (date, code, time).
+# Parameters: (date, date)
+REBUILD_ROLLUP_QUERY = """
+REPLACE INTO call_auction_minute_rollup
+(date, minute, code, name, sector,
+ first_time, first_bidding_percent, first_bidding_amount, first_asking_amount,
+ last_time, last_bidding_percent, last_bidding_amount, last_asking_amount)
+SELECT g.date, g.minute, g.code, l.name, l.sector,
+       IF(g.carried_time IS NULL, f.time, g.first_tick), f.bidding_percent, f.bidding_amount, f.asking_amount,
+       GREATEST(l.time, g.first_tick), l.bidding_percent, l.bidding_amount, l.asking_amount
+FROM (
+    SELECT m.date, m.minute, m.first_tick, c.code,
+           (SELECT MAX(x.time) FROM call_auction_data x
+            WHERE x.date = m.date AND x.code = c.code AND x.time <= m.first_tick) as carried_time,
+           (SELECT MIN(x.time) FROM call_auction_data x
+            WHERE x.date = m.date AND x.code = c.code
+              AND x.time >= m.minute AND x.time < m.minute_end) as minute_first_time,
+           (SELECT MAX(x.time) FROM call_auction_data x
+            WHERE x.date = m.date AND x.code = c.code AND x.time < m.minute_end) as last_time
+    FROM (
+        SELECT date, minute, MIN(time) as first_tick, ADDTIME(minute, '00:01:00') as minute_end
+        FROM (
+            SELECT date, time, SEC_TO_TIME(FLOOR(TIME_TO_SEC(time) / 60) * 60) as minute
+            FROM call_auction_data
+            WHERE date = %s
+        ) t
+        GROUP BY date, minute
+    ) m
+    JOIN (
+        SELECT code, MIN(time) as first_time
+        FROM call_auction_data
+        WHERE date = %s
+        GROUP BY code
+    ) c ON c.first_time < m.minute_end
+) g
+JOIN call_auction_data f
+  ON f.date = g.date AND f.code = g.code AND f.time = COALESCE(g.carried_time, g.minute_first_time)
+JOIN call_auction_data l
+  ON l.date = g.date AND l.code = g.code AND l.time = g.last_time
+"""
+
+# Shared keep-alive session for call auction fetches (created lazily)
+_session = None
+_session_lock = threading.Lock()
+
+# Values of the previously written tick, per code, for tick-diff persistence.
+# Lost on restart, in which case the first tick is written in full again.
+_last_tick = {'date': None, 'time': None, 'minute': None, 'values': {}}
+_last_tick_lock = threading.Lock()
+
 class EastmoneyService(BaseCurlService):
+    # Sharded fetch: secids are split into chunks of SHARD_SIZE and fetched
+    # concurrently by SHARD_WORKERS threads, each request bounded by SHARD_TIMEOUT.
+    SHARD_SIZE = 500
+    SHARD_WORKERS = 8
+    SHARD_TIMEOUT = 5
+
+    # Tick-diff persistence: only rows whose values changed since the previous
+    # tick are written to call_auction_data; readers resolve "latest at or before T".
+    DIFF_MODE = True
+
     @staticmethod
     def update_config(curl_command):
         """
@@ -114,15 +210,16 @@ class EastmoneyService(BaseCurlService):
                     codes.append(code)
                     names.append('Unknown') # Placeholder name
 
-            DatabaseManager.execute_update("TRUNCATE TABLE stock_list")
-            
             insert_query = "INSERT INTO stock_list (code, name, market) VALUES (%s, %s, %s)"
             data = []
             for code, name in zip(codes, names):
                 market = 1 if code.startswith('6') else 0 
                 data.append((code, name, market))
-                
-            count = DatabaseManager.execute_update(insert_query, data, many=True)
+
+            # DELETE rather than TRUNCATE (which commits implicitly) so the old list stays until the new one is in
+            with DatabaseManager.transaction() as tx:
+                tx.execute("DELETE FROM stock_list")
+                count = tx.execute_batch(insert_query, data)
             logger.info(f"Successfully updated stock list with {count} stocks.")
             return count
             
@@ -146,9 +243,61 @@ class EastmoneyService(BaseCurlService):
         return BaseCurlService._fetch_data_base('eastmoney_call_auction')
 
     @staticmethod
-    def fetch_call_auction_data(secids):
+    def _get_session():
+        """
+        Returns the shared keep-alive session used for call auction requests.
+        The connection pool is sized to the number of shard workers so that
+        concurrent shards reuse connections instead of opening new ones.
+        """
+        global _session
+        if _session is None:
+            with _session_lock:
+                if _session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=EastmoneyService.SHARD_WORKERS,
+                                          pool_maxsize=EastmoneyService.SHARD_WORKERS)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    _session = session
+        return _session
+
+    @staticmethod
+    def _extract_diff(res_json):
+        """
+        Extracts the record list from an Eastmoney response body.
+        """
+        if not res_json or not res_json.get('data'):
+            return None
+        data_obj = res_json['data']
+        data_list = data_obj.get('diff', data_obj.get('full', []))
+        if isinstance(data_list, dict):
+            # Some endpoints return diff as {"0": {...}, "1": {...}}
+            data_list = list(data_list.values())
+        return data_list or []
+
+    @staticmethod
+    def _fetch_call_auction_shard(url, headers, payload, secids, timeout):
+        """
+        Fetches one shard of secids. Returns (records, elapsed_seconds).
+        """
+        shard_payload = payload.copy()
+        shard_payload['secids'] = secids
+        shard_payload['pz'] = len(secids)
+        shard_payload['pn'] = 1
+
+        start = time.perf_counter()
+        response = EastmoneyService._get_session().post(url, headers=headers, json=shard_payload, timeout=timeout)
+        response.raise_for_status()
+        data_list = EastmoneyService._extract_diff(response.json())
+        return data_list or [], time.perf_counter() - start
+
+    @staticmethod
+    def fetch_call_auction_data(secids, shard_size=None):
         """
         Fetches raw call auction data from Eastmoney for the given secids.
+        The secid universe is split into shards of `shard_size` (defaults to
+        SHARD_SIZE) which are fetched concurrently and merged. A shard size
+        of 0 sends everything in a single request.
         """
         try:
             config = EastmoneyService.get_config()
@@ -168,31 +317,45 @@ class EastmoneyService(BaseCurlService):
                 logger.error(f"Configuration body must be a JSON object, got {type(payload)}.")
                 return []
 
-            # Update payload
-            # Create a copy to avoid modifying the cached config if get_config returns a reference
-            payload = payload.copy()
-            payload['secids'] = secids
-            payload['pz'] = len(secids)
-            payload['pn'] = 1
-            
-            logger.info(f"Fetching data using configured URL: {url}")
-            logger.info(f"Payload overrides: pz={payload['pz']}, secids count={len(secids)}")
+            if shard_size is None:
+                shard_size = EastmoneyService.SHARD_SIZE
 
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                res_json = response.json()
-                if res_json and 'data' in res_json and res_json['data']:
-                    data_obj = res_json['data']
-                    data_list = data_obj.get('diff', data_obj.get('full', []))
-                    logger.info(f"Received {len(data_list) if data_list else 0} records from API.")
-                    return data_list
-                else:
-                    logger.warning(f"No data found in response. Keys: {res_json.keys() if res_json else 'None'}.")
-                    return []
+            if not shard_size or len(secids) <= shard_size:
+                shards = [secids]
             else:
-                logger.error(f"Failed to fetch data: {response.status_code}")
-                return []
+                shards = [secids[i:i + shard_size] for i in range(0, len(secids), shard_size)]
+
+            logger.info(f"Fetching data using configured URL: {url}")
+            logger.info(f"Fetching {len(secids)} secids in {len(shards)} shard(s) of up to {len(shards[0])}")
+
+            start = time.perf_counter()
+            results = [None] * len(shards)
+            workers = min(EastmoneyService.SHARD_WORKERS, len(shards))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(EastmoneyService._fetch_call_auction_shard, url, headers, payload,
+                                    shard, EastmoneyService.SHARD_TIMEOUT): idx
+                    for idx, shard in enumerate(shards)
+                }
+                for future in as_completed(futures):
+                    idx = futures[future]
+                    try:
+                        data_list, elapsed = future.result()
+                        results[idx] = data_list
+                        logger.info(f"Shard {idx + 1}/{len(shards)}: {len(data_list)} records in {elapsed:.3f}s")
+                    except Exception as e:
+                        logger.error(f"Shard {idx + 1}/{len(shards)} failed: {e}")
+
+            # Merge in shard order so the result matches a single-request fetch
+            merged = []
+            for data_list in results:
+                if data_list:
+                    merged.extend(data_list)
+
+            failed = sum(1 for data_list in results if data_list is None)
+            logger.info(f"Received {len(merged)} records from API in {time.perf_counter() - start:.3f}s "
+                        f"({failed} failed shard(s)).")
+            return merged
                 
         except Exception as e:
             logger.error(f"Error fetching call auction data: {e}")
@@ -248,22 +411,18 @@ class EastmoneyService(BaseCurlService):
             current_time = now.time()
             current_time_str = now.strftime('%H:%M:%S')
             
-            # Logic: 9:15 - 9:25 -> use actual time, else -> 9:25:00
+            # Logic: 9:15 - 9:25 -> use actual time, after 9:25 -> 9:25:00 (the final auction result)
             if '09:15:00' <= current_time_str <= '09:25:00':
                 record_time = current_time_str
+            elif current_time_str < '09:15:00' and not date_str:
+                # Nothing is auctioned yet (e.g. the scheduler's 9:14 start); a tick stamped
+                # 09:25:00 now would linger under the real 09:25 values
+                logger.info(f"Skipping call auction tick at {current_time_str}, before the auction opens.")
+                return
             else:
-                # If we are strictly within market hours logic, we should probably stick to actual time
-                # But if we are running catch-up or testing, we might want 09:25:00
-                # Let's use 09:25:00 if outside the window, similar to fetch_eastmoney_call_auction logic
+                # Catch-up or test runs: stamp 09:25:00, like fetch_eastmoney_call_auction
                 record_time = '09:25:00'
             
-            # Add non_asking_amount and non_asking_volume fields
-            insert_query = """
-            REPLACE INTO call_auction_data 
-            (date, time, code, name, sector, price, bidding_percent, bidding_amount, asking_amount, non_asking_amount, non_asking_volume, yidongleixing)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """
-            
             # Sort by bidding_amount
             data.sort(key=lambda x: float(x.get('non_asking_amount', 0)), reverse=True)
             
@@ -294,8 +453,124 @@ class EastmoneyService(BaseCurlService):
 
             # Sort by asking_amount (index -2) and take top 200
             db_data.sort(key=lambda x: x[-2], reverse=True)
-              
-            count = DatabaseManager.execute_update(insert_query, db_data, many=True)
-            logger.info(f"Saved {count} call auction records for date {current_date} time {record_time}.")
+
+            if EastmoneyService.DIFF_MODE:
+                changed_data, tick_state, full = EastmoneyService._diff_against_previous_tick(
+                    current_date, record_time, db_data)
+            else:
+                changed_data, tick_state, full = db_data, None, True
+
+            # The first tick of each minute rolls up every code, later ticks in
+            # the same minute only need to move the changed ones forward.
+            minute = record_time[:5] + ':00'
+            if tick_state is None or EastmoneyService._is_new_minute(current_date, minute):
+                rollup_source = db_data
+            else:
+                rollup_source = changed_data
+
+            manifest_query = """
+            REPLACE INTO call_auction_tick_manifest (date, time, total_count, changed_count)
+            VALUES (%s, %s, %s, %s)
+            """
+            # Ticks, rollup, manifest and version bump commit together on one connection
+            with DatabaseManager.transaction() as tx:
+                if full:
+                    # A full snapshot replaces whatever an earlier write left under the same time
+                    tx.execute("DELETE FROM call_auction_data WHERE date = %s AND time = %s",
+                               (current_date, record_time))
+                count = tx.bulk_insert('call_auction_data', CALL_AUCTION_COLUMNS, changed_data, replace=True)
+                EastmoneyService._save_minute_rollup(tx, rollup_source, minute)
+                tx.execute(manifest_query, (current_date, record_time, len(db_data), len(changed_data)))
+                manifest_updated_at = tx.query(
+                    "SELECT updated_at FROM call_auction_tick_manifest WHERE date = %s AND time = %s",
+                    (current_date, record_time))[0][0]
+
+                # Only remember the tick once it is safely written, otherwise a failed
+                # write would suppress these rows on the next tick as well.
+                if tick_state is not None:
+                    tx.after_commit(lambda: EastmoneyService._commit_tick_state(current_date, record_time, minute,
+                                                                                tick_state, full))
+
+                # Keep this process's in-memory snapshot current without a DB round trip; the
+                # manifest timestamp tells its next sync() that this tick is already held
+                tx.after_commit(lambda: AuctionSnapshot.apply_tick(current_date, record_time, changed_data,
+                                                                   manifest_updated_at, replace=full))
+                EventBus.publish(CALL_AUCTION, current_date, tx=tx)
+
+            logger.info(f"Saved {count} call auction records ({len(changed_data)}/{len(db_data)} changed) "
+                        f"for date {current_date} time {record_time}.")
         except Exception as e:
             logger.error(f"Error saving data: {e}")
+
+    @staticmethod
+    def _diff_against_previous_tick(current_date, record_time, db_data):
+        """
+        Compares a tick against the previous tick of the same date.
+        Returns (changed_rows, new_state, full) where new_state maps code -> values.
+        Rows are the tuples built in save_call_auction_data; everything after
+        (date, time, code) is compared. Diffs only hold when ticks move forward
+        in time, so a tick not later than the previous one is a full snapshot
+        (full=True, every row returned).
+        """
+        date_key = str(current_date)
+        with _last_tick_lock:
+            advances = _last_tick['date'] == date_key and _last_tick['time'] < record_time
+            previous = _last_tick['values'] if advances else {}
+
+        changed = []
+        state = {}
+        for row in db_data:
+            code = row[2]
+            values = row[3:]
+            state[code] = values
+            if previous.get(code) != values:
+                changed.append(row)
+        return changed, state, not advances
+
+    @staticmethod
+    def _is_new_minute(current_date, minute):
+        """
+        Whether this tick is the first one written for its minute.
+        """
+        with _last_tick_lock:
+            return _last_tick['date'] != str(current_date) or _last_tick['minute'] != minute
+
+    @staticmethod
+    def _commit_tick_state(current_date, record_time, minute, state, full=False):
+        """
+        Stores the values of the tick just written as the baseline for the next one.
+        A full snapshot replaces the baseline instead of updating it.
+        """
+        date_key = str(current_date)
+        with _last_tick_lock:
+            if _last_tick['date'] != date_key or full:
+                _last_tick['date'] = date_key
+                _last_tick['values'] = {}
+            _last_tick['time'] = record_time
+            _last_tick['minute'] = minute
+            _last_tick['values'].update(state)
+
+    @staticmethod
+    def _save_minute_rollup(tx, db_data, minute):
+        """
+        Upserts tick rows into call_auction_minute_rollup for the given minute, within tx.
+        """
+        rows = []
+        for row in db_data:
+            current_date, record_time, code, name, sector, _, bidding_percent, bidding_amount, asking_amount = row[:9]
+            rows.append((current_date, minute, code, name, sector,
+                         record_time, bidding_percent, bidding_amount, asking_amount,
+                         record_time, bidding_percent, bidding_amount, asking_amount))
+        return tx.bulk_insert('call_auction_minute_rollup', ROLLUP_COLUMNS, rows, on_duplicate=ROLLUP_ON_DUPLICATE)
+
+    @staticmethod
+    def rebuild_minute_rollup(date_str):
+        """
+        Rebuilds call_auction_minute_rollup for a date from the raw ticks.
+        Used for dates written outside the ingest path (history imports, migration).
+        """
+        with DatabaseManager.transaction() as tx:
+            tx.execute("DELETE FROM call_auction_minute_rollup WHERE date = %s", (date_str,))
+            count = tx.execute(REBUILD_ROLLUP_QUERY, (date_str, date_str), name='REBUILD_ROLLUP_QUERY')
+        logger.info(f"Rebuilt minute rollup for {date_str} ({count} rows affected).")
+        return count
@@ -5,6 +5,7 @@ import datetime
 import logging
 import shlex
 from utils.database import DatabaseManager
+from utils.events import EventBus, LIMIT_UP
 
 from .base_curl_service import BaseCurlService
 
@@ -142,8 +143,7 @@ class JiuyanService(BaseCurlService):
                 processed_data.append((
                     date_str, code, name, limit_up_type, consecutive_days, edition, consecutive_boards, days_boards, first_limit_up_time, last_limit_up_time, expound
                 ))
-        import pprint
-        pprint.pprint(processed_data)
+        logger.debug(f"Processed {len(processed_data)} limit up stocks for {date_str}")
         return processed_data
 
     @staticmethod
@@ -153,14 +153,12 @@ class JiuyanService(BaseCurlService):
         '''
         if not date_str:
             return 
-        # 清理{date_str}的旧数据
-        DatabaseManager.execute_update("DELETE FROM yesterday_limit_up WHERE date = %s", (date_str,))
-        
         # Insert with extended fields
-        insert_query = """
-            INSERT INTO yesterday_limit_up 
-            (date, code, name, limit_up_type, consecutive_days, edition, consecutive_boards, days_boards, first_limit_up_time, last_limit_up_time, expound) 
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        """
-        count = DatabaseManager.execute_update(insert_query, data, many=True)
+        columns = ('date', 'code', 'name', 'limit_up_type', 'consecutive_days', 'edition', 'consecutive_boards',
+                   'days_boards', 'first_limit_up_time', 'last_limit_up_time', 'expound')
+        # 清理{date_str}的旧数据并写入新数据, 同一事务提交, 中途失败不会留下空的一天
+        with DatabaseManager.transaction() as tx:
+            tx.execute("DELETE FROM yesterday_limit_up WHERE date = %s", (date_str,))
+            count = tx.bulk_insert('yesterday_limit_up', columns, data)
+            EventBus.publish(LIMIT_UP, date_str, tx=tx)
         logger.info(f"Saved {count} yesterday limit up stocks from Jiuyan for date {date_str}.")
\ No newline at end of file
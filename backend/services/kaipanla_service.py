@@ -2,6 +2,7 @@ import logging
 import json
 import datetime
 from utils.database import DatabaseManager
+from utils.events import EventBus, INDEX_DATA, MARKET_SENTIMENT
 from .base_curl_service import BaseCurlService
 
 # Use a specific logger for this service
@@ -192,13 +193,10 @@ class KaipanlaService(BaseCurlService):
                 logger.warning("No valid index items found (missing code/name).")
                 return False, "No valid items found"
 
-            insert_sql = """
-            REPLACE INTO index_data 
-            (date, time, index_code, index_name, increase_amount, increase_rate, index_volume)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """
-            
-            DatabaseManager.execute_batch(insert_sql, values_to_insert)
+            columns = ('date', 'time', 'index_code', 'index_name', 'increase_amount', 'increase_rate', 'index_volume')
+            with DatabaseManager.transaction() as tx:
+                tx.bulk_insert('index_data', columns, values_to_insert, replace=True)
+                EventBus.publish(INDEX_DATA, date_str, tx=tx)
             logger.info(f"Successfully saved {len(values_to_insert)} index data items for {date_str} at {time_str}")
             return True, f"Saved {len(values_to_insert)} items"
 
@@ -274,7 +272,9 @@ class KaipanlaService(BaseCurlService):
                 market_sentiment, shanghai_turnover, total_turnover, rise_fall_distribution, json.dumps(data)
             )
             
-            DatabaseManager.execute_update(query, params)
+            with DatabaseManager.transaction() as tx:
+                tx.execute(query, params)
+                EventBus.publish(MARKET_SENTIMENT, date_str, tx=tx)
             logger.info(f"Successfully saved market stats for date: {date_str} time: {time_str}")
             return True, f"Saved stats for {date_str} {time_str}"
 
@@ -1,148 +1,276 @@
 import datetime
 from utils.database import DatabaseManager
 from utils.cache import CacheManager
-from utils.locks import akshare_lock
+from utils.trading_calendar import TradingCalendar
+from services.auction_snapshot import AuctionSnapshot
+from services.day_result_store import DayResultStore
+from utils.events import EventBus, CALL_AUCTION, MARKET_SENTIMENT, LIMIT_UP
+from utils.metrics import SERVICE_LATENCY
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Rollup queries behind the call auction widgets for dates not held by
+# AuctionSnapshot. scripts/test_query_plans.py checks their plans.
+
+# Top N by 9:25 amount (last tick of the 9:25 minute) with the same stocks'
+# 9:15/9:20 amounts looked up by primary key in the same statement
+TOP_N_QUERY = """
+SELECT t.code, t.name, t.sector, t.change_percent, t.amount, t.time, t.date,
+       (r15.last_bidding_amount + r15.last_asking_amount) as amount_915,
+       (r20.last_bidding_amount + r20.last_asking_amount) as amount_920
+FROM (
+    SELECT code, name, sector,
+           last_bidding_percent as change_percent,
+           (last_bidding_amount + last_asking_amount) as amount,
+           last_time as time, date
+    FROM call_auction_minute_rollup
+    WHERE date = %s AND minute = '09:25:00'
+      AND NOT (
+          -- Exclude Limit Down (Nuclear Button)
+          (name LIKE '%%ST%%' AND last_bidding_percent <= -4.5) OR
+          ((code LIKE '30%%' OR code LIKE '688%%') AND last_bidding_percent <= -19.0) OR
+          ((code LIKE '8%%' OR code LIKE '4%%' OR code LIKE '9%%') AND last_bidding_percent <= -29.0) OR
+          (name NOT LIKE '%%ST%%' AND code NOT LIKE '30%%' AND code NOT LIKE '688%%' AND code NOT LIKE '8%%' AND code NOT LIKE '4%%' AND code NOT LIKE '9%%' AND last_bidding_percent <= -9.0)
+      )
+    ORDER BY (last_bidding_amount + last_asking_amount) DESC LIMIT %s
+) t
+LEFT JOIN call_auction_minute_rollup r15
+  ON r15.date = t.date AND r15.minute = '09:15:00' AND r15.code = t.code
+LEFT JOIN call_auction_minute_rollup r20
+  ON r20.date = t.date AND r20.minute = '09:20:00' AND r20.code = t.code
+ORDER BY t.amount DESC
+"""
+
+# Rank on the first tick of the first minute in the range
+RANKING_QUERY = """
+SELECT code, name, sector,
+       first_bidding_percent as change_percent,
+       (first_bidding_amount + first_asking_amount) as amount,
+       first_time as time
+FROM call_auction_minute_rollup
+WHERE date = %s
+  AND minute = (
+      SELECT MIN(minute)
+      FROM call_auction_minute_rollup
+      WHERE date = %s AND minute >= %s AND minute < %s
+  )
+ORDER BY (first_bidding_amount + first_asking_amount) DESC LIMIT %s
+"""
+
+# Limit up at 9:25. Main board: >= 9.8%, ChiNext/STAR (300/688): >= 19.8%, ST: >= 4.9%, BJ (8/43/92): >= 29.8%
+LIMIT_UP_925_QUERY = """
+SELECT code, name, sector,
+       last_bidding_percent as change_percent,
+       last_asking_amount as amount,
+       0 as price,
+       last_time as time, date
+FROM call_auction_minute_rollup
+WHERE date = %s
+  AND minute = '09:25:00'
+  AND (
+    (name LIKE '%%ST%%' AND last_bidding_percent >= 4.9)
+    OR
+    (name NOT LIKE '%%ST%%' AND (
+        ((code LIKE '30%%' OR code LIKE '688%%') AND last_bidding_percent >= 19.8)
+        OR
+        ((code LIKE '8%%' OR code LIKE '43%%' OR code LIKE '92%%') AND last_bidding_percent >= 29.8)
+        OR
+        (code NOT LIKE '30%%' AND code NOT LIKE '688%%' AND code NOT LIKE '8%%' AND code NOT LIKE '43%%' AND code NOT LIKE '92%%' AND last_bidding_percent >= 9.8)
+    ))
+  )
+ORDER BY last_asking_amount DESC
+"""
+
+LIMIT_DOWN_925_QUERY = """
+SELECT code, name, sector,
+       last_bidding_percent as change_percent,
+       last_asking_amount as amount,
+       0 as price,
+       last_time as time, date
+FROM call_auction_minute_rollup
+WHERE date = %s
+  AND minute = '09:25:00'
+  AND (
+    (name LIKE '%%ST%%' AND last_bidding_percent <= -4.9)
+    OR
+    (name NOT LIKE '%%ST%%' AND (
+        ((code LIKE '30%%' OR code LIKE '688%%') AND last_bidding_percent <= -19.8)
+        OR
+        ((code LIKE '8%%' OR code LIKE '43%%' OR code LIKE '92%%') AND last_bidding_percent <= -29.8)
+        OR
+        (code NOT LIKE '30%%' AND code NOT LIKE '688%%' AND code NOT LIKE '8%%' AND code NOT LIKE '43%%' AND code NOT LIKE '92%%' AND last_bidding_percent <= -9.8)
+    ))
+  )
+ORDER BY last_asking_amount DESC
+"""
+
+# Rise from each stock's first auction tick (first_* of its earliest minute) to
+# its last 9:25 tick, in one pass over the date's 9:15-9:25 minutes
+ABNORMAL_MOVEMENT_925_QUERY = """
+SELECT code, name, sector, change_percent, amplitude, amount, 0 as price, time, date
+FROM (
+    SELECT code, name, sector, minute,
+           last_bidding_percent as change_percent,
+           last_bidding_percent - FIRST_VALUE(first_bidding_percent)
+               OVER (PARTITION BY code ORDER BY minute) as amplitude,
+           last_bidding_amount as amount,
+           last_time as time, date
+    FROM call_auction_minute_rollup
+    WHERE date = %s AND minute BETWEEN '09:15:00' AND '09:25:00'
+) w
+WHERE minute = '09:25:00'
+  AND amplitude >= 5
+  AND amount >= 50000000
+ORDER BY amplitude DESC
+LIMIT %s
+"""
+
+# dataset -> cache namespaces built from that dataset's rows of the same date
+SAME_DAY_NAMESPACES = {
+    CALL_AUCTION: ('top_n', 'ranking', 'yesterday_limit_up_perf', 'limit_up_925', 'limit_down_925',
+                   'abnormal_movement_925', 'dashboard_bundle'),
+    MARKET_SENTIMENT: ('market_sentiment_925', 'dashboard_bundle'),
+    LIMIT_UP: ('yesterday_limit_up',),
+}
+
+# dataset -> cache namespaces of the next trading day that read this date as "yesterday"
+NEXT_DAY_NAMESPACES = {
+    MARKET_SENTIMENT: ('market_sentiment_925', 'dashboard_bundle'),
+    LIMIT_UP: ('day_context', 'top_n', 'yesterday_limit_up_perf', 'limit_up_925', 'limit_down_925',
+               'abnormal_movement_925', 'dashboard_bundle'),
+}
+
 class MarketService:
     """
     Service for querying market data (Call Auction, Limit Up, etc.)
     """
 
     @staticmethod
-    def get_top_n_call_auction(limit=50, date_str=None, time_str=None):
+    def invalidate_cache(dataset, date_str, version=None):
+        """
+        Drop the cached results built from dataset's rows for date_str once new
+        rows are committed: that date's widgets, plus the next trading day's
+        widgets that show date_str as the previous day.
+        """
+        for namespace in SAME_DAY_NAMESPACES.get(dataset, ()):
+            CacheManager.delete_prefix(f"{namespace}:{date_str}")
+
+        next_namespaces = NEXT_DAY_NAMESPACES.get(dataset)
+        if next_namespaces:
+            if TradingCalendar.is_loaded():
+                next_date = TradingCalendar.next_trading_day(date_str)
+            else:
+                next_date = datetime.date.today().strftime('%Y-%m-%d')
+            if next_date:
+                for namespace in next_namespaces:
+                    CacheManager.delete_prefix(f"{namespace}:{next_date}")
+
+    @staticmethod
+    def _cached(cache_key, date_str, compute, ttl):
+        """
+        Cached result of compute() for a widget of date_str.
+        Live dates expire after ttl. Past days never expire (late corrections
+        still reach readers through invalidate_cache) and are read from the
+        nightly DayResultStore before running any query.
+        """
+        collection = DayResultStore.collecting(date_str)
+        if collection is not None:
+            try:
+                value = compute()
+            except Exception:
+                collection['failed'] = True
+                raise
+            collection['results'][cache_key] = value
+            return value
+
+        if not DayResultStore.is_closed(date_str):
+            return CacheManager.get_or_compute(cache_key, MarketService._fresh_reads(date_str, compute), ttl=ttl)
+
+        def load_or_compute():
+            try:
+                found, value = DayResultStore.load(cache_key, date_str)
+                if found:
+                    return value
+            except Exception as e:
+                logger.error(f"Error reading stored result {cache_key}: {e}")
+            return compute()
+
+        return CacheManager.get_or_compute(cache_key, MarketService._fresh_reads(date_str, load_or_compute), ttl=None)
+
+    @staticmethod
+    def _fresh_reads(date_str, compute):
+        """
+        compute, reading from the primary while date_str's data changed within
+        the replica lag window: its result is cached under the new version, so
+        it must not be built from rows the replica has not received yet.
+        """
+        if not EventBus.recently_changed(date_str):
+            return compute
+
+        def compute_on_primary():
+            with DatabaseManager.primary_reads():
+                return compute()
+        return compute_on_primary
+
+    @staticmethod
+    @SERVICE_LATENCY.timed
+    def materialize_day(date_str, limit=50):
+        """
+        Compute every dashboard widget of date_str and store the results in
+        DayResultStore. Nothing is stored if any widget query fails.
+        Returns the number of results stored.
+        """
+        # Stored results outlive any cache, so build them from the primary
+        with DatabaseManager.primary_reads():
+            version_tag = EventBus.load_version_tag(date_str)
+            with DayResultStore.collect(date_str) as collection:
+                MarketService.get_dashboard_bundle(date_str, limit)
+                MarketService.get_yesterday_limit_up(date_str)
+        if collection['failed']:
+            raise RuntimeError(f"Some widgets of {date_str} failed, results not stored")
+        DayResultStore.save(date_str, collection['results'], version_tag)
+        return len(collection['results'])
+
+    @staticmethod
+    @SERVICE_LATENCY.timed
+    def get_top_n_call_auction(limit=50, date_str=None, time_str=None, context=None):
         """
         Get Top N call auction data with amounts at 9:15, 9:20, and 9:25.
         Also attempts to join with yesterday_limit_up to get consecutive days.
+        context: optional result of _build_day_context shared by the dashboard bundle.
         """
         if not date_str:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"top_n:{date_str}:{time_str}:{limit}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
 
-        try:
-            # 1. Get Top N stocks based on 9:25 amount (taking the latest tick in the minute)
-            # Time window for 9:25
-            query_top_n = """
-            SELECT t1.code, t1.name, t1.sector, 
-                   t1.bidding_percent as change_percent, 
-                   (t1.bidding_amount + t1.asking_amount) as amount, 
-                   t1.time, t1.date
-            FROM call_auction_data t1
-            JOIN (
-                SELECT code, MAX(time) as max_time
-                FROM call_auction_data
-                WHERE date = %s AND time >= '09:25:00' AND time < '09:26:00'
-                GROUP BY code
-            ) t2 ON t1.code = t2.code AND t1.time = t2.max_time
-            WHERE t1.date = %s
-              AND NOT (
-                  -- Exclude Limit Down (Nuclear Button)
-                  (t1.name LIKE '%%ST%%' AND t1.bidding_percent <= -4.5) OR
-                  ((t1.code LIKE '30%%' OR t1.code LIKE '688%%') AND t1.bidding_percent <= -19.0) OR
-                  ((t1.code LIKE '8%%' OR t1.code LIKE '4%%' OR t1.code LIKE '9%%') AND t1.bidding_percent <= -29.0) OR
-                  (t1.name NOT LIKE '%%ST%%' AND t1.code NOT LIKE '30%%' AND t1.code NOT LIKE '688%%' AND t1.code NOT LIKE '8%%' AND t1.code NOT LIKE '4%%' AND t1.code NOT LIKE '9%%' AND t1.bidding_percent <= -9.0)
-              )
-            ORDER BY (t1.bidding_amount + t1.asking_amount) DESC LIMIT %s
-            """
-            
-            top_n_data = DatabaseManager.execute_query(query_top_n, (date_str, date_str, limit), dictionary=True)
-            
+        def compute():
+            if AuctionSnapshot.serves(date_str):
+                # Current day: answered from the in-memory snapshot
+                top_n_data, history_map = AuctionSnapshot.top_n(limit)
+            else:
+                top_n_data, history_map = MarketService._query_top_n(date_str, limit)
+
             if not top_n_data:
                 return []
-                
-            codes = [row['code'] for row in top_n_data]
-            if not codes:
-                return []
-                
-            # 2. Fetch data for these codes at 9:20 and 9:15 (latest tick only)
-            format_strings = ','.join(['%s'] * len(codes))
-            query_history = f"""
-            SELECT t1.code, t1.time, (t1.bidding_amount + t1.asking_amount) as amount
-            FROM call_auction_data t1
-            JOIN (
-                SELECT code,
-                       MAX(CASE WHEN time >= '09:15:00' AND time < '09:16:00' THEN time END) as max_time_915,
-                       MAX(CASE WHEN time >= '09:20:00' AND time < '09:21:00' THEN time END) as max_time_920
-                FROM call_auction_data
-                WHERE date = %s AND code IN ({format_strings})
-                GROUP BY code
-            ) t2 ON t1.code = t2.code AND (t1.time = t2.max_time_915 OR t1.time = t2.max_time_920)
-            WHERE t1.date = %s
-            """
-            params_history = [date_str] + codes + [date_str]
-            history_data = DatabaseManager.execute_query(query_history, params_history, dictionary=True)
-            
-            # Map history data by code and time window
-            history_map = {}
-            for row in history_data:
-                code = row['code']
-                time_val = str(row['time']) # e.g. "9:15:00" or "09:15:00" depending on driver/type
-                
-                if code not in history_map:
-                    history_map[code] = {}
-                
-                # Check time window
-                # Note: str(timedelta) might be "9:15:00" (no leading zero) or "09:15:00"
-                if '9:15' in time_val: # Matches "9:15" and "09:15"
-                    history_map[code]['915'] = row['amount']
-                elif '9:20' in time_val: # Matches "9:20" and "09:20"
-                    history_map[code]['920'] = row['amount']
-            
+
             # 3. Get consecutive days from yesterday_limit_up (from previous trading day)
-            # Find previous trading day
-            prev_date_str = None
-            trading_days = MarketService.get_trading_days()
-            if trading_days and date_str in trading_days:
-                idx = trading_days.index(date_str)
-                if idx > 0:
-                    prev_date_str = trading_days[idx - 1]
-            
-            limit_up_map = {}
-            if prev_date_str:
-                query_limit_up = f"""
-                SELECT code, consecutive_days, consecutive_boards, limit_up_type
-                FROM yesterday_limit_up
-                WHERE date = %s AND code IN ({format_strings})
-                """
-                params_limit = [prev_date_str] + codes
-                limit_up_data = DatabaseManager.execute_query(query_limit_up, params_limit, dictionary=True)
-                for row in limit_up_data:
-                    limit_up_map[row['code']] = {
-                        'consecutive_days': row['consecutive_days'],
-                        'consecutive_boards': row['consecutive_boards'],
-                        'limit_up_type': row['limit_up_type']
-                    }
-            
+            day_context = context if context is not None else MarketService._get_day_context(date_str)
+            limit_up_map = day_context['prev_by_code']
+
             # 4. Merge all data
             result = []
             for row in top_n_data:
                 code = row['code']
                 hist = history_map.get(code, {})
                 limit_up_info = limit_up_map.get(code, {})
-                
+
                 # Determine sector: prefer yesterday's limit up type if available
                 sector = row['sector']
                 if limit_up_info.get('limit_up_type'):
                     sector = limit_up_info['limit_up_type']
-                
-                # Format time
-                time_val = row['time']
-                if isinstance(time_val, datetime.timedelta):
-                    time_val = str(time_val)
-                elif isinstance(time_val, datetime.time):
-                    time_val = time_val.strftime('%H:%M:%S')
-                
-                # Format date
-                date_val = row['date']
-                if isinstance(date_val, datetime.date):
-                    date_val = date_val.strftime('%Y-%m-%d')
-                
+
                 item = {
                     'code': code,
                     'name': row['name'],
@@ -153,21 +281,45 @@ class MarketService:
                     'amount_915': hist.get('915', 0),
                     'consecutive_days': limit_up_info.get('consecutive_days', 0),
                     'consecutive_boards': limit_up_info.get('consecutive_boards', 0),
-                    'time': time_val,
-                    'date': date_val,
+                    'time': row['time'],
+                    'date': row['date'],
                     'rank': row.get('rank', 0) # Though we didn't set rank in query
                 }
                 result.append(item)
-                
-            # Cache
-            CacheManager.set(cache_key, result, ttl=5)
-            
+
             return result
+
+        try:
+            return MarketService._cached(cache_key, date_str, compute, ttl=5)
         except Exception as e:
             logger.error(f"Error fetching top N data: {e}")
             return []
 
     @staticmethod
+    def _query_top_n(date_str, limit):
+        """
+        MySQL path for get_top_n_call_auction: Top N rows plus their 9:15/9:20 amounts,
+        read in one statement.
+        """
+        rows = DatabaseManager.execute_query(TOP_N_QUERY, (date_str, limit), dictionary=True, name='TOP_N_QUERY')
+
+        top_n_data = []
+        history_map = {}
+        for row in rows:
+            amount_915 = row.pop('amount_915')
+            amount_920 = row.pop('amount_920')
+            hist = {}
+            if amount_915 is not None:
+                hist['915'] = amount_915
+            if amount_920 is not None:
+                hist['920'] = amount_920
+            if hist:
+                history_map[row['code']] = hist
+            top_n_data.append(row)
+        return top_n_data, history_map
+
+    @staticmethod
+    @SERVICE_LATENCY.timed
     def get_ranking_by_time_range(start_time, end_time, limit=50, date_str=None):
         """
         Get ranking of stocks based on amount within a specific time range.
@@ -176,54 +328,34 @@ class MarketService:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"ranking:{date_str}:{start_time}:{end_time}:{limit}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
 
-        try:
-            query = """
-            SELECT t1.code, t1.name, t1.sector, 
-                   t1.bidding_percent as change_percent, 
-                   (t1.bidding_amount + t1.asking_amount) as amount, 
-                   t1.time
-            FROM call_auction_data t1
-            JOIN (
-                SELECT date, code, MIN(time) as min_time
-                FROM call_auction_data
-                WHERE date = %s AND time >= %s AND time < %s
-                GROUP BY date, code
-            ) t2 ON t1.date = t2.date AND t1.code = t2.code AND t1.time = t2.min_time
-            ORDER BY (t1.bidding_amount + t1.asking_amount) DESC LIMIT %s
-            """
-            
-            data = DatabaseManager.execute_query(query, (date_str, start_time, end_time, limit), dictionary=True)
-            
-            # Format results
+        def compute():
+            if AuctionSnapshot.serves(date_str):
+                data = AuctionSnapshot.ranking(start_time, end_time, limit)
+            else:
+                data = DatabaseManager.execute_query(RANKING_QUERY, (date_str, date_str, start_time, end_time, limit), dictionary=True, name='RANKING_QUERY')
+
             result = []
             for row in data:
-                # Format time
-                time_val = row['time']
-                if isinstance(time_val, datetime.timedelta):
-                    time_val = str(time_val)
-                elif isinstance(time_val, datetime.time):
-                    time_val = time_val.strftime('%H:%M:%S')
-                
                 result.append({
                     'code': row['code'],
                     'name': row['name'],
                     'sector': row['sector'],
                     'amount': row['amount'],
                     'change_percent': row['change_percent'],
-                    'time': time_val
+                    'time': row['time']
                 })
-            
-            CacheManager.set(cache_key, result, ttl=5)
+
             return result
+
+        try:
+            return MarketService._cached(cache_key, date_str, compute, ttl=5)
         except Exception as e:
             logger.error(f"Error fetching ranking for {start_time}-{end_time}: {e}")
             return []
 
     @staticmethod
+    @SERVICE_LATENCY.timed
     def get_yesterday_limit_up(date_str=None):
         """
         Get yesterday's limit up stocks.
@@ -235,35 +367,36 @@ class MarketService:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"yesterday_limit_up:{date_str}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
 
-        query = """
-        SELECT * FROM yesterday_limit_up 
-        WHERE date = %s 
-          AND consecutive_days >= 1 
-          AND name NOT LIKE '%%ST%%'
-        """
-        try:
+        def compute():
+            # Columns listed so the response keeps its fields (all strings, numbers and
+            # dates) if the table gains columns whose JSON form would differ
+            query = """
+            SELECT id, date, code, name, limit_up_type, consecutive_days, edition, consecutive_boards,
+                   days_boards, limit_up_form, first_limit_up_time, last_limit_up_time, open_count, expound
+            FROM yesterday_limit_up 
+            WHERE date = %s 
+              AND consecutive_days >= 1 
+              AND name NOT LIKE '%%ST%%'
+            """
             data = DatabaseManager.execute_query(query, (date_str,), dictionary=True)
-            
+
             for row in data:
-                if isinstance(row['date'], datetime.date):
-                    row['date'] = row['date'].strftime('%Y-%m-%d')
-                
                 # Add is_20cm flag
                 code = row.get('code', '')
                 row['is_20cm'] = code.startswith('30') or code.startswith('688')
-            
-            CacheManager.set(cache_key, data, ttl=60) # Cache for 1 minute
+
             return data
+
+        try:
+            return MarketService._cached(cache_key, date_str, compute, ttl=60)
         except Exception as e:
             logger.error(f"Error fetching yesterday limit up: {e}")
             return []
 
     @staticmethod
-    def get_yesterday_limit_up_performance(target_date_str=None):
+    @SERVICE_LATENCY.timed
+    def get_yesterday_limit_up_performance(target_date_str=None, context=None):
         """
         Get stocks that were limit up on the previous trading day (relative to target_date_str),
         and join with their call auction performance at 09:25 on target_date_str.
@@ -272,93 +405,74 @@ class MarketService:
             target_date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         # 1. Find previous trading day
-        trading_days = MarketService.get_trading_days()
-        if not trading_days:
+        if not TradingCalendar.is_loaded():
              # Fallback: simple date subtraction (not ideal but better than crash)
-             # This happens if akshare fails.
-             # We should probably return empty or try a simple calc
+             # This happens if the calendar could not be loaded.
              prev_date_str = (datetime.datetime.strptime(target_date_str, '%Y-%m-%d') - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+        elif TradingCalendar.is_trading_day(target_date_str):
+            prev_date_str = TradingCalendar.previous_trading_day(target_date_str)
+            if not prev_date_str:
+                return [] # target_date is the first available day, no previous day
         else:
-            try:
-                # trading_days is a list of strings 'YYYY-MM-DD', sorted
-                if target_date_str in trading_days:
-                    idx = trading_days.index(target_date_str)
-                    if idx > 0:
-                        prev_date_str = trading_days[idx - 1]
-                    else:
-                        return [] # target_date is the first available day, no previous day
-                else:
-                    # target_date might be a weekend/holiday selected by user?
-                    # or future date.
-                    # Find the closest previous trading day to be the "prev_date"?
-                    # No, if target_date is not a trading day, usually we don't have auction data for it.
-                    # But maybe user selected a weekend and wants to see Friday's performance?
-                    # The requirement says "Yesterday Limit Up Performance" on "Home Page".
-                    # Usually "Home Page" shows data for "Today" (or selected date).
-                    # If I select Saturday, I probably want to see Friday's data.
-                    # But here we assume target_date is a valid trading day where we expect auction data.
-                    # If target_date is not a trading day, return empty.
-                    return []
-            except ValueError:
-                return []
+            # target_date might be a weekend/holiday selected by user, or a future date.
+            # We assume target_date is a valid trading day where we expect auction data.
+            # If target_date is not a trading day, return empty.
+            return []
 
         cache_key = f"yesterday_limit_up_perf:{target_date_str}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        # 2. Get limit up stocks from prev_date
-        # Filter: consecutive_days >= 1, no ST
-        # Also select first_limit_up_time for sorting
-        query_limit_up = """
-        SELECT code, name, consecutive_days, edition, consecutive_boards, limit_up_type, first_limit_up_time 
-        FROM yesterday_limit_up 
-        WHERE date = %s 
-          AND consecutive_days >= 1 
-          AND name NOT LIKE '%%ST%%'
-        """
-        
-        try:
-            limit_up_stocks = DatabaseManager.execute_query(query_limit_up, (prev_date_str,), dictionary=True)
+
+        def compute():
+            # 2. Get limit up stocks from prev_date
+            # Filter: consecutive_days >= 1, no ST
+            # Also select first_limit_up_time for sorting
+            query_limit_up = """
+            SELECT code, name, consecutive_days, edition, consecutive_boards, limit_up_type, first_limit_up_time 
+            FROM yesterday_limit_up 
+            WHERE date = %s 
+              AND consecutive_days >= 1 
+              AND name NOT LIKE '%%ST%%'
+            """
+
+            day_context = context if context is not None else MarketService._get_day_context(target_date_str)
+            if day_context['prev_date'] == prev_date_str:
+                limit_up_stocks = [s for s in day_context['prev_limit_up']
+                                   if (s['consecutive_days'] or 0) >= 1 and 'ST' not in (s['name'] or '')]
+            else:
+                # Calendar unavailable: prev_date_str is a plain date - 1 guess
+                limit_up_stocks = DatabaseManager.execute_query(query_limit_up, (prev_date_str,), dictionary=True)
             if not limit_up_stocks:
                 return []
-                
+
             codes = [s['code'] for s in limit_up_stocks]
             if not codes:
                 return []
-            
+
             # 3. Get auction data for these stocks on target_date at 09:25
             # We use IN clause
             format_strings = ','.join(['%s'] * len(codes))
             # Updated to match new schema: bidding_percent, asking_amount, bidding_amount
             # Mapping: bidding_percent -> change_percent
             query_auction = f"""
-            SELECT code, bidding_percent as change_percent, asking_amount, bidding_amount
-            FROM call_auction_data 
+            SELECT code, last_bidding_percent as change_percent, last_asking_amount as asking_amount,
+                   last_bidding_amount as bidding_amount
+            FROM call_auction_minute_rollup
             WHERE date = %s 
-              AND time >= '09:25:00' AND time < '09:26:00'
+              AND minute = '09:25:00'
               AND code IN ({format_strings})
             """
-            
+
             params = [target_date_str] + codes
             auction_data = DatabaseManager.execute_query(query_auction, params, dictionary=True)
-            
+
             # Create a map for easy lookup
             auction_map = {row['code']: row for row in auction_data}
-            
+
             # 4. Merge data
             result = []
             for stock in limit_up_stocks:
                 code = stock['code']
                 auction = auction_map.get(code, {})
-                
-                # Format time string if needed
-                first_time = stock.get('first_limit_up_time')
-                if isinstance(first_time, datetime.timedelta):
-                    first_time = str(first_time)
-                elif isinstance(first_time, datetime.time):
-                    first_time = first_time.strftime('%H:%M:%S')
-                
+
                 item = {
                     'code': code,
                     'name': stock['name'],
@@ -366,30 +480,31 @@ class MarketService:
                     'edition': stock['edition'],
                     'consecutive_boards': stock['consecutive_boards'],
                     'sector': stock['limit_up_type'], # Using limit_up_type as sector
-                    'first_limit_up_time': first_time,
+                    'first_limit_up_time': stock.get('first_limit_up_time'),
                     'change_percent': auction.get('change_percent'),
                     'asking_amount': auction.get('asking_amount'),
                     'bidding_amount': auction.get('bidding_amount'),
                     'is_20cm': code.startswith('30') or code.startswith('688')
                 }
                 result.append(item)
-            
+
             # Sort by consecutive_days desc, then first_limit_up_time asc
-            # Note: first_limit_up_time might be None, handle that
+            # Note: first_limit_up_time (a TIME, i.e. timedelta) might be None, handle that
             result.sort(key=lambda x: (
-                -x['consecutive_days'], 
-                x['first_limit_up_time'] if x['first_limit_up_time'] else '23:59:59'
+                -x['consecutive_days'],
+                x['first_limit_up_time'] if x['first_limit_up_time'] is not None else datetime.timedelta(days=1)
             ))
-            
-            CacheManager.set(cache_key, result, ttl=10) # Short cache as auction data might update if today
+
             return result
-            
+
+        try:
+            return MarketService._cached(cache_key, target_date_str, compute, ttl=10)
         except Exception as e:
             logger.error(f"Error fetching yesterday limit up performance: {e}")
             return []
 
     @staticmethod
-    def _enrich_with_yesterday_limit_up_theme(data_list, current_date_str):
+    def _enrich_with_yesterday_limit_up_theme(data_list, current_date_str, context=None):
         """
         Helper method to enrich a list of stock data with yesterday's limit up theme (sector).
         Prioritizes yesterday's theme over the current sector.
@@ -397,33 +512,20 @@ class MarketService:
         if not data_list:
             return data_list
             
-        # 1. Find previous trading day
-        trading_days = MarketService.get_trading_days()
-        prev_date_str = None
-        if trading_days and current_date_str in trading_days:
-            idx = trading_days.index(current_date_str)
-            if idx > 0:
-                prev_date_str = trading_days[idx - 1]
-        
-        if not prev_date_str:
-            # Fallback or just return original
-            return data_list
-            
-        # 2. Get yesterday's limit up themes
-        query = """
-        SELECT name, limit_up_type as theme
-        FROM yesterday_limit_up
-        WHERE date = %s AND limit_up_type IS NOT NULL AND limit_up_type != ''
-        """
         try:
-            rows = DatabaseManager.execute_query(query, (prev_date_str,), dictionary=True)
-            theme_map = {row['name']: row['theme'] for row in rows}
-            
-            # 3. Enrich data
+            # 1. Previous trading day and its limit up stocks
+            if context is None:
+                context = MarketService._get_day_context(current_date_str)
+            if not context['prev_date']:
+                # Fallback or just return original
+                return data_list
+
+            # 2. Enrich data with yesterday's limit up themes, matched by code
+            prev_by_code = context['prev_by_code']
             for item in data_list:
-                name = item.get('name')
-                if name and name in theme_map:
-                    item['sector'] = theme_map[name] # Override/Set sector with yesterday's theme
+                prev = prev_by_code.get(item.get('code'))
+                if prev and prev['limit_up_type']:
+                    item['sector'] = prev['limit_up_type'] # Override/Set sector with yesterday's theme
                     
         except Exception as e:
             logger.error(f"Error enriching with yesterday theme: {e}")
@@ -431,7 +533,8 @@ class MarketService:
         return data_list
 
     @staticmethod
-    def get_limit_up_at_925(date_str=None):
+    @SERVICE_LATENCY.timed
+    def get_limit_up_at_925(date_str=None, context=None):
         """
         Get stocks with >= 9.9% change at 09:25:00.
         """
@@ -439,56 +542,27 @@ class MarketService:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"limit_up_925:{date_str}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        # We look for records at 09:25:xx with change_percent meeting limit up criteria
-        # Main board: >= 9.8%, ChiNext/STAR (300/688): >= 19.8%, ST: >= 4.9%, BJ (8/4/9): >= 29.8%
-        query = """
-        SELECT code, name, sector,
-               bidding_percent as change_percent, 
-               asking_amount as amount, 
-               0 as price, 
-               time, date
-        FROM call_auction_data 
-        WHERE date = %s 
-          AND time >= '09:25:00' AND time < '09:26:00' 
-          AND (
-            (name LIKE '%%ST%%' AND bidding_percent >= 4.9)
-            OR
-            (name NOT LIKE '%%ST%%' AND (
-                ((code LIKE '30%%' OR code LIKE '688%%') AND bidding_percent >= 19.8)
-                OR
-                ((code LIKE '8%%' OR code LIKE '43%%' OR code LIKE '92%%') AND bidding_percent >= 29.8)
-                OR
-                (code NOT LIKE '30%%' AND code NOT LIKE '688%%' AND code NOT LIKE '8%%' AND code NOT LIKE '43%%' AND code NOT LIKE '92%%' AND bidding_percent >= 9.8)
-            ))
-          )
-        ORDER BY asking_amount DESC
-        """
-        try:
-            data = DatabaseManager.execute_query(query, (date_str,), dictionary=True)
-            
-            for row in data:
-                if isinstance(row['date'], datetime.date):
-                    row['date'] = row['date'].strftime('%Y-%m-%d')
-                if isinstance(row['time'], datetime.timedelta):
-                    row['time'] = str(row['time'])
-                elif isinstance(row['time'], datetime.time):
-                    row['time'] = row['time'].strftime('%H:%M:%S')
-            
+
+        def compute():
+            if AuctionSnapshot.serves(date_str):
+                data = AuctionSnapshot.limit_925(1)
+            else:
+                data = DatabaseManager.execute_query(LIMIT_UP_925_QUERY, (date_str,), dictionary=True, name='LIMIT_UP_925_QUERY')
+
             # Enrich with yesterday's limit up theme
-            data = MarketService._enrich_with_yesterday_limit_up_theme(data, date_str)
-            
-            CacheManager.set(cache_key, data, ttl=5)
+            data = MarketService._enrich_with_yesterday_limit_up_theme(data, date_str, context)
+
             return data
+
+        try:
+            return MarketService._cached(cache_key, date_str, compute, ttl=5)
         except Exception as e:
             logger.error(f"Error fetching limit up at 9:25: {e}")
             return []
 
     @staticmethod
-    def get_limit_down_at_925(date_str=None):
+    @SERVICE_LATENCY.timed
+    def get_limit_down_at_925(date_str=None, context=None):
         """
         Get stocks with limit down change at 09:25:00.
         """
@@ -496,54 +570,27 @@ class MarketService:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"limit_down_925:{date_str}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        query = """
-        SELECT code, name, sector,
-               bidding_percent as change_percent, 
-               asking_amount as amount, 
-               0 as price, 
-               time, date
-        FROM call_auction_data 
-        WHERE date = %s 
-          AND time >= '09:25:00' AND time < '09:26:00' 
-          AND (
-            (name LIKE '%%ST%%' AND bidding_percent <= -4.9)
-            OR
-            (name NOT LIKE '%%ST%%' AND (
-                ((code LIKE '30%%' OR code LIKE '688%%') AND bidding_percent <= -19.8)
-                OR
-                ((code LIKE '8%%' OR code LIKE '43%%' OR code LIKE '92%%') AND bidding_percent <= -29.8)
-                OR
-                (code NOT LIKE '30%%' AND code NOT LIKE '688%%' AND code NOT LIKE '8%%' AND code NOT LIKE '43%%' AND code NOT LIKE '92%%' AND bidding_percent <= -9.8)
-            ))
-          )
-        ORDER BY asking_amount DESC
-        """
-        try:
-            data = DatabaseManager.execute_query(query, (date_str,), dictionary=True)
-            
-            for row in data:
-                if isinstance(row['date'], datetime.date):
-                    row['date'] = row['date'].strftime('%Y-%m-%d')
-                if isinstance(row['time'], datetime.timedelta):
-                    row['time'] = str(row['time'])
-                elif isinstance(row['time'], datetime.time):
-                    row['time'] = row['time'].strftime('%H:%M:%S')
-            
+
+        def compute():
+            if AuctionSnapshot.serves(date_str):
+                data = AuctionSnapshot.limit_925(-1)
+            else:
+                data = DatabaseManager.execute_query(LIMIT_DOWN_925_QUERY, (date_str,), dictionary=True, name='LIMIT_DOWN_925_QUERY')
+
             # Enrich with yesterday's limit up theme
-            data = MarketService._enrich_with_yesterday_limit_up_theme(data, date_str)
+            data = MarketService._enrich_with_yesterday_limit_up_theme(data, date_str, context)
 
-            CacheManager.set(cache_key, data, ttl=5)
             return data
+
+        try:
+            return MarketService._cached(cache_key, date_str, compute, ttl=5)
         except Exception as e:
             logger.error(f"Error fetching limit down at 9:25: {e}")
             return []
 
     @staticmethod
-    def get_abnormal_movement_at_925(date_str=None, limit=10):
+    @SERVICE_LATENCY.timed
+    def get_abnormal_movement_at_925(date_str=None, limit=10, context=None):
         """
         Get 'Abnormal Movement' stocks at 9:25.
         Defined as: Top 10 stocks with the highest price increase (bidding_percent) 
@@ -555,57 +602,31 @@ class MarketService:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"abnormal_movement_925:{date_str}:{limit}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        query = """
-        SELECT 
-                t25.code, t25.name, t25.sector,
-                t25.bidding_percent as change_percent, 
-                (t25.bidding_percent - t15.bidding_percent) as amplitude,
-                t25.bidding_amount as amount, 
-                0 as price, 
-                t25.time, t25.date
-            FROM call_auction_data t25
-            JOIN (
-                SELECT code, MIN(time) as min_time
-                FROM call_auction_data
-                WHERE date = %s AND time >= '09:15:00' AND time <= '09:25:00'
-                GROUP BY code
-            ) t_min_info ON t25.code = t_min_info.code
-            JOIN call_auction_data t15 ON t25.code = t15.code AND t25.date = t15.date AND t_min_info.min_time = t15.time
-            WHERE t25.date = %s 
-              AND t25.time >= '09:25:00' AND t25.time < '09:26:00'
-              AND (t25.bidding_percent - t15.bidding_percent) >= 5
-              AND t25.bidding_amount >= 50000000
-            ORDER BY (t25.bidding_percent - t15.bidding_percent) DESC
-            LIMIT %s
-        """
-        try:
-            data = DatabaseManager.execute_query(query, (date_str, date_str, limit), dictionary=True)
-            
+
+        def compute():
+            if AuctionSnapshot.serves(date_str):
+                data = AuctionSnapshot.abnormal_movement_925(limit)
+            else:
+                data = DatabaseManager.execute_query(ABNORMAL_MOVEMENT_925_QUERY, (date_str, limit), dictionary=True, name='ABNORMAL_MOVEMENT_925_QUERY')
+
             for row in data:
                 if row.get('amplitude') is not None:
                     row['amplitude'] = float(row['amplitude'])
-                if isinstance(row['date'], datetime.date):
-                    row['date'] = row['date'].strftime('%Y-%m-%d')
-                if isinstance(row['time'], datetime.timedelta):
-                    row['time'] = str(row['time'])
-                elif isinstance(row['time'], datetime.time):
-                    row['time'] = row['time'].strftime('%H:%M:%S')
-            
+
             # Enrich with yesterday's limit up theme
-            data = MarketService._enrich_with_yesterday_limit_up_theme(data, date_str)
-            
-            CacheManager.set(cache_key, data, ttl=5)
+            data = MarketService._enrich_with_yesterday_limit_up_theme(data, date_str, context)
+
             return data
+
+        try:
+            return MarketService._cached(cache_key, date_str, compute, ttl=5)
         except Exception as e:
             logger.error(f"Error fetching abnormal movement at 9:25: {e}")
             return []
 
     @staticmethod
-    def get_market_sentiment_925(date_str=None):
+    @SERVICE_LATENCY.timed
+    def get_market_sentiment_925(date_str=None, context=None):
         """
         Get market sentiment stats at 9:25 for the given date (Today) and previous trading day (Yesterday).
         Stats include: Limit Up/Down counts, Rise/Fall counts, Volume (9:25).
@@ -614,136 +635,149 @@ class MarketService:
             date_str = datetime.date.today().strftime('%Y-%m-%d')
             
         cache_key = f"market_sentiment_925:{date_str}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        # 1. Identify Today and Yesterday
-        trading_days = MarketService.get_trading_days(end_date=date_str)
-        # Sort just in case
-        trading_days.sort()
-        
-        idx = -1
-        if date_str in trading_days:
-            idx = trading_days.index(date_str)
-        else:
-            # If date_str is not in list (e.g. weekend), find the last available date
-            # But usually frontend passes a valid trading day.
-            # If not found, we treat date_str as "Today" (even if not in list) and try to find previous
-            # Check if date_str is greater than last day
-            if trading_days and date_str > trading_days[-1]:
-                # Assume date_str is valid, and last day in list is yesterday? 
-                # No, get_trading_days(end_date=date_str) should include date_str if it's a trading day.
-                pass
-        
-        yesterday_date = None
-        if idx >= 1:
-            yesterday_date = trading_days[idx-1]
-        elif idx == -1 and trading_days:
-             # If date_str not found, maybe use the last one as yesterday?
-             # This is risky. Let's just try to query date_str anyway.
-             pass
-            
-        # 2. Helper to get stats from market_sentiment_stats and market_capacity
-        def get_stats(d_str):
-            if not d_str:
-                return None
-            
-            # 1. Try to get 9:25:00 data (Opening Auction Sentiment)
-            query_stats_925 = """
-            SELECT non_st_limit_up_count, non_st_limit_down_count, rise_count, fall_count, total_turnover
-            FROM market_sentiment_stats
-            WHERE date = %s AND time >= '09:25:00' AND time < '09:26:00'
-            ORDER BY time DESC
-            LIMIT 1
-            """
-            stats = DatabaseManager.execute_query(query_stats_925, (d_str,), dictionary=True)
-            
-            limit_up = 0
-            limit_down = 0
-            rise = 0
-            fall = 0
-            vol = 0
-            
-            if stats:
-                row = stats[0]
-                limit_up = int(row.get('non_st_limit_up_count') or 0)
-                limit_down = int(row.get('non_st_limit_down_count') or 0)
-                rise = int(row.get('rise_count') or 0)
-                fall = int(row.get('fall_count') or 0)
-                # total_turnover from stats is the market turnover at that time (Wan)
-                # If we are targeting 9:25, this is the 9:25 volume
-                if row.get('total_turnover'):
-                    vol = float(row.get('total_turnover')) * 10000
-                
-            return {
-                'limit_up': limit_up,
-                'limit_down': limit_down,
-                'rise': rise,
-                'fall': fall,
-                'volume': vol
+
+        def compute():
+            # 1. Identify Today and Yesterday
+            yesterday_date = None
+            if TradingCalendar.is_trading_day(date_str):
+                yesterday_date = TradingCalendar.previous_trading_day(date_str)
+
+            # 2. Helper to get stats from market_sentiment_stats and market_capacity
+            def get_stats(d_str):
+                if not d_str:
+                    return None
+
+                # 1. Try to get 9:25:00 data (Opening Auction Sentiment)
+                query_stats_925 = """
+                SELECT non_st_limit_up_count, non_st_limit_down_count, rise_count, fall_count, total_turnover
+                FROM market_sentiment_stats
+                WHERE date = %s AND time >= '09:25:00' AND time < '09:26:00'
+                ORDER BY time DESC
+                LIMIT 1
+                """
+                stats = DatabaseManager.execute_query(query_stats_925, (d_str,), dictionary=True)
+
+                limit_up = 0
+                limit_down = 0
+                rise = 0
+                fall = 0
+                vol = 0
+
+                if stats:
+                    row = stats[0]
+                    limit_up = int(row.get('non_st_limit_up_count') or 0)
+                    limit_down = int(row.get('non_st_limit_down_count') or 0)
+                    rise = int(row.get('rise_count') or 0)
+                    fall = int(row.get('fall_count') or 0)
+                    # total_turnover from stats is the market turnover at that time (Wan)
+                    # If we are targeting 9:25, this is the 9:25 volume
+                    if row.get('total_turnover'):
+                        vol = float(row.get('total_turnover')) * 10000
+
+                return {
+                    'limit_up': limit_up,
+                    'limit_down': limit_down,
+                    'rise': rise,
+                    'fall': fall,
+                    'volume': vol
+                }
+
+            stats_today = get_stats(date_str)
+            stats_yesterday = get_stats(yesterday_date)
+
+            result = {
+                'today': stats_today,
+                'yesterday': stats_yesterday
             }
 
-        stats_today = get_stats(date_str)
-        stats_yesterday = get_stats(yesterday_date)
-        
-        result = {
-            'today': stats_today,
-            'yesterday': stats_yesterday
+            return result
+
+        return MarketService._cached(cache_key, date_str, compute, ttl=3)
+
+    @staticmethod
+    def _build_day_context(date_str):
+        """
+        Lookups shared by the widgets of one date: the previous trading day and
+        that day's yesterday_limit_up rows, also indexed by code.
+        """
+        prev_date_str = None
+        if TradingCalendar.is_trading_day(date_str):
+            prev_date_str = TradingCalendar.previous_trading_day(date_str)
+
+        prev_limit_up = []
+        if prev_date_str:
+            query = """
+            SELECT code, name, consecutive_days, edition, consecutive_boards, limit_up_type, first_limit_up_time
+            FROM yesterday_limit_up
+            WHERE date = %s
+            """
+            prev_limit_up = DatabaseManager.execute_query(query, (prev_date_str,), dictionary=True)
+
+        return {
+            'prev_date': prev_date_str,
+            'prev_limit_up': prev_limit_up,
+            'prev_by_code': {row['code']: row for row in prev_limit_up}
         }
-        
-        CacheManager.set(cache_key, result, ttl=3)
-        return result
 
     @staticmethod
-    def get_trading_days(start_date=None, end_date=None):
+    def _get_day_context(date_str):
         """
-        Get list of trading days from Sina via akshare.
+        _build_day_context for date_str, built once and shared by every widget
+        and request of that date until the previous day's limit up list changes.
+        Callers must not modify it.
         """
-        today = datetime.date.today()
+        build = MarketService._fresh_reads(date_str, lambda: MarketService._build_day_context(date_str))
+        return CacheManager.get_or_compute(f"day_context:{date_str}", build,
+                                           ttl=None if DayResultStore.is_closed(date_str) else 300)
+
+    @staticmethod
+    @SERVICE_LATENCY.timed
+    def get_dashboard_bundle(date_str=None, limit=50):
+        """
+        All call auction widgets of the dashboard for one date, computed with one
+        set of shared lookups instead of one request per widget.
+        """
+        if not date_str:
+            date_str = datetime.date.today().strftime('%Y-%m-%d')
+
+        cache_key = f"dashboard_bundle:{date_str}:{limit}"
+
+        def compute():
+            try:
+                context = MarketService._get_day_context(date_str)
+            except Exception as e:
+                logger.error(f"Error building dashboard context for {date_str}: {e}")
+                context = None
+
+            result = {
+                'date': date_str,
+                'sentiment_925': MarketService.get_market_sentiment_925(date_str, context),
+                'top_n': MarketService.get_top_n_call_auction(limit=limit, date_str=date_str, context=context),
+                'ranking_920': MarketService.get_ranking_by_time_range('09:20:00', '09:21:00', limit, date_str),
+                'ranking_915': MarketService.get_ranking_by_time_range('09:15:00', '09:16:00', limit, date_str),
+                'limit_up_925': MarketService.get_limit_up_at_925(date_str, context),
+                'limit_down_925': MarketService.get_limit_down_at_925(date_str, context),
+                'abnormal_movement_925': MarketService.get_abnormal_movement_at_925(date_str, context=context),
+                'yesterday_limit_up_performance': MarketService.get_yesterday_limit_up_performance(date_str, context)
+            }
+            return result
 
-        def to_date(d):
-            if isinstance(d, str):
-                try:
-                    return datetime.datetime.strptime(d, '%Y-%m-%d').date()
-                except ValueError:
-                    return today
-            return d
+        # Same lifetime as the shortest widget cache
+        return MarketService._cached(cache_key, date_str, compute, ttl=3)
 
+    @staticmethod
+    @SERVICE_LATENCY.timed
+    def get_trading_days(start_date=None, end_date=None):
+        """
+        Get list of trading days from the local trading calendar.
+        Defaults to the past 3 years through the next 60 days.
+        """
+        today = datetime.date.today()
         if not start_date:
-            # Default to past 3 years to cover more history
             start_date = today - datetime.timedelta(days=365 * 3)
-        else:
-            start_date = to_date(start_date)
-
         if not end_date:
-            # Future 60 days
             end_date = today + datetime.timedelta(days=60)
-        else:
-            end_date = to_date(end_date)
-            
-        cache_key = f"trading_days:{start_date}:{end_date}"
-        cached_data = CacheManager.get(cache_key)
-        if cached_data:
-            return cached_data
-            
-        try:
-            with akshare_lock:
-                import akshare as ak
-                df = ak.tool_trade_date_hist_sina()
-            
-            # Convert 'trade_date' to datetime.date if not already
-            # Usually it returns a column of dates
-            
-            # Filter range
-            mask = (df['trade_date'] >= start_date) & (df['trade_date'] <= end_date)
-            filtered = df.loc[mask]
-            
-            date_list = [d.strftime('%Y-%m-%d') for d in filtered['trade_date']]
-            
-            # Cache for 6 hours
-            CacheManager.set(cache_key, date_list, ttl=21600)
-            return date_list
-        except Exception as e:
-            logger.error(f"Error fetching trading days: {e}")
-            return []
+        return TradingCalendar.trading_days(start_date, end_date)
+
+
+EventBus.add_listener(MarketService.invalidate_cache)
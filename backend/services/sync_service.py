@@ -5,6 +5,7 @@ from utils.locks import akshare_lock
 import pandas as pd
 import logging
 from utils.database import DatabaseManager
+from utils.events import EventBus, LIMIT_UP
 from .eastmoney_service import EastmoneyService
 from .jiuyan_service import JiuyanService
 import re
@@ -65,9 +66,11 @@ class SyncService:
                 return []
             
             # Update database
-            DatabaseManager.execute_update("TRUNCATE TABLE stock_list")
+            # DELETE rather than TRUNCATE (which commits implicitly) so the old list stays until the new one is in
             insert_query = "INSERT INTO stock_list (code, name, market) VALUES (%s, %s, %s)"
-            count = DatabaseManager.execute_update(insert_query, data, many=True)
+            with DatabaseManager.transaction() as tx:
+                tx.execute("DELETE FROM stock_list")
+                count = tx.execute_batch(insert_query, data)
             
             logger.info(f"Updated stock list with {count} stocks from configuration secids.")
             return data
@@ -83,7 +86,8 @@ class SyncService:
         '''
         if not stock_list_data:
             try:
-                stock_list_data = DatabaseManager.execute_query("SELECT code, name, market FROM stock_list", dictionary=False)
+                stock_list_data = DatabaseManager.execute_query("SELECT code, name, market FROM stock_list", dictionary=False,
+                                                               read_your_writes=True)
             except Exception as e:
                 logger.error(f"Error loading stock list: {e}")
                 return
@@ -225,7 +229,9 @@ class SyncService:
                     update_data.append((consecutive_boards, first_limit_up_time, last_limit_up_time, date_str, code))   
             
             if update_data:
-                count = DatabaseManager.execute_update(update_query, update_data, many=True)
+                with DatabaseManager.transaction() as tx:
+                    count = tx.execute_batch(update_query, update_data)
+                    EventBus.publish(LIMIT_UP, date_str, tx=tx)
                 logger.info(f"Updated {count} yesterday limit up stocks with consecutive_boards from Excel for date {date_str}.")
                 return count
             else:
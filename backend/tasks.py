@@ -4,9 +4,10 @@ from services.sync_service import SyncService
 from services.jiuyan_service import JiuyanService
 from services.eastmoney_service import EastmoneyService
 from services.kaipanla_service import KaipanlaService
+from services.market_service import MarketService
+from utils.metrics import INGEST_LATENCY
+from utils.log_config import setup_logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 def run_update_stock_list():
@@ -20,6 +21,7 @@ def run_update_stock_list():
         logger.error(f"Task failed: update_all_stock_codes. Error: {e}")
         return []
 
+@INGEST_LATENCY.timed
 def run_update_call_auction_data(stock_list_data=None, date_str=None):
     """Fetch call auction data using SyncService."""
     logger.info(f"Task started: run_update_call_auction_data (date={date_str})")
@@ -31,6 +33,7 @@ def run_update_call_auction_data(stock_list_data=None, date_str=None):
         logger.error(f"Task failed: run_update_call_auction_data. Error: {e}")
         return None
 
+@INGEST_LATENCY.timed
 def run_update_yesterday_limit_up(date_str=None):
     """Fetch yesterday's limit up stocks using SyncService."""
     logger.info(f"Task started: run_update_yesterday_limit_up (date={date_str})")
@@ -42,6 +45,7 @@ def run_update_yesterday_limit_up(date_str=None):
         logger.error(f"Task failed: run_update_yesterday_limit_up. Error: {e}")
         return None
 
+@INGEST_LATENCY.timed
 def run_fetch_index_data(date_str=None):
     """Fetch index data using KaipanlaService."""
     logger.info(f"Task started: run_fetch_index_data (date={date_str})")
@@ -53,6 +57,7 @@ def run_fetch_index_data(date_str=None):
         logger.error(f"Task failed: run_fetch_index_data. Error: {e}")
         return False
 
+@INGEST_LATENCY.timed
 def run_fetch_stat_data(date_str=None):
     """Fetch statistics data (market sentiment) using KaipanlaService."""
     logger.info(f"Task started: run_fetch_stat_data (date={date_str})")
@@ -64,7 +69,22 @@ def run_fetch_stat_data(date_str=None):
         logger.error(f"Task failed: run_fetch_stat_data. Error: {e}")
         return False
 
+def run_materialize_day_results(date_str=None):
+    """Store the dashboard widget results of a finished day using MarketService."""
+    if not date_str:
+        date_str = datetime.date.today().strftime('%Y-%m-%d')
+    logger.info(f"Task started: run_materialize_day_results (date={date_str})")
+    try:
+        count = MarketService.materialize_day(date_str)
+        logger.info(f"Task completed: run_materialize_day_results. Stored {count} results.")
+        return count
+    except Exception as e:
+        logger.error(f"Task failed: run_materialize_day_results. Error: {e}")
+        return 0
+
 if __name__ == "__main__":
+    # Run directly: log to the console (imported by scheduler.py, which sets up its own logging)
+    setup_logging()
     # Test run
     # run_update_stock_list()
     # fetch_call_auction_data()
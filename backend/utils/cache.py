@@ -1,52 +1,422 @@
 import time
 import logging
+import threading
+from collections import OrderedDict
+
+from utils.cache_backends import create_backend
+from utils.metrics import register_collector
 
 logger = logging.getLogger(__name__)
 
+# Returned by CacheManager.get(key, MISSING) when key is not cached, as opposed to a cached empty value
+MISSING = object()
+
+def _is_empty(value):
+    return value is None or (isinstance(value, (list, tuple, dict, set, str)) and not value)
+
 class CacheManager:
     """
     Simple in-memory cache manager.
-    Can be replaced with Redis later.
+
+    Keys are grouped by namespace (the part before the first ':'), each an LRU
+    bounded by NAMESPACE_LIMITS. Expired entries are dropped on access and by a
+    background sweeper. All access is serialized by one lock.
+
+    With a shared backend configured (CACHE_BACKEND=redis), entries live there
+    instead so all worker processes share them, and get_or_compute also holds
+    a backend lock so one process computes each missing key.
     """
-    _cache = {}
-    _expiry = {}
+    # Max entries per namespace; anything not listed uses DEFAULT_MAX_ENTRIES
+    DEFAULT_MAX_ENTRIES = 256
+    NAMESPACE_LIMITS = {
+        'top_n': 64,
+        'ranking': 128,
+        'limit_up_925': 32,
+        'limit_down_925': 32,
+        'abnormal_movement_925': 32,
+        'market_sentiment_925': 32,
+        'yesterday_limit_up': 32,
+        'yesterday_limit_up_perf': 32,
+        'dashboard_bundle': 32,
+        'day_context': 32,
+        'response': 256,
+    }
+    SWEEP_INTERVAL = 30
+    # TTL for empty results (no rows for a date); these change rarely and are
+    # also dropped by event-driven invalidation when new data arrives
+    EMPTY_TTL = 30
+    # Seconds a caller waits on another caller's computation before computing itself
+    FLIGHT_TIMEOUT = 30
+    # Minutes of per-minute coalescing history kept for stats
+    COALESCED_HISTORY_MINUTES = 60
+    # Seconds between checks while another process computes a key
+    LOCK_POLL_INTERVAL = 0.05
+
+    _lock = threading.RLock()
+    # namespace -> OrderedDict(key -> (value, expires_at or None)), least recently used first
+    _namespaces = {}
+    _stats = {}
+    # key -> in-flight computation shared by concurrent misses
+    _flights = {}
+    # Bumped by every delete so a computation started before it is not cached after it
+    _generation = 0
+    _coalesced_by_minute = OrderedDict()
+    _sweeper = None
+    # Shared backend (e.g. RedisCacheBackend), or None for the in-process LRU
+    _backend = None
+
+    @staticmethod
+    def configure(backend):
+        """
+        Use backend for entries from now on (None for the in-process LRU).
+        """
+        with CacheManager._lock:
+            CacheManager._backend = backend
+            CacheManager._namespaces.clear()
+
+    @staticmethod
+    def _namespace(key):
+        return str(key).split(':', 1)[0]
+
+    @staticmethod
+    def _counter(namespace):
+        stats = CacheManager._stats.get(namespace)
+        if stats is None:
+            stats = {'hits': 0, 'empty_hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0, 'expirations': 0,
+                     'computes': 0, 'coalesced': 0}
+            CacheManager._stats[namespace] = stats
+        return stats
 
     @staticmethod
     def set(key, value, ttl=None):
         """
         Set a value in the cache with optional TTL (in seconds).
         """
-        CacheManager._cache[key] = value
-        if ttl:
-            CacheManager._expiry[key] = time.time() + ttl
-        elif key in CacheManager._expiry:
-            del CacheManager._expiry[key]
+        namespace = CacheManager._namespace(key)
+        backend = CacheManager._backend
+        if backend is not None:
+            try:
+                backend.set(key, value, ttl)
+            except Exception as e:
+                logger.error(f"Cache backend error setting {key}: {e}")
+                return
+            with CacheManager._lock:
+                CacheManager._counter(namespace)['sets'] += 1
+            return
+
+        CacheManager._ensure_sweeper()
+        expires_at = time.time() + ttl if ttl else None
+        limit = CacheManager.NAMESPACE_LIMITS.get(namespace, CacheManager.DEFAULT_MAX_ENTRIES)
+        with CacheManager._lock:
+            entries = CacheManager._namespaces.setdefault(namespace, OrderedDict())
+            entries[key] = (value, expires_at)
+            entries.move_to_end(key)
+            stats = CacheManager._counter(namespace)
+            stats['sets'] += 1
+            while len(entries) > limit:
+                entries.popitem(last=False)
+                stats['evictions'] += 1
+
+    @staticmethod
+    def get(key, default=None):
+        """
+        Get a value from the cache. Returns default if expired or not found;
+        pass MISSING to tell a cached empty value from a miss.
+        """
+        namespace = CacheManager._namespace(key)
+        backend = CacheManager._backend
+        if backend is not None:
+            return CacheManager._backend_get(backend, key, namespace, default)
+
+        with CacheManager._lock:
+            stats = CacheManager._counter(namespace)
+            entries = CacheManager._namespaces.get(namespace)
+            entry = entries.get(key) if entries else None
+            if entry is None:
+                stats['misses'] += 1
+                return default
+            value, expires_at = entry
+            if expires_at is not None and time.time() > expires_at:
+                del entries[key]
+                stats['expirations'] += 1
+                stats['misses'] += 1
+                return default
+            entries.move_to_end(key)
+            stats['hits'] += 1
+            if _is_empty(value):
+                stats['empty_hits'] += 1
+            return value
+
+    @staticmethod
+    def _backend_get(backend, key, namespace, default):
+        try:
+            found, value = backend.get(key)
+        except Exception as e:
+            logger.error(f"Cache backend error reading {key}: {e}")
+            found, value = False, None
+        with CacheManager._lock:
+            stats = CacheManager._counter(namespace)
+            if not found:
+                stats['misses'] += 1
+                return default
+            stats['hits'] += 1
+            if _is_empty(value):
+                stats['empty_hits'] += 1
+        return value
 
     @staticmethod
-    def get(key):
+    def get_or_compute(key, compute, ttl=None, empty_ttl=None):
         """
-        Get a value from the cache. Returns None if expired or not found.
+        Return the cached value for key, or compute it and cache it with ttl.
+        Empty results are cached too, for empty_ttl (default EMPTY_TTL, or no
+        expiry when ttl is None).
+        Exceptions from compute() propagate and are never cached.
+        Concurrent misses on the same key run compute() once; the other callers
+        wait for that result instead of repeating the work (single flight).
         """
-        if key in CacheManager._expiry:
-            if time.time() > CacheManager._expiry[key]:
-                CacheManager.delete(key)
-                return None
-        return CacheManager._cache.get(key)
-        
+        value = CacheManager.get(key, MISSING)
+        if value is not MISSING:
+            return value
+
+        with CacheManager._lock:
+            flight = CacheManager._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = {'done': threading.Event(), 'value': None, 'error': None}
+                CacheManager._flights[key] = flight
+            generation = CacheManager._generation
+
+        if not leader:
+            if flight['done'].wait(CacheManager.FLIGHT_TIMEOUT):
+                CacheManager._record_coalesced(key)
+                if flight['error'] is not None:
+                    raise flight['error']
+                return flight['value']
+            logger.warning(f"Timed out waiting for in-flight computation of {key}, computing it again")
+            return compute()
+
+        backend = CacheManager._backend
+        token = None
+        try:
+            if backend is not None:
+                token, value = CacheManager._backend_lock(backend, key)
+                if value is not MISSING:
+                    flight['value'] = value
+                    return value
+            value = compute()
+            flight['value'] = value
+            entry_ttl = (empty_ttl or CacheManager.EMPTY_TTL) if _is_empty(value) and ttl is not None else ttl
+            if backend is None:
+                with CacheManager._lock:
+                    if CacheManager._generation == generation:
+                        CacheManager.set(key, value, ttl=entry_ttl)
+                return value
+
+            # The backend round trip runs without the process lock; if an invalidation
+            # lands meanwhile, the value just stored is dropped again
+            with CacheManager._lock:
+                current = CacheManager._generation == generation
+            if current:
+                CacheManager.set(key, value, ttl=entry_ttl)
+                with CacheManager._lock:
+                    current = CacheManager._generation == generation
+                if not current:
+                    try:
+                        backend.delete(key)
+                    except Exception as e:
+                        logger.error(f"Cache backend error deleting {key}: {e}")
+            return value
+        except Exception as e:
+            flight['error'] = e
+            raise
+        finally:
+            if token is not None:
+                try:
+                    backend.release_lock(key, token)
+                except Exception as e:
+                    logger.error(f"Cache backend error releasing lock for {key}: {e}")
+            with CacheManager._lock:
+                if CacheManager._flights.get(key) is flight:
+                    del CacheManager._flights[key]
+                CacheManager._counter(CacheManager._namespace(key))['computes'] += 1
+            flight['done'].set()
+
+    @staticmethod
+    def _backend_lock(backend, key):
+        """
+        Take the backend lock for key, waiting while another process holds it.
+        Returns (token, MISSING) when this process should compute the value, or
+        (None, value) when the other process cached it meanwhile.
+        """
+        deadline = time.time() + CacheManager.FLIGHT_TIMEOUT
+        while True:
+            try:
+                token = backend.acquire_lock(key, CacheManager.FLIGHT_TIMEOUT)
+                # Re-read even with the lock: the previous holder may have just stored the value
+                found, value = backend.get(key)
+                if token is not None and found:
+                    backend.release_lock(key, token)
+                elif token is not None:
+                    return token, MISSING
+            except Exception as e:
+                logger.error(f"Cache backend error locking {key}: {e}")
+                return None, MISSING
+            if found:
+                CacheManager._record_coalesced(key)
+                return None, value
+            if time.time() > deadline:
+                logger.warning(f"Timed out waiting for another process to compute {key}, computing it again")
+                return None, MISSING
+            time.sleep(CacheManager.LOCK_POLL_INTERVAL)
+
+    @staticmethod
+    def _record_coalesced(key):
+        minute = time.strftime('%Y-%m-%d %H:%M')
+        with CacheManager._lock:
+            CacheManager._counter(CacheManager._namespace(key))['coalesced'] += 1
+            history = CacheManager._coalesced_by_minute
+            history[minute] = history.get(minute, 0) + 1
+            while len(history) > CacheManager.COALESCED_HISTORY_MINUTES:
+                history.popitem(last=False)
+
+    @staticmethod
+    def coalesced_by_minute():
+        """
+        Duplicate computations avoided per minute ('YYYY-MM-DD HH:MM'), most recent last.
+        """
+        with CacheManager._lock:
+            return dict(CacheManager._coalesced_by_minute)
+
     @staticmethod
     def delete(key):
         """
         Delete a key from the cache.
         """
-        if key in CacheManager._cache:
-            del CacheManager._cache[key]
-        if key in CacheManager._expiry:
-            del CacheManager._expiry[key]
+        with CacheManager._lock:
+            CacheManager._generation += 1
+            CacheManager._flights.pop(key, None)
+            entries = CacheManager._namespaces.get(CacheManager._namespace(key))
+            if entries is not None:
+                entries.pop(key, None)
+            backend = CacheManager._backend
+        if backend is not None:
+            try:
+                backend.delete(key)
+            except Exception as e:
+                logger.error(f"Cache backend error deleting {key}: {e}")
+
+    @staticmethod
+    def delete_prefix(prefix):
+        """
+        Delete every key starting with prefix. Returns the number of keys deleted.
+        """
+        with CacheManager._lock:
+            CacheManager._generation += 1
+            for key in [key for key in CacheManager._flights if key.startswith(prefix)]:
+                del CacheManager._flights[key]
+            backend = CacheManager._backend
+            if backend is None:
+                entries = CacheManager._namespaces.get(CacheManager._namespace(prefix))
+                if not entries:
+                    return 0
+                keys = [key for key in entries if key.startswith(prefix)]
+                for key in keys:
+                    del entries[key]
+                return len(keys)
+        try:
+            return backend.delete_prefix(prefix)
+        except Exception as e:
+            logger.error(f"Cache backend error deleting {prefix}*: {e}")
+            return 0
 
     @staticmethod
     def clear():
         """
         Clear all cache entries.
         """
-        CacheManager._cache.clear()
-        CacheManager._expiry.clear()
+        with CacheManager._lock:
+            CacheManager._generation += 1
+            CacheManager._flights.clear()
+            CacheManager._namespaces.clear()
+            backend = CacheManager._backend
+        if backend is not None:
+            try:
+                backend.clear()
+            except Exception as e:
+                logger.error(f"Cache backend error clearing: {e}")
+
+    @staticmethod
+    def sweep():
+        """
+        Remove expired entries from every namespace. Returns the number removed.
+        """
+        now = time.time()
+        removed = 0
+        with CacheManager._lock:
+            for namespace, entries in CacheManager._namespaces.items():
+                expired = [key for key, (_, expires_at) in entries.items()
+                           if expires_at is not None and now > expires_at]
+                for key in expired:
+                    del entries[key]
+                CacheManager._counter(namespace)['expirations'] += len(expired)
+                removed += len(expired)
+        return removed
+
+    @staticmethod
+    def stats():
+        """
+        Per-namespace size, limit and hit/miss/eviction counters.
+        """
+        with CacheManager._lock:
+            result = {}
+            for namespace in set(CacheManager._namespaces) | set(CacheManager._stats):
+                counters = dict(CacheManager._counter(namespace))
+                lookups = counters['hits'] + counters['misses']
+                counters['hit_rate'] = round(counters['hits'] / lookups, 4) if lookups else None
+                # Entries in a shared backend are not counted per process
+                counters['size'] = None if CacheManager._backend is not None else len(CacheManager._namespaces.get(namespace, ()))
+                counters['max_size'] = CacheManager.NAMESPACE_LIMITS.get(namespace, CacheManager.DEFAULT_MAX_ENTRIES)
+                result[namespace] = counters
+            return result
+
+    @staticmethod
+    def metric_families():
+        """
+        stats() as Prometheus metric families for /metrics.
+        """
+        stats = CacheManager.stats()
+        counters = ('hits', 'empty_hits', 'misses', 'sets', 'evictions', 'expirations', 'computes', 'coalesced')
+        families = [(f"cache_{name}_total", 'counter', f"Cache {name.replace('_', ' ')} by namespace.",
+                     [({'namespace': namespace}, values[name]) for namespace, values in sorted(stats.items())])
+                    for name in counters]
+        families.append(('cache_hit_ratio', 'gauge', 'Cache hits over lookups by namespace.',
+                         [({'namespace': namespace}, values['hit_rate']) for namespace, values in sorted(stats.items())]))
+        families.append(('cache_entries', 'gauge', 'Cached entries by namespace (local cache only).',
+                         [({'namespace': namespace}, values['size']) for namespace, values in sorted(stats.items())
+                          if values['size'] is not None]))
+        return families
+
+    @staticmethod
+    def _ensure_sweeper():
+        if CacheManager._sweeper is not None:
+            return
+        with CacheManager._lock:
+            if CacheManager._sweeper is not None:
+                return
+            CacheManager._sweeper = threading.Thread(target=CacheManager._sweep_loop, name='cache-sweeper', daemon=True)
+            CacheManager._sweeper.start()
+
+    @staticmethod
+    def _sweep_loop():
+        stop = threading.Event()
+        while not stop.wait(CacheManager.SWEEP_INTERVAL):
+            try:
+                removed = CacheManager.sweep()
+                if removed:
+                    logger.debug(f"Cache sweeper removed {removed} expired entries")
+            except Exception as e:
+                logger.error(f"Cache sweeper error: {e}")
+
+
+CacheManager.configure(create_backend())
+register_collector(CacheManager.metric_families)
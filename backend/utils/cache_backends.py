@@ -0,0 +1,152 @@
+import base64
+import datetime
+import json
+import logging
+import os
+import uuid
+from decimal import Decimal
+
+logger = logging.getLogger(__name__)
+
+# Selects where CacheManager keeps its entries: 'local' (per process) or 'redis' (shared by workers)
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'local')
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/0')
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'jjbs:')
+
+# Marks encoded non-JSON values; a real dict with this key would be decoded wrongly, none of ours has one
+TYPE_TAG = '__t'
+
+
+def _encode_default(value):
+    if isinstance(value, Decimal):
+        return {TYPE_TAG: 'decimal', 'v': str(value)}
+    if isinstance(value, datetime.datetime):
+        return {TYPE_TAG: 'datetime', 'v': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {TYPE_TAG: 'date', 'v': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {TYPE_TAG: 'time', 'v': value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {TYPE_TAG: 'timedelta', 'v': value.total_seconds()}
+    if isinstance(value, bytes):
+        return {TYPE_TAG: 'bytes', 'v': base64.b64encode(value).decode('ascii')}
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    raise TypeError(f"Cannot cache value of type {type(value).__name__}")
+
+
+def _decode_hook(obj):
+    kind = obj.get(TYPE_TAG)
+    if kind is None:
+        return obj
+    value = obj['v']
+    if kind == 'decimal':
+        return Decimal(value)
+    if kind == 'datetime':
+        return datetime.datetime.fromisoformat(value)
+    if kind == 'date':
+        return datetime.date.fromisoformat(value)
+    if kind == 'time':
+        return datetime.time.fromisoformat(value)
+    if kind == 'timedelta':
+        return datetime.timedelta(seconds=value)
+    if kind == 'bytes':
+        return base64.b64decode(value)
+    return obj
+
+
+def encode(value):
+    """
+    Serialize a cached value to bytes. Decimal, date, datetime, time,
+    timedelta and bytes round-trip with their types; tuples come back as lists.
+    """
+    return json.dumps(value, default=_encode_default, separators=(',', ':')).encode('utf-8')
+
+
+def decode(data):
+    return json.loads(data, object_hook=_decode_hook)
+
+
+class RedisCacheBackend:
+    """
+    Cache entries stored in Redis (or anything speaking its protocol), shared
+    by every worker process. Only get/set/delete/scan_iter are used on the
+    client, so tests can pass a small fake instead of a server.
+    """
+    # Keys are scanned and deleted in batches of this size by delete_prefix
+    SCAN_COUNT = 500
+
+    def __init__(self, client, prefix=CACHE_KEY_PREFIX):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        """
+        Returns (True, value) when key is cached, (False, None) otherwise.
+        """
+        data = self.client.get(self.prefix + key)
+        if data is None:
+            return False, None
+        return True, decode(data)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, encode(value), ex=int(ttl) if ttl else None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self._escape(self.prefix + prefix) + '*', count=self.SCAN_COUNT))
+        for i in range(0, len(keys), self.SCAN_COUNT):
+            self.client.delete(*keys[i:i + self.SCAN_COUNT])
+        return len(keys)
+
+    def clear(self):
+        return self.delete_prefix('')
+
+    def acquire_lock(self, key, timeout):
+        """
+        Take the cross-process compute lock for key. Returns a token for
+        release_lock, or None if another process holds it. The lock expires
+        after timeout seconds in case its holder dies.
+        """
+        token = uuid.uuid4().hex
+        if self.client.set(f"{self.prefix}lock:{key}", token, nx=True, ex=int(timeout)):
+            return token
+        return None
+
+    def release_lock(self, key, token):
+        # get-then-delete can drop a lock that expired and was retaken in between;
+        # the cost is one duplicate computation, not a wrong result
+        name = f"{self.prefix}lock:{key}"
+        current = self.client.get(name)
+        if isinstance(current, bytes):
+            current = current.decode('utf-8')
+        if current == token:
+            self.client.delete(name)
+
+    @staticmethod
+    def _escape(pattern):
+        for char in '\\*?[]':
+            pattern = pattern.replace(char, '\\' + char)
+        return pattern
+
+
+def create_backend(name=CACHE_BACKEND, url=CACHE_REDIS_URL):
+    """
+    Build the configured shared backend, or None for the in-process cache.
+    Falls back to the in-process cache if the redis package is missing.
+    """
+    if not name or name == 'local':
+        return None
+    if name != 'redis':
+        logger.error(f"Unknown CACHE_BACKEND '{name}', using the local cache.")
+        return None
+    try:
+        import redis
+    except ImportError:
+        logger.error("CACHE_BACKEND=redis but the redis package is not installed, using the local cache.")
+        return None
+    logger.info(f"Using Redis cache backend at {url}")
+    return RedisCacheBackend(redis.Redis.from_url(url))
@@ -1,6 +1,13 @@
+import io
+import os
 import logging
+import datetime
+import tempfile
+import threading
+from decimal import Decimal
 from contextlib import contextmanager
-from utils.db_config import get_connection
+from utils.db_config import get_connection, USE_LOAD_DATA
+from utils.metrics import SQL_LATENCY, statement_label
 
 logger = logging.getLogger(__name__)
 
@@ -8,18 +15,44 @@ class DatabaseManager:
     """
     Database Manager to handle connections and execute queries.
     """
-    
+
+    # Rows per multi-row INSERT/REPLACE statement in bulk_insert
+    BULK_CHUNK_SIZE = 1000
+    # Rows per fetchmany round trip in iter_query
+    STREAM_BATCH_SIZE = 2000
+
+    _local = threading.local()
+
+    @staticmethod
+    @contextmanager
+    def primary_reads():
+        """
+        Within this block, execute_query and iter_query on this thread read from
+        the primary, as if read_your_writes=True were passed to each of them.
+        """
+        previous = getattr(DatabaseManager._local, 'primary_reads', False)
+        DatabaseManager._local.primary_reads = True
+        try:
+            yield
+        finally:
+            DatabaseManager._local.primary_reads = previous
+
+    @staticmethod
+    def _read_only(read_your_writes):
+        return not (read_your_writes or getattr(DatabaseManager._local, 'primary_reads', False))
+
     @staticmethod
     @contextmanager
-    def get_cursor(commit=False, dictionary=False):
+    def get_cursor(commit=False, dictionary=False, read_only=False):
         """
         Context manager for database cursor.
         Handles connection acquisition, commit/rollback, and closing.
+        read_only cursors come from the read pool (the primary unless DB_READ_HOST is set).
         """
         cnx = None
         cursor = None
         try:
-            cnx = get_connection()
+            cnx = get_connection(read_only=read_only)
             cursor = cnx.cursor(dictionary=dictionary)
             yield cursor
             if commit:
@@ -39,15 +72,72 @@ class DatabaseManager:
                 cnx.close()
 
     @staticmethod
-    def execute_query(query, params=None, dictionary=True, fetch_one=False):
+    def execute_query(query, params=None, dictionary=True, fetch_one=False, read_your_writes=False, name=None):
         """
         Execute a SELECT query and return results.
+        Runs on the read pool, which may lag the primary when it is a replica;
+        pass read_your_writes=True (or use primary_reads()) when the query must
+        see rows just written. name labels the query's latency metric.
         """
-        with DatabaseManager.get_cursor(commit=False, dictionary=dictionary) as cursor:
-            cursor.execute(query, params or ())
-            if fetch_one:
-                return cursor.fetchone()
-            return cursor.fetchall()
+        with DatabaseManager.get_cursor(commit=False, dictionary=dictionary,
+                                        read_only=DatabaseManager._read_only(read_your_writes)) as cursor:
+            with SQL_LATENCY.time(statement_label(query, name)):
+                cursor.execute(query, params or ())
+                if fetch_one:
+                    return cursor.fetchone()
+                return cursor.fetchall()
+
+    @staticmethod
+    def iter_query(query, params=None, dictionary=True, batch_size=None, read_your_writes=False, name=None):
+        """
+        Yield the rows of a SELECT without holding the result set in memory.
+        Rows are streamed from the server through an unbuffered cursor,
+        batch_size at a time; dictionary=False yields tuples, which are cheaper
+        for exports. The connection stays checked out until the generator is
+        exhausted or closed, so consume it promptly.
+        """
+        if batch_size is None:
+            batch_size = DatabaseManager.STREAM_BATCH_SIZE
+
+        cnx = get_connection(read_only=DatabaseManager._read_only(read_your_writes))
+        cursor = None
+        try:
+            cursor = cnx.cursor(buffered=False, dictionary=dictionary)
+            # Only the execute is timed; the fetches run at the consumer's pace
+            with SQL_LATENCY.time(statement_label(query, name)):
+                cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        except Exception as e:
+            logger.error(f"Database error: {e}")
+            raise
+        finally:
+            try:
+                # A generator closed early leaves rows on the wire; they must be read
+                # before the connection can run another statement
+                if cnx.unread_result:
+                    cnx.consume_results()
+                if cursor:
+                    cursor.close()
+            finally:
+                cnx.close()
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """
+        Unit of work: the statements run through the yielded Transaction share
+        one connection and are committed together when the block exits, or
+        rolled back together if it raises. Callbacks registered with
+        after_commit run, in order, once the commit has succeeded.
+        """
+        with DatabaseManager.get_cursor(commit=True) as cursor:
+            tx = Transaction(cursor)
+            yield tx
+        tx._run_after_commit()
 
     @staticmethod
     def execute_update(query, params=None, many=False):
@@ -55,12 +145,10 @@ class DatabaseManager:
         Execute an INSERT/UPDATE/DELETE query.
         Returns the number of affected rows.
         """
-        with DatabaseManager.get_cursor(commit=True) as cursor:
+        with DatabaseManager.transaction() as tx:
             if many:
-                cursor.executemany(query, params or [])
-            else:
-                cursor.execute(query, params or ())
-            return cursor.rowcount
+                return tx.execute_batch(query, params)
+            return tx.execute(query, params)
 
     @staticmethod
     def execute_batch(query, params_list):
@@ -68,3 +156,159 @@ class DatabaseManager:
         Execute many INSERT/UPDATE/DELETE queries at once.
         """
         return DatabaseManager.execute_update(query, params_list, many=True)
+
+    @staticmethod
+    def bulk_insert(table, columns, rows, replace=False, chunk_size=None, use_load_data=None, on_duplicate=None):
+        """
+        Write many rows in one transaction. See Transaction.bulk_insert.
+        Returns the number of rows written.
+        """
+        if not rows:
+            return 0
+        with DatabaseManager.transaction() as tx:
+            return tx.bulk_insert(table, columns, rows, replace=replace, chunk_size=chunk_size,
+                                  use_load_data=use_load_data, on_duplicate=on_duplicate)
+
+    @staticmethod
+    def _bulk_insert(cursor, table, columns, rows, replace=False, chunk_size=None, use_load_data=None,
+                     on_duplicate=None):
+        """
+        Rows are sent as chunked multi-row VALUES statements (executemany only
+        rewrites plain INSERT, so REPLACE would otherwise go row by row), or via
+        LOAD DATA LOCAL INFILE when use_load_data is enabled.
+        on_duplicate is an optional ON DUPLICATE KEY UPDATE assignment list
+        (not supported by LOAD DATA, which is skipped in that case).
+        LOAD DATA is only used with replace: with LOCAL the server ignores
+        duplicate keys instead of failing, unlike a plain INSERT.
+        """
+        if not rows:
+            return 0
+        if chunk_size is None:
+            chunk_size = DatabaseManager.BULK_CHUNK_SIZE
+        if use_load_data is None:
+            use_load_data = USE_LOAD_DATA
+        use_load_data = use_load_data and replace and not on_duplicate
+
+        verb = 'REPLACE' if replace else 'INSERT'
+        prefix = f"{verb} INTO {table} ({', '.join(columns)}) VALUES "
+        # Timed as a whole under table.op, whatever the chunking or transport
+        with SQL_LATENCY.time(f"{table}.{verb.lower()}"):
+            if use_load_data:
+                # The fallback runs in the same transaction, so undo whatever a failed load wrote first
+                cursor.execute("SAVEPOINT bulk_load")
+                try:
+                    DatabaseManager._load_data_infile(cursor, table, columns, rows, replace)
+                    cursor.execute("RELEASE SAVEPOINT bulk_load")
+                    return len(rows)
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO SAVEPOINT bulk_load")
+                    logger.warning(f"LOAD DATA into {table} failed, falling back to multi-row insert: {e}")
+
+            placeholders = '(' + ', '.join(['%s'] * len(columns)) + ')'
+            suffix = f" ON DUPLICATE KEY UPDATE {on_duplicate}" if on_duplicate else ''
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                query = prefix + ', '.join([placeholders] * len(chunk)) + suffix
+                cursor.execute(query, [value for row in chunk for value in row])
+            return len(rows)
+
+    @staticmethod
+    def _load_data_infile(cursor, table, columns, rows, replace):
+        """
+        Serialize rows to a tab-separated buffer and stream it with LOAD DATA LOCAL INFILE.
+        mysql-connector only reads local infiles from a path, so the buffer is
+        spooled to a temporary file (in /dev/shm when available).
+        Requires allow_local_infile on the client and local_infile=1 on the server.
+        """
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(DatabaseManager._to_infile_field(value) for value in row))
+            buffer.write('\n')
+
+        tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.tsv', dir=tmp_dir, delete=False) as f:
+            f.write(buffer.getvalue())
+            path = f.name
+        try:
+            mode = 'REPLACE' if replace else 'IGNORE'
+            # Forward slashes keep Windows paths from being read as escapes
+            query = (
+                f"LOAD DATA LOCAL INFILE '{path.replace(os.sep, '/')}' {mode} INTO TABLE {table} "
+                f"CHARACTER SET utf8mb4 FIELDS TERMINATED BY '\\t' LINES TERMINATED BY '\\n' "
+                f"({', '.join(columns)})"
+            )
+            cursor.execute(query)
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def _to_infile_field(value):
+        """
+        Format a value for LOAD DATA's default escaping (\\N is NULL).
+        """
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return '1' if value else '0'
+        if isinstance(value, (datetime.date, datetime.time, datetime.timedelta, Decimal, int, float)):
+            return str(value)
+        return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+
+class Transaction:
+    """
+    Write statements on the connection of a DatabaseManager.transaction() block.
+    """
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self._callbacks = []
+
+    def execute(self, query, params=None, name=None):
+        """
+        Execute one statement. Returns the number of affected rows.
+        name labels the statement's latency metric.
+        """
+        with SQL_LATENCY.time(statement_label(query, name)):
+            self.cursor.execute(query, params or ())
+        return self.cursor.rowcount
+
+    def query(self, query, params=None, name=None):
+        """
+        Run a SELECT on the transaction's connection, so it sees the writes made
+        so far. Returns a list of tuples.
+        """
+        with SQL_LATENCY.time(statement_label(query, name)):
+            self.cursor.execute(query, params or ())
+            return self.cursor.fetchall()
+
+    def execute_batch(self, query, params_list, name=None):
+        """
+        Execute a statement once per parameter tuple. Returns the number of affected rows.
+        """
+        with SQL_LATENCY.time(statement_label(query, name)):
+            self.cursor.executemany(query, params_list or [])
+        return self.cursor.rowcount
+
+    def bulk_insert(self, table, columns, rows, replace=False, chunk_size=None, use_load_data=None, on_duplicate=None):
+        """
+        Write many rows as part of this transaction (see DatabaseManager._bulk_insert).
+        Returns the number of rows written.
+        """
+        return DatabaseManager._bulk_insert(self.cursor, table, columns, rows, replace=replace, chunk_size=chunk_size,
+                                            use_load_data=use_load_data, on_duplicate=on_duplicate)
+
+    def after_commit(self, callback):
+        """
+        Run callback once the transaction has committed (never if it rolls back).
+        """
+        self._callbacks.append(callback)
+
+    def _run_after_commit(self):
+        # The data is already committed, so a failing callback is logged rather than raised
+        for callback in self._callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Error in after-commit callback: {e}")
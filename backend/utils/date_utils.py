@@ -1,6 +1,6 @@
 import datetime
 import logging
-from services.market_service import MarketService
+from utils.trading_calendar import TradingCalendar
 
 logger = logging.getLogger(__name__)
 
@@ -13,22 +13,31 @@ def get_current_or_previous_trading_day():
     today = datetime.date.today().strftime('%Y-%m-%d')
     
     try:
-        # Get list of trading days (end_date inclusive)
-        # Assuming get_trading_days returns sorted list of strings
-        trading_days = MarketService.get_trading_days(end_date=today)
+        trading_day = TradingCalendar.current_or_previous_trading_day(today)
         
-        if not trading_days:
-            logger.warning("No trading days found from MarketService. Returning today.")
+        if not trading_day:
+            logger.warning("No trading days found in the trading calendar. Returning today.")
             return today
             
-        if today in trading_days:
-            return today
-        else:
-            # Today is not a trading day, return the last one in the list
-            last_trading_day = trading_days[-1]
-            logger.info(f"Today {today} is not a trading day. Using previous trading day: {last_trading_day}")
-            return last_trading_day
+        if trading_day != today:
+            logger.info(f"Today {today} is not a trading day. Using previous trading day: {trading_day}")
+        return trading_day
             
     except Exception as e:
         logger.error(f"Error determining trading day: {e}. Fallback to today.")
         return today
+
+def is_trading_day(date_str=None):
+    """
+    Whether date_str (default today) is a trading day.
+    Assumes it is when the calendar is unavailable, so scheduled jobs still run.
+    """
+    if not date_str:
+        date_str = datetime.date.today().strftime('%Y-%m-%d')
+    try:
+        if not TradingCalendar.is_loaded():
+            return True
+        return TradingCalendar.is_trading_day(date_str)
+    except Exception as e:
+        logger.error(f"Error checking trading day {date_str}: {e}")
+        return True
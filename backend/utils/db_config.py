@@ -1,18 +1,204 @@
+import os
+import time
+import logging
+import threading
 import mysql.connector
 from mysql.connector import pooling
+from utils.metrics import register_collector
+
+logger = logging.getLogger(__name__)
+
+# Bulk writes use LOAD DATA LOCAL INFILE when enabled (the server must run with local_infile=1)
+USE_LOAD_DATA = False
 
 config = {
   'user': 'root',
   'password': 'root',
   'host': '127.0.0.1',
   'database': 'jingjiabushou',
-  'raise_on_warnings': False
+  'raise_on_warnings': False,
+  'allow_local_infile': USE_LOAD_DATA
 }
 
-# Create a connection pool
-cnx_pool = mysql.connector.pooling.MySQLConnectionPool(pool_name="mypool",
-                                                       pool_size=10,
-                                                       **config)
+# Connections per process; the app and the scheduler can be sized separately through the environment
+POOL_SIZE = min(int(os.environ.get('DB_POOL_SIZE', 10)), pooling.CNX_POOL_MAXSIZE)
+# Seconds a caller waits for a free connection before PoolTimeoutError
+POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))
+# Connections idle longer than this are pinged (and reconnected) before being handed out
+POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 30))
+
+# Optional read replica (or second local instance) for DatabaseManager.execute_query.
+# Unset DB_READ_HOST sends reads to the primary pool
+READ_HOST = os.environ.get('DB_READ_HOST')
+read_config = dict(config)
+if READ_HOST:
+    read_config.update({
+        'host': READ_HOST,
+        'port': int(os.environ.get('DB_READ_PORT', 3306)),
+        'user': os.environ.get('DB_READ_USER', config['user']),
+        'password': os.environ.get('DB_READ_PASSWORD', config['password']),
+        'database': os.environ.get('DB_READ_DATABASE', config['database']),
+    })
+# Upper bound (seconds) on the replica's lag: results recomputed this soon after a
+# data change read from the primary, since they are cached under the new version
+REPLICA_LAG_WINDOW = float(os.environ.get('DB_REPLICA_LAG_WINDOW', 5))
+READ_POOL_SIZE = min(int(os.environ.get('DB_READ_POOL_SIZE', POOL_SIZE)), pooling.CNX_POOL_MAXSIZE)
+
+
+class PoolTimeoutError(mysql.connector.errors.PoolError):
+    """
+    No connection became free within the pool's timeout.
+    """
+
+
+class _CheckedOutConnection:
+    """
+    A pooled connection that gives its slot back to the ConnectionPool when closed.
+    """
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx = cnx
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._cnx, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        # Closing a pooled connection detaches it from the underlying one, so take the id first
+        connection_id = id(self._cnx._cnx)
+        try:
+            self._cnx.close()
+        finally:
+            self._pool._release(connection_id)
+
+
+class ConnectionPool:
+    """
+    mysql.connector pool created on first use, with callers queued for up to
+    timeout seconds when every connection is checked out (mysql.connector
+    itself fails immediately), idle connections pinged before reuse, and
+    checkout metrics for /api/admin/db/pool.
+    """
+    def __init__(self, name, db_config, size=POOL_SIZE, timeout=POOL_TIMEOUT, ping_after=POOL_PING_AFTER):
+        self.name = name
+        self.db_config = db_config
+        self.size = size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        # id of the underlying connection -> time it was last returned
+        self._last_used = {}
+        self._stats = {'checkouts': 0, 'in_use': 0, 'peak_in_use': 0, 'waited': 0, 'exhausted': 0,
+                       'reconnects': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = pooling.MySQLConnectionPool(pool_name=self.name, pool_size=self.size,
+                                                             **self.db_config)
+                    logger.info(f"Created connection pool {self.name} (size={self.size}).")
+        return self._pool
+
+    def get_connection(self):
+        """
+        Check out a connection, waiting up to timeout seconds for a free one.
+        Closing the returned connection gives it back.
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['waited'] += 1
+            if not self._slots.acquire(timeout=self.timeout):
+                with self._lock:
+                    self._stats['exhausted'] += 1
+                logger.error(f"Connection pool {self.name} exhausted: no connection free after {self.timeout}s")
+                raise PoolTimeoutError(f"No connection available in pool {self.name} after {self.timeout}s")
+        waited = time.perf_counter() - start
+
+        try:
+            cnx = self._get_pool().get_connection()
+            self._check_health(cnx)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            stats = self._stats
+            stats['checkouts'] += 1
+            stats['in_use'] += 1
+            stats['peak_in_use'] = max(stats['peak_in_use'], stats['in_use'])
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+        return _CheckedOutConnection(self, cnx)
+
+    def _check_health(self, cnx):
+        last_used = self._last_used.get(id(cnx._cnx))
+        if last_used is not None and time.time() - last_used < self.ping_after:
+            return
+        try:
+            cnx.ping(reconnect=False)
+        except mysql.connector.Error:
+            logger.warning(f"Stale connection in pool {self.name}, reconnecting.")
+            cnx.reconnect(attempts=2, delay=0)
+            with self._lock:
+                self._stats['reconnects'] += 1
+
+    def _release(self, connection_id):
+        self._last_used[connection_id] = time.time()
+        with self._lock:
+            self._stats['in_use'] -= 1
+        self._slots.release()
+
+    def stats(self):
+        """
+        Size, in-use and peak counts, waits, exhaustion events and checkout latency.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        checkouts = stats.pop('checkouts')
+        wait_total = stats.pop('wait_total')
+        stats.update({
+            'name': self.name,
+            'size': self.size,
+            'timeout': self.timeout,
+            'checkouts': checkouts,
+            'wait_avg_ms': round(wait_total / checkouts * 1000, 3) if checkouts else 0.0,
+            'wait_max_ms': round(stats.pop('wait_max') * 1000, 3),
+        })
+        return stats
+
+
+cnx_pool = ConnectionPool("mypool", config)
+read_pool = ConnectionPool("readpool", read_config, size=READ_POOL_SIZE) if READ_HOST else cnx_pool
+
+def _pool_metric_families():
+    pools = [cnx_pool] if read_pool is cnx_pool else [cnx_pool, read_pool]
+    stats = [pool.stats() for pool in pools]
+    families = []
+    for name, kind, documentation in (
+            ('in_use', 'gauge', 'Connections checked out.'),
+            ('peak_in_use', 'gauge', 'Most connections checked out at once.'),
+            ('size', 'gauge', 'Pool size.'),
+            ('checkouts', 'counter', 'Connections handed out.'),
+            ('waited', 'counter', 'Checkouts that had to wait for a free connection.'),
+            ('exhausted', 'counter', 'Checkouts that timed out waiting for a free connection.'),
+            ('reconnects', 'counter', 'Stale connections reconnected.'),
+            ('wait_max_ms', 'gauge', 'Longest checkout wait in milliseconds.')):
+        metric = f"db_pool_{name}_total" if kind == 'counter' else f"db_pool_{name}"
+        families.append((metric, kind, documentation, [({'pool': s['name']}, s[name]) for s in stats]))
+    return families
+
+register_collector(_pool_metric_families)
 
-def get_connection():
-    return cnx_pool.get_connection()
+def get_connection(read_only=False):
+    """
+    Check out a connection from the primary pool, or from the read pool
+    when read_only is set.
+    """
+    return (read_pool if read_only else cnx_pool).get_connection()
@@ -0,0 +1,236 @@
+import datetime
+import logging
+import queue
+import threading
+import time
+
+from utils.database import DatabaseManager
+from utils.db_config import REPLICA_LAG_WINDOW
+
+logger = logging.getLogger(__name__)
+
+# Datasets published by the ingest paths
+CALL_AUCTION = 'call_auction'
+INDEX_DATA = 'index_data'
+MARKET_SENTIMENT = 'market_sentiment'
+LIMIT_UP = 'yesterday_limit_up'
+
+# Datasets whose rows of one date also feed the following days' widgets
+PREV_DAY_DATASETS = (MARKET_SENTIMENT, LIMIT_UP)
+
+
+class EventBus:
+    """
+    Change notifications for (dataset, date) pairs across processes.
+
+    Writers bump a version row in data_versions after committing new data.
+    Readers run one watcher thread per process that polls that table and fans
+    changes out to in-process subscribers (e.g. SSE streams), so database load
+    does not grow with the number of connected viewers.
+    """
+    POLL_INTERVAL = 1.0
+    SUBSCRIBER_QUEUE_SIZE = 100
+
+    _lock = threading.Lock()
+    _subscribers = set()
+    _listeners = []
+    _versions = {}
+    # (dataset, date) -> time.monotonic() of the last version dispatched in this process
+    _changed_at = {}
+    _watcher = None
+    _loaded = False
+
+    @staticmethod
+    def publish(dataset, date_str, tx=None):
+        """
+        Record that data for dataset/date changed and notify local subscribers.
+        With tx (a DatabaseManager.transaction()), the version bump commits
+        with the data written in it and subscribers are notified after the commit.
+        Returns the new version, or None if it could not be recorded (without tx).
+        """
+        date_str = str(date_str)
+        if tx is not None:
+            # Errors propagate so the transaction rolls back with its data
+            version = EventBus._bump_version(tx.cursor, dataset, date_str)
+            tx.after_commit(lambda: EventBus._dispatch(dataset, date_str, version))
+            return version
+
+        try:
+            with DatabaseManager.get_cursor(commit=True) as cursor:
+                version = EventBus._bump_version(cursor, dataset, date_str)
+        except Exception as e:
+            logger.error(f"Error publishing {dataset} update for {date_str}: {e}")
+            return None
+
+        EventBus._dispatch(dataset, date_str, version)
+        return version
+
+    @staticmethod
+    def _bump_version(cursor, dataset, date_str):
+        query = """
+        INSERT INTO data_versions (dataset, date, version) VALUES (%s, %s, LAST_INSERT_ID(1))
+        ON DUPLICATE KEY UPDATE version = LAST_INSERT_ID(version + 1)
+        """
+        cursor.execute(query, (dataset, date_str))
+        cursor.execute("SELECT LAST_INSERT_ID()")
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def subscribe():
+        """
+        Register a subscriber and return its queue of update events.
+        """
+        EventBus._ensure_watcher()
+        subscriber = queue.Queue(maxsize=EventBus.SUBSCRIBER_QUEUE_SIZE)
+        with EventBus._lock:
+            EventBus._subscribers.add(subscriber)
+        return subscriber
+
+    @staticmethod
+    def unsubscribe(subscriber):
+        with EventBus._lock:
+            EventBus._subscribers.discard(subscriber)
+
+    @staticmethod
+    def add_listener(callback):
+        """
+        Register callback(dataset, date_str, version), called for each new version
+        before it becomes visible through version_tag (e.g. to drop cached results).
+        """
+        with EventBus._lock:
+            if callback not in EventBus._listeners:
+                EventBus._listeners.append(callback)
+
+    @staticmethod
+    def version_tag(date_str):
+        """
+        Token that changes whenever data shown for date_str changes, or None until
+        the versions have been loaded. Covers every dataset of that date plus the
+        PREV_DAY_DATASETS of earlier dates, which feed the next day's widgets.
+        """
+        EventBus._ensure_watcher()
+        with EventBus._lock:
+            if not EventBus._loaded:
+                return None
+            return EventBus._build_tag(EventBus._versions.items(), date_str)
+
+    @staticmethod
+    def load_version_tag(date_str):
+        """
+        version_tag read straight from data_versions, for processes that do not
+        run the watcher (e.g. the scheduler).
+        """
+        query = """
+        SELECT dataset, date, version FROM data_versions
+        WHERE date = %s OR (dataset IN (%s, %s) AND date < %s)
+        """
+        rows = DatabaseManager.execute_query(query, (date_str, *PREV_DAY_DATASETS, date_str))
+        versions = [((row['dataset'], EventBus._format_date(row['date'])), row['version']) for row in rows]
+        return EventBus._build_tag(versions, date_str)
+
+    @staticmethod
+    def recently_changed(date_str, window=REPLICA_LAG_WINDOW):
+        """
+        True while a change to data shown for date_str (its own datasets and the
+        earlier days' PREV_DAY_DATASETS) is less than window seconds old, so a
+        read replica may not have it yet.
+        """
+        now = time.monotonic()
+        with EventBus._lock:
+            return any(now - changed_at < window for (dataset, day), changed_at in EventBus._changed_at.items()
+                       if day == date_str or (dataset in PREV_DAY_DATASETS and day < date_str))
+
+    @staticmethod
+    def _build_tag(versions, date_str):
+        versions = sorted(versions)
+        parts = [f"{dataset}.{version}" for (dataset, day), version in versions if day == date_str]
+        for prev_dataset in PREV_DAY_DATASETS:
+            prev_version = sum(version for (dataset, day), version in versions
+                               if dataset == prev_dataset and day < date_str)
+            parts.append(f"prev.{prev_dataset}.{prev_version}")
+        return '-'.join(parts)
+
+    @staticmethod
+    def _dispatch(dataset, date_str, version):
+        """
+        Deliver an update once per version to every listener and subscriber.
+        Subscribers that stopped reading lose their oldest event rather than blocking others.
+        """
+        key = (dataset, date_str)
+        with EventBus._lock:
+            if EventBus._versions.get(key, 0) >= version:
+                return
+            # Before the listeners run, so results recomputed after they drop caches read the primary
+            EventBus._changed_at[key] = time.monotonic()
+            listeners = list(EventBus._listeners)
+
+        for listener in listeners:
+            try:
+                listener(dataset, date_str, version)
+            except Exception as e:
+                logger.error(f"Error in event listener for {dataset} {date_str}: {e}")
+
+        with EventBus._lock:
+            if EventBus._versions.get(key, 0) >= version:
+                return
+            EventBus._versions[key] = version
+            subscribers = list(EventBus._subscribers)
+
+        event = {'dataset': dataset, 'date': date_str, 'version': version}
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(event)
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                    subscriber.put_nowait(event)
+                except (queue.Empty, queue.Full):
+                    pass
+
+    @staticmethod
+    def _ensure_watcher():
+        with EventBus._lock:
+            if EventBus._watcher is not None and EventBus._watcher.is_alive():
+                return
+            EventBus._watcher = threading.Thread(target=EventBus._watch, name='event-bus-watcher', daemon=True)
+            EventBus._watcher.start()
+
+    @staticmethod
+    def _poll():
+        """
+        Compare every version row with the versions already seen and dispatch
+        the newer ones. The first poll only records the current versions.
+
+        The whole table (a few rows per trading day) is read each time: an
+        updated_at watermark would skip a bump whose transaction committed
+        after a later-stamped one had already been polled.
+        """
+        rows = DatabaseManager.execute_query("SELECT dataset, date, version FROM data_versions")
+        if not EventBus._loaded:
+            with EventBus._lock:
+                for row in rows:
+                    key = (row['dataset'], EventBus._format_date(row['date']))
+                    EventBus._versions[key] = max(EventBus._versions.get(key, 0), row['version'])
+                EventBus._loaded = True
+            return
+
+        for row in rows:
+            key = (row['dataset'], EventBus._format_date(row['date']))
+            if EventBus._versions.get(key, 0) < row['version']:
+                EventBus._dispatch(key[0], key[1], row['version'])
+
+    @staticmethod
+    def _format_date(value):
+        return value.strftime('%Y-%m-%d') if isinstance(value, datetime.date) else str(value)
+
+    @staticmethod
+    def _watch():
+        logger.info("Event bus watcher started.")
+        stop = threading.Event()
+        while True:
+            try:
+                EventBus._poll()
+            except Exception as e:
+                logger.error(f"Error polling data_versions: {e}")
+            if stop.wait(EventBus.POLL_INTERVAL):
+                break
@@ -0,0 +1,156 @@
+import os
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+# Directory for the rotating log files; empty logs to the console only
+LOG_DIR = os.environ.get('LOG_DIR', '.')
+# 'text' for the usual one-line format, 'json' for one JSON object per line
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text')
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', 20 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+# Records waiting for the writer thread; when it falls this far behind, new records are dropped
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+
+# Share of successful, fast requests written to the access log
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', 0.1))
+# Requests at least this slow (seconds) are always written
+ACCESS_LOG_SLOW_SECONDS = float(os.environ.get('ACCESS_LOG_SLOW_SECONDS', 0.5))
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+access_logger = logging.getLogger('access')
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Text or JSON lines. Structured fields are passed as
+    logger.info(msg, extra={'fields': {...}}) and appended as key=value
+    pairs in text mode.
+    """
+    def __init__(self, fmt='text'):
+        super().__init__(TEXT_FORMAT)
+        self.json = fmt == 'json'
+
+    def format(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if not self.json:
+            line = super().format(record)
+            if fields:
+                line += ' | ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+            return line
+
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the logging thread: when the queue is
+    full the record is dropped and counted instead.
+    """
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Keep the structured fields; only render the message and traceback here
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class AccessLogSampler(logging.Filter):
+    """
+    Passes ACCESS_LOG_SAMPLE_RATE of the access log, plus every error
+    response and every request slower than ACCESS_LOG_SLOW_SECONDS.
+    """
+    def __init__(self, rate=ACCESS_LOG_SAMPLE_RATE, slow_seconds=ACCESS_LOG_SLOW_SECONDS):
+        super().__init__()
+        self.rate = rate
+        self.slow_seconds = slow_seconds
+
+    def filter(self, record):
+        fields = getattr(record, 'fields', None) or {}
+        if record.levelno >= logging.WARNING or fields.get('status', 0) >= 400:
+            return True
+        if fields.get('duration_ms', 0) >= self.slow_seconds * 1000:
+            return True
+        return random.random() < self.rate
+
+
+def setup_logging(log_file=None):
+    """
+    Route every log record through a queue to a background writer thread,
+    which writes to the console and, when log_file is given, to a rotating
+    file in LOG_DIR. Replaces any handlers already on the root logger.
+    Returns the root logger's queue handler.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    formatter = StructuredFormatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file and LOG_DIR:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        handlers.append(logging.handlers.RotatingFileHandler(
+            os.path.join(LOG_DIR, log_file), maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT,
+            encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = DroppingQueueHandler(log_queue)
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(LOG_LEVEL)
+
+    access_logger.filters.clear()
+    access_logger.addFilter(AccessLogSampler())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return queue_handler
+
+
+def stop_logging():
+    """
+    Flush queued records and stop the writer thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,210 @@
+import os
+import re
+import time
+import hashlib
+import bisect
+import logging
+import threading
+import functools
+from contextlib import ContextDecorator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Port of the metrics server started by processes without a Flask app (the scheduler); 0 disables it
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 9101))
+
+# Upper bounds (seconds) of the latency buckets; +Inf is implicit
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Start of the VALUES list of an INSERT/REPLACE
+_VALUES_RE = re.compile(r'\sVALUES\b.*', re.IGNORECASE | re.DOTALL)
+# First table a statement reads or writes (derived tables are skipped)
+_TABLE_RE = re.compile(r'\b(?:FROM|INTO|UPDATE|JOIN)\s+`?([A-Za-z_]\w*)', re.IGNORECASE)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_histograms = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+        return False
+
+
+class Histogram:
+    """
+    Latency histogram with Prometheus semantics (cumulative buckets, _sum
+    and _count), kept per combination of label values.
+    """
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series = {}
+        _histograms.append(self)
+
+    def observe(self, value, *labelvalues):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labelvalues):
+        """
+        Context manager (or decorator) observing the duration of its block.
+        """
+        return _Timer(self, labelvalues)
+
+    def timed(self, func):
+        """
+        Decorator observing each call's duration, labelled with the function's name.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.observe(time.perf_counter() - start, func.__name__)
+        return wrapper
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, [list(value[0]), value[1], value[2]]) for key, value in self._series.items())
+        for labelvalues, (counts, total, count) in series:
+            labels = dict(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(dict(labels, le=le))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+def register_collector(collect):
+    """
+    Add a function called on every scrape that returns metric families as
+    (name, type, documentation, [(labels, value), ...]) tuples, for values
+    that are already counted elsewhere (cache counters, pool stats).
+    """
+    _collectors.append(collect)
+
+
+def render():
+    """
+    All metrics of this process in the Prometheus text exposition format.
+    """
+    lines = []
+    for histogram in _histograms:
+        lines.extend(histogram.render())
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            logger.error(f"Error collecting metrics from {collect.__name__}: {e}")
+            continue
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+@functools.lru_cache(maxsize=1024)
+def statement_label(query, name=None):
+    """
+    Label for a SQL statement: name when the caller gives one (e.g. the query
+    constant's name), otherwise its verb and first table plus a hash of the
+    whitespace-collapsed text, so statements on one table stay distinct. The
+    VALUES list of inserts is left out of the hash (multi-row inserts differ
+    only there).
+    """
+    if name:
+        return name
+    normalized = _VALUES_RE.sub('', ' '.join(query.split()))
+    verb = normalized.split(' ', 1)[0].lower()
+    table = _TABLE_RE.search(normalized)
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:8]
+    return f"{verb} {table.group(1) if table else '-'} #{digest}"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    """
+    Serve /metrics from a daemon thread, for processes that have no Flask app.
+    """
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+    except OSError as e:
+        logger.error(f"Could not start metrics server on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Serving metrics on port {port}")
+    return server
+
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'API request latency by route.',
+                            ('endpoint', 'method', 'status'))
+SERVICE_LATENCY = Histogram('market_service_duration_seconds', 'MarketService method latency, cache hits included.',
+                            ('method',))
+SQL_LATENCY = Histogram('sql_statement_duration_seconds', 'SQL statement latency (execute and fetch).',
+                        ('statement',))
+INGEST_LATENCY = Histogram('ingest_tick_duration_seconds', 'Duration of each scheduled ingest task run.',
+                           ('task',))
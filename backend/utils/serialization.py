@@ -0,0 +1,105 @@
+import datetime
+import json
+import logging
+from decimal import Decimal
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def _format_date(value):
+    # 'YYYY-MM-DD'; isoformat is several times faster than strftime
+    return value.isoformat()
+
+
+def _format_datetime(value):
+    return value.isoformat(' ', 'seconds')
+
+
+def _format_time(value):
+    return value.isoformat('seconds')
+
+
+# Exact-type lookup for the values found in query rows, checked before the
+# isinstance chain in _default since it runs once per value
+_ENCODERS = {
+    Decimal: str,
+    datetime.timedelta: str,
+    datetime.date: _format_date,
+    datetime.datetime: _format_datetime,
+    datetime.time: _format_time,
+    set: list,
+    frozenset: list,
+}
+
+
+def _default(value):
+    """
+    JSON form of the non-JSON values found in query rows. Matches what the
+    dashboard has always received: Decimal as a string, dates as
+    'YYYY-MM-DD', and MySQL TIME columns (timedelta) as str(timedelta), e.g. '9:25:00'.
+    """
+    encoder = _ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        return _format_datetime(value)
+    if isinstance(value, datetime.date):
+        return _format_date(value)
+    if isinstance(value, datetime.timedelta):
+        return str(value)
+    if isinstance(value, datetime.time):
+        return _format_time(value)
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    # Dates go through _default too so both paths produce the same text
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(value):
+        """
+        Serialize value to UTF-8 JSON bytes.
+        """
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+
+    def loads(data):
+        return orjson.loads(data)
+else:
+    def dumps(value):
+        """
+        Serialize value to UTF-8 JSON bytes.
+        """
+        return json.dumps(value, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(data):
+        return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """
+    Flask JSON provider built on dumps(), so jsonify() handles Decimal, date
+    and TIME values directly and uses orjson when it is installed.
+    """
+    mimetype = 'application/json'
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
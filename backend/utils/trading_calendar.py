@@ -0,0 +1,166 @@
+import bisect
+import datetime
+import logging
+import threading
+import time
+
+from utils.database import DatabaseManager
+from utils.locks import akshare_lock
+
+logger = logging.getLogger(__name__)
+
+
+def _to_date_str(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+class TradingCalendar:
+    """
+    Trading days persisted in the trading_calendar table and held in memory as a
+    sorted list of 'YYYY-MM-DD' strings, so lookups are bisections instead of
+    akshare downloads and list scans.
+
+    The table is filled from Sina via akshare when empty and refreshed by a
+    background thread; readers never wait on akshare once the table has data.
+    """
+    REFRESH_INTERVAL = 6 * 3600
+    # Seconds before a failed first load is tried again
+    RETRY_INTERVAL = 30
+
+    _lock = threading.Lock()
+    # Serializes load(), so concurrent first callers do not all query and download
+    _load_lock = threading.Lock()
+    _days = []
+    _loaded = False
+    _last_attempt = None
+    _refresher = None
+
+    @staticmethod
+    def load():
+        """
+        Load the calendar from the database, downloading it first if the table is empty.
+        The calendar only counts as loaded once it has days; until then later
+        calls try again.
+        """
+        with TradingCalendar._load_lock:
+            if TradingCalendar._loaded:
+                return
+            TradingCalendar._last_attempt = time.monotonic()
+
+            rows = DatabaseManager.execute_query("SELECT date FROM trading_calendar ORDER BY date")
+            days = [_to_date_str(row['date']) for row in rows]
+            with TradingCalendar._lock:
+                TradingCalendar._days = days
+            logger.info(f"Loaded {len(days)} trading days from trading_calendar.")
+
+            if not days and not TradingCalendar.refresh():
+                logger.error(f"Trading calendar is empty, retrying in {TradingCalendar.RETRY_INTERVAL}s.")
+                return
+
+            with TradingCalendar._lock:
+                TradingCalendar._loaded = True
+        TradingCalendar.start_background_refresh()
+
+    @staticmethod
+    def refresh():
+        """
+        Download the calendar from Sina and store new days. Returns the number of days known.
+        """
+        try:
+            with akshare_lock:
+                import akshare as ak
+                df = ak.tool_trade_date_hist_sina()
+            days = sorted(_to_date_str(d) for d in df['trade_date'])
+        except Exception as e:
+            logger.error(f"Error downloading trading calendar: {e}")
+            return len(TradingCalendar._days)
+
+        new_days = [(day,) for day in days if not TradingCalendar._contains(day)]
+        if new_days:
+            DatabaseManager.bulk_insert('trading_calendar', ('date',), new_days, replace=True)
+            logger.info(f"Stored {len(new_days)} new trading days.")
+
+        with TradingCalendar._lock:
+            TradingCalendar._days = sorted(set(TradingCalendar._days).union(days))
+        return len(TradingCalendar._days)
+
+    @staticmethod
+    def start_background_refresh():
+        with TradingCalendar._lock:
+            if TradingCalendar._refresher is not None and TradingCalendar._refresher.is_alive():
+                return
+            TradingCalendar._refresher = threading.Thread(target=TradingCalendar._refresh_loop,
+                                                          name='trading-calendar-refresh', daemon=True)
+            TradingCalendar._refresher.start()
+
+    @staticmethod
+    def _refresh_loop():
+        stop = threading.Event()
+        while not stop.wait(TradingCalendar.REFRESH_INTERVAL):
+            TradingCalendar.refresh()
+
+    @staticmethod
+    def _get_days():
+        if not TradingCalendar._loaded:
+            last_attempt = TradingCalendar._last_attempt
+            if last_attempt is not None and time.monotonic() - last_attempt < TradingCalendar.RETRY_INTERVAL:
+                return TradingCalendar._days
+            try:
+                TradingCalendar.load()
+            except Exception as e:
+                logger.error(f"Error loading trading calendar: {e}")
+        return TradingCalendar._days
+
+    @staticmethod
+    def _contains(day):
+        days = TradingCalendar._days
+        idx = bisect.bisect_left(days, day)
+        return idx < len(days) and days[idx] == day
+
+    @staticmethod
+    def is_loaded():
+        return bool(TradingCalendar._get_days())
+
+    @staticmethod
+    def is_trading_day(date_value):
+        TradingCalendar._get_days()
+        return TradingCalendar._contains(_to_date_str(date_value))
+
+    @staticmethod
+    def previous_trading_day(date_value):
+        """
+        Last trading day strictly before date_value, or None.
+        """
+        days = TradingCalendar._get_days()
+        idx = bisect.bisect_left(days, _to_date_str(date_value))
+        return days[idx - 1] if idx > 0 else None
+
+    @staticmethod
+    def next_trading_day(date_value):
+        """
+        First trading day strictly after date_value, or None.
+        """
+        days = TradingCalendar._get_days()
+        idx = bisect.bisect_right(days, _to_date_str(date_value))
+        return days[idx] if idx < len(days) else None
+
+    @staticmethod
+    def current_or_previous_trading_day(date_value):
+        """
+        date_value itself if it is a trading day, otherwise the previous trading day.
+        """
+        days = TradingCalendar._get_days()
+        idx = bisect.bisect_right(days, _to_date_str(date_value))
+        return days[idx - 1] if idx > 0 else None
+
+    @staticmethod
+    def trading_days(start_date=None, end_date=None):
+        """
+        Trading days between start_date and end_date inclusive (either may be None).
+        """
+        days = TradingCalendar._get_days()
+        lo = bisect.bisect_left(days, _to_date_str(start_date)) if start_date else 0
+        hi = bisect.bisect_right(days, _to_date_str(end_date)) if end_date else len(days)
+        return days[lo:hi]
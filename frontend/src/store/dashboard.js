@@ -1,4 +1,5 @@
 import { reactive } from 'vue'
+import axios from 'axios'
 
 const getTodayStr = () => {
   const today = new Date()
@@ -14,6 +15,7 @@ export const store = reactive({
   refreshInterval: 5000,
   tradingDays: new Set(),
   theme: 'light', // Default theme: 'light', 'dark', 'eye-care'
+  bundle: null, // Latest /api/dashboard/bundle response for selectedDate
   
   setTradingDays(days) {
     this.tradingDays = new Set(days)
@@ -31,6 +33,63 @@ export const store = reactive({
     this.refreshInterval = val
   },
 
+  // Fetch every dashboard widget for the selected date in one request
+  async fetchBundle(limit = 50) {
+    const date = this.selectedDate
+    const response = await axios.get('/api/dashboard/bundle', {
+      params: { date, limit }
+    })
+    // Drop responses for a date the user has already navigated away from
+    if (date === this.selectedDate) {
+      this.bundle = response.data
+    }
+    return this.bundle
+  },
+
+  // Server-Sent Events subscription for the selected date.
+  // onUpdate is called once per burst of update events pushed by the server;
+  // onClosed is called if the browser gives up on the stream.
+  stream: null,
+  streamConnected: false,
+
+  openStream(onUpdate, onClosed, onReconnect) {
+    this.closeStream()
+    if (typeof window === 'undefined' || !window.EventSource) {
+      if (onClosed) onClosed()
+      return
+    }
+    const source = new EventSource(`/api/stream?date=${encodeURIComponent(this.selectedDate)}`)
+    let debounce = null
+    let opened = false
+    source.onopen = () => {
+      this.streamConnected = true
+      // Updates sent while disconnected were missed; the first open follows the caller's own fetch
+      if (opened && onReconnect) onReconnect()
+      opened = true
+    }
+    source.addEventListener('update', () => {
+      // Several datasets are often written in the same second
+      if (debounce) clearTimeout(debounce)
+      debounce = setTimeout(onUpdate, 250)
+    })
+    source.onerror = () => {
+      this.streamConnected = false
+      if (source.readyState === EventSource.CLOSED && this.stream === source) {
+        this.stream = null
+        if (onClosed) onClosed()
+      }
+    }
+    this.stream = source
+  },
+
+  closeStream() {
+    if (this.stream) {
+      this.stream.close()
+      this.stream = null
+    }
+    this.streamConnected = false
+  },
+
   setTheme(val) {
     this.theme = val
     // Optionally save to localStorage here if persistence is needed across refreshes